@@ -1,25 +1,17 @@
-from openai import OpenAI
 from dotenv import load_dotenv
 import json
 import logging
+import time
 from src.utils import setup_logger
+from src.client import api_timer
+from src import metrics, registry, resilience, tracing
 from agent import prompt as system_prompt
+from agent.accounting import QueryStats, ToolCallStats
 from typing import Dict, Any
-import os
 
 setup_logger()
 logger = logging.getLogger(__name__)
 
-from src import (
-    Configuration,
-    Deployment,
-    Node,
-    Pod,
-    Service,
-    Namespace,
-    Workload
-)
-
 load_dotenv(override=True)
 
 class LLM():
@@ -32,24 +24,38 @@ class LLM():
         model: OpenAI client instance
         model_name (str): Name of the LLM model to use
         messages (list): Conversation history
-        tools (dict): Available tools/functions that can be called by the LLM
+        tools (list): OpenAI schemas of the registered tools (see src/registry.py)
+        stats (QueryStats): Token and latency accounting for the current query
     """
 
-    def __init__(self, model_name='gpt-4o', temperature=1):
+    def __init__(self, model_name='gpt-4o', temperature=1, client=None):
         """Initialize the LLM instance.
 
         Args:
             model_name (str, optional): The name of the LLM model to use. Defaults to 'gpt-4o-mini'.
+            client (OpenAI, optional): Existing OpenAI client to reuse. A new one is created on first use if not given.
         """
-        self.model = OpenAI()
+        self._model = client
         self.model_name = model_name
         self.temperature = temperature
         self.messages = []
+        self.stats = None
+        self.tools = registry.schemas()
 
-        tools_path = os.path.join(os.path.dirname(__file__), 'tools.json')
-        
-        with open(tools_path, 'r') as f:
-            self.tools = json.load(f)
+    @property
+    def model(self):
+        """OpenAI client, created (and the openai package imported) on first use.
+
+        Retries are left to src/resilience.py, which also rate limits and circuit-breaks the calls.
+        """
+        if self._model is None:
+            from openai import OpenAI
+            self._model = OpenAI(max_retries=0)
+        return self._model
+
+    @model.setter
+    def model(self, client):
+        self._model = client
 
     def call(self, prompt=None, tool_choice='auto'):
         """Make a call to the LLM with the given prompt.
@@ -69,14 +75,26 @@ class LLM():
             logger.critical(f"[USER] Query: {prompt}")
             tool_choice = 'required'
             self.messages.append({'role': 'user', 'content': prompt})
+            self.stats = QueryStats(prompt)
 
-        completion = self.model.chat.completions.create(
-                        model=self.model_name,
-                        messages=self.messages,
-                        tools = self.tools,
-                        tool_choice=tool_choice,
-                        temperature=self.temperature
-                    )
+        start = time.perf_counter()
+        try:
+            with tracing.span('llm.chat_completion', model=self.model_name, messages=len(self.messages)) as span:
+                completion = resilience.backend('openai').call(
+                                self.model.chat.completions.create,
+                                model=self.model_name,
+                                messages=self.messages,
+                                tools = self.tools,
+                                tool_choice=tool_choice,
+                                temperature=self.temperature
+                            )
+                if span and completion.usage:
+                    span.set(prompt_tokens=completion.usage.prompt_tokens,
+                             completion_tokens=completion.usage.completion_tokens)
+        except Exception:
+            metrics.LLM_ERRORS.inc(model=self.model_name)
+            raise
+        self.record_round(completion.usage, time.perf_counter() - start)
         
         response = completion.choices[0].message.content
 
@@ -89,8 +107,19 @@ class LLM():
             return self.function_call(tool_calls)
         else:
             logger.critical(f"[LLM] Response: {response}")
+            if self.stats:
+                self.stats.finish()
             return response
     
+    def record_round(self, usage, duration: float):
+        """Record token usage and latency of one chat completion round."""
+        metrics.LLM_ROUND_DURATION.observe(duration, model=self.model_name)
+        if usage is not None:
+            metrics.LLM_TOKENS.inc(usage.prompt_tokens or 0, model=self.model_name, type='prompt')
+            metrics.LLM_TOKENS.inc(usage.completion_tokens or 0, model=self.model_name, type='completion')
+        if self.stats:
+            self.stats.add_round(usage, duration)
+
     def execute_tool(self, tool_name: str, args: Dict[str, Any]) -> str:
         """Execute a Kubernetes-related tool with the provided arguments.
 
@@ -105,131 +134,72 @@ class LLM():
         Raises:
             Exception: If tool execution fails
         """
-        try:
-            tool_handlers = {
-                'list_configmap_names': lambda: Configuration.list_configmap_names(
-                    namespace=args.get('namespace')
-                ),
-
-                'get_configmap_details': lambda: Configuration.get_configmap_details(
-                    configmap_name=args['configmap_name'],
-                    namespace=args.get('namespace', 'default'),
-                    deep=args.get('deep', False)
-                ),
-
-                'list_secret_names': lambda: Configuration.list_secret_names(
-                    namespace=args.get('namespace', 'default')
-                ),
-
-                'get_secret_details': lambda: Configuration.get_secret_details(
-                    secret_name=args['secret_name'],
-                    namespace=args.get('namespace', 'default'),
-                    deep=args.get('deep', False)
-                ),    
-
-
-
-
-
-                'list_deployments': lambda: Deployment.list_deployments(
-                    namespace=args.get('namespace', 'default')
-                ),
-
-                'get_deployment_details': lambda: Deployment.get_deployment_details(
-                    deployment_name=args['deployment_name'],
-                    namespace=args.get('namespace', 'default'),
-                    deep=args.get('deep', False)
-                ),
-
-
-
-
-
-                'list_all_namespaces': lambda: Namespace.list_all_namespaces(),
-
-                'get_namespace_details': lambda: Namespace.get_namespace_details(
-                    namespace=args['namespace'],
-                    deep=args.get('deep', False)
-                ),
-
-
-
-
-
-                'get_cluster_version_info': lambda: Node.get_cluster_version_info(),
-
-                'list_all_nodes': lambda: Node.list_all_nodes(),
-
-                'get_node_details': lambda: Node.get_node_details(
-                    node_name=args['node_name'],
-                    deep=args.get('deep', False)
-                ),
-
-
-
-                'list_pods_in_namespace': lambda: Pod.list_pods_in_namespace(
-                    namespace=args.get('namespace', 'default')
-                ),
-
-                'get_pod_details': lambda: Pod.get_pod_details(
-                    pod_name=args['pod_name'],
-                    namespace=args.get('namespace', 'default'),
-                    deep=args.get('deep', False)
-                ),
+        tool = registry.TOOLS.get(tool_name)
+        if tool is None:
+            return f"Tool '{tool_name}' not implemented"
 
-
-                'list_daemonset_names': lambda: Workload.list_daemonset_names(
-                    namespace=args.get('namespace', 'default')
-                ),
-
-                'get_daemonset_details': lambda: Workload.get_daemonset_details(
-                    daemonset_name=args['daemonset_name'],
-                    namespace=args.get('namespace', 'default'),
-                    deep=args.get('deep', False)
-                ),
-
-                'list_statefulset_names': lambda: Workload.list_statefulset_names(
-                    namespace=args.get('namespace', 'default')
-                ),
-
-                'get_statefulset_details': lambda: Workload.get_statefulset_details(
-                    statefulset_name=args['statefulset_name'],
-                    namespace=args.get('namespace', 'default'),
-                    deep=args.get('deep', False)
-                ),    
-
-                'list_replicaset_names': lambda: Workload.list_replicaset_names(
-                    namespace=args.get('namespace', 'default')
-                ),
-
-                'get_replicaset_details': lambda: Workload.get_replicaset_details(
-                    replicaset_name=args['replicaset_name'],
-                    namespace=args.get('namespace', 'default'),
-                    deep=args.get('deep', False)
-                ),
-
-                'list_service_names': lambda: Service.list_service_names(
-                    namespace=args.get('namespace', 'default')
-                ), 
-
-                'get_service_details': lambda: Service.get_service_details(
-                    service_name=args['service_name'],
-                    namespace=args.get('namespace', 'default'),
-                    deep=args.get('deep', False)
-                )
-            }
-
-            if tool_name not in tool_handlers:
-                return f"Tool '{tool_name}' not implemented"
-
-            result = tool_handlers[tool_name]()
-            return json.dumps(result) if isinstance(result, dict) else result
+        try:
+            start = time.perf_counter()
+            with tracing.span('tool', tool=tool_name) as span:
+                result = tool(args)
+                result = json.dumps(result) if isinstance(result, dict) else result
+                if span:
+                    span.set(output_bytes=len(result))
+
+            metrics.TOOL_DURATION.observe(time.perf_counter() - start, tool=tool_name)
+            metrics.TOOL_OUTPUT_BYTES.observe(len(result), tool=tool_name)
+            if result.startswith(("[ERROR]", "Error")):
+                metrics.TOOL_ERRORS.inc(tool=tool_name)
+            return result
 
         except Exception as e:
+            metrics.TOOL_ERRORS.inc(tool=tool_name)
             return f"Error executing {tool_name}: {str(e)}"
     
     
 
+    def run_tool_call(self, tool_call_id: str, tool_name: str, arguments: str) -> str:
+        """Execute a single tool call and append its result to the conversation.
+
+        Args:
+            tool_call_id (str): ID of the tool call assigned by the LLM
+            tool_name (str): Name of the tool to execute
+            arguments (str): JSON encoded arguments for the tool
+
+        Returns:
+            str: The tool response (or error message) appended to the conversation
+        """
+        start = time.perf_counter()
+        with api_timer() as timer:
+            try:
+                logger.critical(f"[FUNCTION CALL] Executing tool: {tool_name} ({arguments})")
+
+                # Parse the function arguments
+                function_args = json.loads(arguments)
+
+                # Execute the tool and get the response
+                function_response = self.execute_tool(tool_name, function_args)
+                logger.critical("[RESPONSE] %s", function_response, extra={'payload': True})
+
+            except Exception as e:
+                # Handle any errors during function execution
+                logger.critical(f"[FUNCTION CALL] [ERROR] Error executing {tool_name}: {str(e)}")
+                function_response = f"Error executing {tool_name}: {str(e)}"
+
+        if self.stats:
+            self.stats.add_tool_call(ToolCallStats(
+                tool_name, arguments, time.perf_counter() - start, timer.calls, timer.seconds, function_response
+            ))
+
+        # Append the response to messages
+        self.messages.append({
+            "tool_call_id": tool_call_id,
+            "role": "tool",
+            "name": tool_name,
+            "content": function_response,
+        })
+        return function_response
+
     def function_call(self, tool_calls):
         """Process and execute tool calls requested by the LLM.
 
@@ -246,41 +216,115 @@ class LLM():
             This method automatically adds tool responses to the conversation history
             and handles error cases by including error messages in the conversation.
         """
+        # Every tool call id needs a tool message, so a call without a name gets the unknown tool reply
         for tool_call in tool_calls:
-            if tool_call.function.name:
-                try:
-                    logger.critical(f"[FUNCTION CALL] Executing tool: {tool_call.function.name} ({tool_call.function.arguments})")
-                    # logger.critical(f"[FUNCTION CALL] Arguments: {tool_call.function.arguments}")
-                
-                    # Parse the function arguments
-                    function_args = json.loads(tool_call.function.arguments)
-                    
-                    # Execute the tool and get the response
-                    function_response = self.execute_tool(
-                        tool_call.function.name,
-                        function_args
-                    )
-                    
-                    # Append the response to messages
-                    self.messages.append({
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": tool_call.function.name,
-                        "content": function_response,
-                    })
-                    logger.critical(f"[RESPONSE] {function_response}")
-
-                except Exception as e:
-                    # Handle any errors during function execution
-                    logger.critical(f"[FUNCTION CALL] [ERROR] Error executing {tool_call.function.name}: {str(e)}")
-                    error_response = f"Error executing {tool_call.function.name}: {str(e)}"
-                    self.messages.append({
-                        "tool_call_id": tool_call.id,
-                        "role": "tool",
-                        "name": tool_call.function.name,
-                        "content": error_response,
-                    })
-                
+            self.run_tool_call(tool_call.id, tool_call.function.name or '', tool_call.function.arguments)
+
         return self.call(tool_choice='auto')
-    
-    
\ No newline at end of file
+
+    def stream(self, prompt=None, tool_choice='auto'):
+        """Streaming variant of `call` that yields progress events as they happen.
+
+        Tool calls are announced with `tool_call_start` / `tool_call_end` events and
+        the final answer is streamed as `token` events straight from the model,
+        followed by a single `done` event carrying the full answer.
+
+        Args:
+            prompt (str, optional): User input prompt. If provided, starts a new conversation.
+            tool_choice (str, optional): Strategy for tool selection. Defaults to 'auto'.
+
+        Yields:
+            dict: Event with an `event` key and event specific fields
+        """
+        if prompt:
+            self.messages = [{'role': 'system', 'content': system_prompt.SYSTEM_PROMPT}]
+            logger.critical("-"*100)
+            logger.critical(f"[USER] Query: {prompt}")
+            tool_choice = 'required'
+            self.messages.append({'role': 'user', 'content': prompt})
+            self.stats = QueryStats(prompt)
+
+        while True:
+            start = time.perf_counter()
+            content = []
+            tool_calls = {}
+            usage = None
+            try:
+                with tracing.span('llm.chat_completion', model=self.model_name, messages=len(self.messages),
+                                  stream=True):
+                    chunks = resilience.backend('openai').call(
+                                    self.model.chat.completions.create,
+                                    model=self.model_name,
+                                    messages=self.messages,
+                                    tools=self.tools,
+                                    tool_choice=tool_choice,
+                                    temperature=self.temperature,
+                                    stream=True,
+                                    stream_options={'include_usage': True}
+                                )
+
+                    for chunk in chunks:
+                        # The usage chunk comes last, with no choices
+                        if getattr(chunk, 'usage', None):
+                            usage = chunk.usage
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta
+
+                        if delta.content:
+                            content.append(delta.content)
+                            yield {'event': 'token', 'content': delta.content}
+
+                        # Tool calls arrive as fragments keyed by index
+                        for tc in delta.tool_calls or []:
+                            call = tool_calls.setdefault(tc.index, {'id': None, 'name': '', 'arguments': ''})
+                            if tc.id:
+                                call['id'] = tc.id
+                            if tc.function and tc.function.name:
+                                call['name'] += tc.function.name
+                            if tc.function and tc.function.arguments:
+                                call['arguments'] += tc.function.arguments
+            except Exception:
+                metrics.LLM_ERRORS.inc(model=self.model_name)
+                raise
+
+            response = ''.join(content)
+            self.record_round(usage, time.perf_counter() - start)
+
+            if not tool_calls:
+                logger.critical(f"[LLM] Response: {response}")
+                event = {'event': 'done', 'answer': response}
+                if self.stats:
+                    self.stats.finish()
+                    event['stats'] = self.stats.to_dict()
+                yield event
+                return
+
+            calls = [tool_calls[i] for i in sorted(tool_calls)]
+            self.messages.append({
+                'role': 'assistant',
+                'content': response or None,
+                'tool_calls': [
+                    {'id': c['id'], 'type': 'function',
+                     'function': {'name': c['name'], 'arguments': c['arguments']}}
+                    for c in calls
+                ]
+            })
+
+            for c in calls:
+                if not c['name']:
+                    # Still answered, as the next request needs a tool message for every tool call id
+                    self.run_tool_call(c['id'], c['name'], c['arguments'])
+                    continue
+                yield {'event': 'tool_call_start', 'id': c['id'], 'name': c['name'], 'arguments': c['arguments']}
+                start = time.perf_counter()
+                function_response = self.run_tool_call(c['id'], c['name'], c['arguments'])
+                yield {
+                    'event': 'tool_call_end',
+                    'id': c['id'],
+                    'name': c['name'],
+                    'duration': round(time.perf_counter() - start, 4),
+                    'size': len(function_response)
+                }
+
+            tool_choice = 'auto'
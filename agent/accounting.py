@@ -0,0 +1,138 @@
+"""
+Agent Accounting Module
+Tracks token usage and latency per query and per tool call, aggregated in memory across queries.
+"""
+
+import threading
+import time
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English and markdown)."""
+    return (len(text) + 3) // 4
+
+
+class ToolCallStats:
+    """Cost of a single tool call."""
+
+    __slots__ = ('name', 'arguments', 'duration', 'k8s_calls', 'k8s_time', 'output_bytes', 'output_tokens')
+
+    def __init__(self, name: str, arguments: str, duration: float, k8s_calls: int, k8s_time: float, output: str):
+        self.name = name
+        self.arguments = arguments
+        self.duration = duration
+        self.k8s_calls = k8s_calls
+        self.k8s_time = k8s_time
+        self.output_bytes = len(output.encode())
+        self.output_tokens = estimate_tokens(output)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "arguments": self.arguments,
+            "duration": round(self.duration, 4),
+            "k8s_calls": self.k8s_calls,
+            "k8s_time": round(self.k8s_time, 4),
+            "output_bytes": self.output_bytes,
+            "output_tokens": self.output_tokens,
+        }
+
+
+class QueryStats:
+    """Token usage and timings of one query across all of its LLM rounds."""
+
+    def __init__(self, query: str):
+        self.query = query
+        self.started = time.perf_counter()
+        self.duration = None
+        self.rounds = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_time = 0.0
+        self.tool_calls = []
+
+    def add_round(self, usage, duration: float):
+        self.rounds += 1
+        self.llm_time += duration
+        if usage is not None:
+            self.prompt_tokens += usage.prompt_tokens or 0
+            self.completion_tokens += usage.completion_tokens or 0
+
+    def add_tool_call(self, tool_call: ToolCallStats):
+        self.tool_calls.append(tool_call)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+        usage_totals.add(self)
+
+    @property
+    def k8s_time(self) -> float:
+        return sum(t.k8s_time for t in self.tool_calls)
+
+    def to_dict(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "llm_time": round(self.llm_time, 4),
+            "k8s_time": round(self.k8s_time, 4),
+            "duration": round(self.duration or 0.0, 4),
+            "tool_calls": [t.to_dict() for t in self.tool_calls],
+        }
+
+
+class UsageTotals:
+    """In-memory totals across every finished query, broken down per tool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.queries = 0
+            self.rounds = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.llm_time = 0.0
+            self.tools = {}
+
+    def add(self, stats: QueryStats):
+        with self._lock:
+            self.queries += 1
+            self.rounds += stats.rounds
+            self.prompt_tokens += stats.prompt_tokens
+            self.completion_tokens += stats.completion_tokens
+            self.llm_time += stats.llm_time
+            for t in stats.tool_calls:
+                tool = self.tools.setdefault(t.name, {
+                    "calls": 0, "duration": 0.0, "k8s_calls": 0, "k8s_time": 0.0,
+                    "output_bytes": 0, "output_tokens": 0
+                })
+                tool["calls"] += 1
+                tool["duration"] += t.duration
+                tool["k8s_calls"] += t.k8s_calls
+                tool["k8s_time"] += t.k8s_time
+                tool["output_bytes"] += t.output_bytes
+                tool["output_tokens"] += t.output_tokens
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            tools = {
+                name: dict(
+                    {k: round(v, 4) if isinstance(v, float) else v for k, v in tool.items()},
+                    avg_output_tokens=tool["output_tokens"] // tool["calls"]
+                )
+                for name, tool in sorted(self.tools.items(), key=lambda kv: -kv[1]["output_tokens"])
+            }
+            return {
+                "queries": self.queries,
+                "rounds": self.rounds,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "llm_time": round(self.llm_time, 4),
+                "tools": tools,
+            }
+
+
+usage_totals = UsageTotals()
@@ -0,0 +1,68 @@
+"""
+Startup Benchmark
+Measures cold import time of the server (`import main`) in fresh interpreters, with no
+cluster reachable, and lists the slowest imports.
+
+Usage:
+    python -m bench.bench_startup
+    python -m bench.bench_startup --runs 10 --max-seconds 0.5   # exit 1 when over budget
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    # Startup must not depend on a cluster or an API key
+    env['KUBECONFIG'] = os.path.join(ROOT, 'does-not-exist')
+    env.setdefault('OPENAI_API_KEY', 'unused')
+    env['PYTHONDONTWRITEBYTECODE'] = '1'
+    return env
+
+
+def time_import(module: str) -> float:
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=_env(),
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, top: int) -> list:
+    """(cumulative seconds, module) for the `top` slowest imports, from -X importtime."""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], cwd=ROOT, env=_env(),
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        rows.append((int(cumulative) / 1e6, name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark server cold start")
+    parser.add_argument('--module', default='main')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--max-seconds', type=float, help="Fail when the median import time exceeds this")
+    args = parser.parse_args()
+
+    timings = [time_import(args.module) for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(f"# import {args.module}: median {median:.3f}s, min {min(timings):.3f}s, max {max(timings):.3f}s")
+    print("")
+    print("| Cumulative (s) | Module |")
+    print("|----------------|--------|")
+    for seconds, name in slowest_imports(args.module, args.top):
+        print(f"| {seconds:.3f} | {name} |")
+
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"[REGRESSION] import {args.module} took {median:.3f}s (budget {args.max_seconds}s)")
+        sys.exit(1)
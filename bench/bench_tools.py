@@ -0,0 +1,242 @@
+"""
+Tool Scaling Benchmark
+Runs every src/ tool against synthetic clusters of increasing size served by the fake API
+server, reporting latency, peak memory and output size per tool.
+
+Usage:
+    python -m bench.bench_tools                         # 100, 10k and 100k pods
+    python -m bench.bench_tools --sizes 100 1000 --save bench.json
+    python -m bench.bench_tools --compare bench.json    # exit 1 on regressions
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_apiserver import SyntheticCluster, serve, write_kubeconfig
+
+DEFAULT_SIZES = [100, 10_000, 100_000]
+
+
+def cases(cluster: SyntheticCluster):
+    """(module, function, kwargs) for every tool, pointed at objects that exist in `cluster`."""
+    pod = cluster.pod_name(0)
+    return [
+        ('Pod', 'list_pods_in_namespace', {'namespace': 'default'}),
+        ('Pod', 'get_pod_details', {'pod_name': pod}),
+        ('Pod', 'get_pod_details', {'pod_name': pod, 'deep': True}),
+        ('Service', 'list_service_names', {'namespace': 'default'}),
+        ('Service', 'get_service_details', {'service_name': 'app-0'}),
+        ('Service', 'get_service_details', {'service_name': 'app-0', 'deep': True}),
+        ('Deployment', 'list_deployments', {'namespace': 'default'}),
+        ('Deployment', 'get_deployment_details', {'deployment_name': 'app-0'}),
+        ('Deployment', 'get_deployment_details', {'deployment_name': 'app-0', 'deep': True}),
+        ('Workload', 'list_replicaset_names', {'namespace': 'default'}),
+        ('Workload', 'get_replicaset_details', {'replicaset_name': cluster.replicaset_name(0)}),
+        ('Workload', 'list_statefulset_names', {'namespace': 'default'}),
+        ('Workload', 'list_daemonset_names', {'namespace': 'default'}),
+        ('Configuration', 'list_configmap_names', {'namespace': 'default'}),
+        ('Configuration', 'get_configmap_details', {'configmap_name': 'app-0-config'}),
+        ('Configuration', 'list_secret_names', {'namespace': 'default'}),
+        ('Configuration', 'get_secret_details', {'secret_name': 'app-0-secret'}),
+        ('Namespace', 'list_all_namespaces', {}),
+        ('Namespace', 'get_namespace_details', {'namespace': 'default'}),
+        ('Namespace', 'get_namespace_details', {'namespace': 'default', 'deep': True}),
+        ('Node', 'get_cluster_version_info', {}),
+        ('Node', 'list_all_nodes', {}),
+        ('Node', 'get_node_details', {'node_name': 'node-0'}),
+        ('Node', 'get_pod_placement', {'namespace': 'default'}),
+        ('Node', 'list_clusters', {}),
+        ('Workload', 'get_ownership', {'kind': 'Pod', 'name': pod}),
+        ('Usage', 'get_top_resource_usage', {'kind': 'pod', 'metric': 'memory'}),
+        ('Usage', 'get_resource_usage_trend', {'name': pod}),
+    ]
+
+
+def store_cases(cluster: SyntheticCluster):
+    """(module, function, kwargs) of the tools that need the object store, run once it is synced from `cluster`."""
+    return [
+        ('Changes', 'list_changes', {'since': '1h'}),
+        ('Changes', 'list_changes', {'since': '1h', 'namespace': 'default', 'kind': 'Pod'}),
+    ]
+
+
+# Tools without a case, and why
+SKIPPED = {
+    'get_statefulset_details': "the fake API server serves no StatefulSets",
+    'get_daemonset_details': "the fake API server serves no DaemonSets",
+}
+
+
+def check_cases(cluster: SyntheticCluster):
+    """Fails when a registered tool has neither a case nor a SKIPPED reason, so new tools get benchmarked."""
+    from src import registry
+    covered = {function for _, function, _ in cases(cluster) + store_cases(cluster)}
+    missing = sorted(set(registry.load_tools()) - covered - set(SKIPPED))
+    if missing:
+        raise SystemExit(f"[ERROR] No benchmark case for: {', '.join(missing)}. Add one to cases() or SKIPPED.")
+
+
+def case_name(function: str, kwargs: dict) -> str:
+    if kwargs.get('deep'):
+        return f"{function}(deep)"
+    return f"{function}(filtered)" if function == 'list_changes' and kwargs.get('kind') else function
+
+
+def _wait_synced(local, timeout: float = 600):
+    deadline = time.time() + timeout
+    while not all(s['resource_version'] for s in local.stats().values()):
+        if time.time() > deadline:
+            raise RuntimeError("Object store did not sync from the fake API server")
+        time.sleep(0.1)
+
+
+def _run_cases(cases_, size: int, repeat: int, results: dict):
+    for module_name, function, kwargs in cases_:
+        fn = getattr(importlib.import_module(f"src.{module_name}"), function)
+        name = case_name(function, kwargs)
+        results.setdefault(name, {})[str(size)] = measure(fn, kwargs, repeat)
+        print(f"  {size:>7} pods  {name:<32} {results[name][str(size)]['latency_ms']:>10.2f} ms",
+              file=sys.stderr)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"{url}/version", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Fake API server at {url} did not start")
+
+
+def measure(fn, kwargs: dict, repeat: int) -> dict:
+    """Median latency over `repeat` runs, plus peak traced memory of one extra run."""
+    # Warm-up run so one-time imports, config loading and connection setup don't count
+    fn(**kwargs)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = fn(**kwargs)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn(**kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "latency_ms": round(statistics.median(timings) * 1000, 2),
+        "peak_mib": round(peak / 2**20, 2),
+        "output_bytes": len(output.encode()),
+        "output_tokens": len(output) // 4
+    }
+
+
+def run(sizes, repeat: int = 3) -> dict:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    kubeconfig = os.path.join(tempfile.mkdtemp(), 'config')
+    write_kubeconfig(kubeconfig, url)
+    # Must be set before the first tool call, which loads the kubeconfig; usage is sampled on demand only
+    os.environ['KUBECONFIG'] = kubeconfig
+    os.environ['AK15_USAGE_INTERVAL'] = '0'
+    from src import store, usage_sampler
+    # Keep tool logging in the measurement, but out of the terminal
+    logging.getLogger().addHandler(logging.NullHandler())
+
+    results = {}
+    for size in sizes:
+        cluster = SyntheticCluster(pods=size)
+        server = multiprocessing.Process(target=serve, args=(cluster, '127.0.0.1', port), daemon=True)
+        server.start()
+        try:
+            _wait_ready(url)
+            check_cases(cluster)
+            # A fresh usage history per size, taken from this cluster by the first usage tool call
+            usage_sampler._sampler = None
+            _run_cases(cases(cluster), size, repeat, results)
+
+            local = store.load(os.path.join(tempfile.mkdtemp(), 'store.db'))
+            local.watch()
+            try:
+                _wait_synced(local)
+                _run_cases(store_cases(cluster), size, repeat, results)
+            finally:
+                store.load(None)
+        finally:
+            server.terminate()
+            server.join()
+    return results
+
+
+def report(results: dict, sizes):
+    header = f"| Tool | " + " | ".join(f"{s} pods: ms / MiB / tokens" for s in sizes) + " |"
+    lines = [header, "|" + "---|" * (len(sizes) + 1)]
+    for name, by_size in results.items():
+        cells = []
+        for s in sizes:
+            r = by_size.get(str(s))
+            cells.append(f"{r['latency_ms']} / {r['peak_mib']} / {r['output_tokens']}" if r else "-")
+        lines.append(f"| {name} | " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """Lists every metric that grew by more than `threshold` (ratio) over the baseline."""
+    regressions = []
+    for name, by_size in results.items():
+        for size, metrics in by_size.items():
+            base = baseline.get(name, {}).get(size)
+            if not base:
+                continue
+            for metric in ('latency_ms', 'peak_mib', 'output_bytes'):
+                # Ignore noise on tiny values
+                if base[metric] > 1 and metrics[metric] > base[metric] * threshold:
+                    regressions.append(f"{name} @ {size} pods: {metric} {base[metric]} -> {metrics[metric]}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark src/ tools against synthetic clusters")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', help="Write results as JSON to this file")
+    parser.add_argument('--compare', help="Baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help="Allowed ratio over baseline before a metric counts as a regression")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    print(report(results, args.sizes))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"[REGRESSION] {r}")
+        sys.exit(1 if regressions else 0)
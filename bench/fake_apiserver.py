@@ -0,0 +1,550 @@
+"""
+Fake Kubernetes API Server
+Serves list/read/log/event/watch endpoints for a synthetic cluster so the src/ tools can be run
+and benchmarked without a real cluster. `/debug/requests` returns how many list, read and
+watch requests were served per resource. Node and pod usage (metrics.k8s.io) varies slowly
+over time.
+
+Objects are generated on demand from their index, so a 100k-pod cluster costs almost no
+memory until it is listed.
+
+Usage:
+    python -m bench.fake_apiserver --pods 10000 --port 18080 --kubeconfig /tmp/fake-kubeconfig
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TIMESTAMP = "2024-01-01T00:00:00Z"
+RESOURCE_VERSION = "1"
+MAX_WATCH_SECONDS = 60
+
+
+def _hash(value: str, length: int = 10) -> str:
+    return hashlib.sha1(value.encode()).hexdigest()[:length]
+
+
+class SyntheticCluster:
+    """Deterministic synthetic cluster built from a handful of size parameters.
+
+    Every Deployment owns one ReplicaSet with `replicas` pods, and gets a Service,
+    a ConfigMap and a Secret of the same name. Pods are spread round-robin over nodes.
+    """
+
+    def __init__(self, pods: int = 100, namespaces: int = 10, replicas: int = 10,
+                 pods_per_node: int = 30, log_lines: int = 200):
+        self.pod_count = pods
+        self.replicas = replicas
+        self.log_lines = log_lines
+        self.namespaces = ['default'] + [f'ns-{i}' for i in range(1, max(namespaces, 1))]
+        self.deployment_count = max(1, -(-pods // replicas))
+        self.node_count = max(1, -(-pods // pods_per_node))
+
+        self.pod_index = {self.pod_name(i): i for i in range(pods)}
+        self.deployments_by_ns = {ns: [] for ns in self.namespaces}
+        for d in range(self.deployment_count):
+            self.deployments_by_ns[self.deployment_namespace(d)].append(d)
+
+    # Naming
+
+    def deployment_namespace(self, d: int) -> str:
+        return self.namespaces[d % len(self.namespaces)]
+
+    def deployment_name(self, d: int) -> str:
+        return f"app-{d}"
+
+    def replicaset_name(self, d: int) -> str:
+        return f"app-{d}-{_hash(f'rs-{d}')}"
+
+    def pod_name(self, i: int) -> str:
+        return f"{self.replicaset_name(i // self.replicas)}-{_hash(f'pod-{i}', 5)}"
+
+    def node_name(self, n: int) -> str:
+        return f"node-{n}"
+
+    def _deployment_index(self, name: str, suffix: str = ''):
+        m = re.fullmatch(rf"app-(\d+){suffix}", name)
+        if not m or int(m.group(1)) >= self.deployment_count:
+            return None
+        return int(m.group(1))
+
+    # Object builders
+
+    def _metadata(self, name, namespace=None, labels=None, owner=None):
+        meta = {
+            "name": name,
+            "uid": _hash(f"{namespace}/{name}", 32),
+            "resourceVersion": RESOURCE_VERSION,
+            "creationTimestamp": TIMESTAMP,
+            "labels": labels or {},
+        }
+        if namespace:
+            meta["namespace"] = namespace
+        if owner:
+            meta["ownerReferences"] = [{
+                "apiVersion": "apps/v1", "kind": owner[0], "name": owner[1],
+                "uid": _hash(f"{namespace}/{owner[1]}", 32), "controller": True
+            }]
+        return meta
+
+    def _template(self, d: int):
+        return {
+            "metadata": {"labels": {"app": self.deployment_name(d)}},
+            "spec": {"containers": [{
+                "name": "app",
+                "image": f"registry.local/app-{d}:1.0.{d % 7}",
+                "ports": [{"containerPort": 8080, "protocol": "TCP"}],
+                "resources": {
+                    "requests": {"cpu": "100m", "memory": "128Mi"},
+                    "limits": {"cpu": "500m", "memory": "256Mi"}
+                }
+            }]}
+        }
+
+    def pod(self, i: int):
+        d = i // self.replicas
+        ns = self.deployment_namespace(d)
+        template = self._template(d)
+        labels = dict(template["metadata"]["labels"], **{"pod-template-hash": _hash(f'rs-{d}')})
+        return {
+            "apiVersion": "v1",
+            "kind": "Pod",
+            "metadata": self._metadata(self.pod_name(i), ns, labels, ("ReplicaSet", self.replicaset_name(d))),
+            "spec": dict(template["spec"], nodeName=self.node_name(i % self.node_count)),
+            "status": {
+                "phase": "Running",
+                "hostIP": f"10.0.{(i % self.node_count) // 256}.{(i % self.node_count) % 256}",
+                "podIP": f"10.{64 + i // 65536}.{(i // 256) % 256}.{i % 256}",
+                "conditions": [
+                    {"type": "Ready", "status": "True"},
+                    {"type": "PodScheduled", "status": "True"}
+                ],
+                "containerStatuses": [{
+                    "name": "app",
+                    "image": template["spec"]["containers"][0]["image"],
+                    "imageID": "",
+                    "ready": True,
+                    "restartCount": i % 3,
+                    "state": {"running": {"startedAt": TIMESTAMP}}
+                }]
+            }
+        }
+
+    def deployment(self, d: int):
+        name = self.deployment_name(d)
+        return {
+            "apiVersion": "apps/v1",
+            "kind": "Deployment",
+            "metadata": self._metadata(name, self.deployment_namespace(d), {"app": name}),
+            "spec": {
+                "replicas": self.replicas,
+                "selector": {"matchLabels": {"app": name}},
+                "template": self._template(d)
+            },
+            "status": {
+                "replicas": self.replicas, "availableReplicas": self.replicas,
+                "updatedReplicas": self.replicas, "readyReplicas": self.replicas,
+                "conditions": [{"type": "Available", "status": "True", "reason": "MinimumReplicasAvailable",
+                                "message": "Deployment has minimum availability."}]
+            }
+        }
+
+    def replicaset(self, d: int):
+        name = self.deployment_name(d)
+        return {
+            "apiVersion": "apps/v1",
+            "kind": "ReplicaSet",
+            "metadata": self._metadata(self.replicaset_name(d), self.deployment_namespace(d),
+                                       {"app": name}, ("Deployment", name)),
+            "spec": {
+                "replicas": self.replicas,
+                "selector": {"matchLabels": {"app": name}},
+                "template": self._template(d)
+            },
+            "status": {"replicas": self.replicas, "readyReplicas": self.replicas,
+                       "availableReplicas": self.replicas}
+        }
+
+    def service(self, d: int):
+        name = self.deployment_name(d)
+        return {
+            "apiVersion": "v1",
+            "kind": "Service",
+            "metadata": self._metadata(name, self.deployment_namespace(d), {"app": name}),
+            "spec": {
+                "type": "ClusterIP",
+                "clusterIP": f"10.96.{d // 256}.{d % 256}",
+                "selector": {"app": name},
+                "ports": [{"port": 80, "targetPort": 8080, "protocol": "TCP"}]
+            }
+        }
+
+    def endpointslice(self, d: int):
+        name = self.deployment_name(d)
+        pods = range(d * self.replicas, min((d + 1) * self.replicas, self.pod_count))
+        return {
+            "apiVersion": "discovery.k8s.io/v1",
+            "kind": "EndpointSlice",
+            "metadata": self._metadata(f"{name}-{_hash(f'eps-{d}', 5)}", self.deployment_namespace(d),
+                                       {"kubernetes.io/service-name": name}, ("Service", name)),
+            "addressType": "IPv4",
+            "endpoints": [{
+                "addresses": [self.pod(i)["status"]["podIP"]],
+                "conditions": {"ready": True, "serving": True, "terminating": False},
+                "nodeName": self.node_name(i % self.node_count),
+                "targetRef": {"kind": "Pod", "name": self.pod_name(i), "namespace": self.deployment_namespace(d)}
+            } for i in pods],
+            "ports": [{"port": 8080, "protocol": "TCP"}]
+        }
+
+    def configmap(self, d: int):
+        return {
+            "apiVersion": "v1",
+            "kind": "ConfigMap",
+            "metadata": self._metadata(f"{self.deployment_name(d)}-config", self.deployment_namespace(d)),
+            "data": {"app.properties": "\n".join(f"key{k}=value{k}" for k in range(20))}
+        }
+
+    def secret(self, d: int):
+        return {
+            "apiVersion": "v1",
+            "kind": "Secret",
+            "type": "Opaque",
+            "metadata": self._metadata(f"{self.deployment_name(d)}-secret", self.deployment_namespace(d)),
+            "data": {"username": "YWRtaW4=", "password": "c2VjcmV0"}
+        }
+
+    def node(self, n: int):
+        name = self.node_name(n)
+        return {
+            "apiVersion": "v1",
+            "kind": "Node",
+            "metadata": self._metadata(name, labels={"kubernetes.io/hostname": name,
+                                                     "node-role.kubernetes.io/worker": ""}),
+            "spec": {},
+            "status": {
+                "conditions": [{"type": "Ready", "status": "True", "reason": "KubeletReady",
+                                "message": "kubelet is posting ready status"}],
+                "addresses": [{"type": "InternalIP", "address": f"10.0.{n // 256}.{n % 256}"},
+                              {"type": "Hostname", "address": name}],
+                "capacity": {"cpu": "8", "memory": "32Gi", "pods": "110"},
+                "allocatable": {"cpu": "7800m", "memory": "30Gi", "pods": "110"},
+                "nodeInfo": {
+                    "architecture": "amd64", "bootID": "", "containerRuntimeVersion": "containerd://1.7.0",
+                    "kernelVersion": "6.1.0", "kubeProxyVersion": "v1.29.0", "kubeletVersion": "v1.29.0",
+                    "machineID": "", "operatingSystem": "linux", "osImage": "Ubuntu 22.04", "systemUUID": ""
+                }
+            }
+        }
+
+    def namespace(self, name: str):
+        return {
+            "apiVersion": "v1",
+            "kind": "Namespace",
+            "metadata": self._metadata(name, labels={"kubernetes.io/metadata.name": name}),
+            "status": {"phase": "Active"}
+        }
+
+    def event(self, i: int):
+        pod = self.pod_name(i)
+        ns = self.deployment_namespace(i // self.replicas)
+        return {
+            "apiVersion": "v1",
+            "kind": "Event",
+            "metadata": self._metadata(f"{pod}.{_hash(pod, 16)}", ns),
+            "involvedObject": {"kind": "Pod", "name": pod, "namespace": ns},
+            "reason": "Scheduled",
+            "message": f"Successfully assigned {ns}/{pod} to {self.node_name(i % self.node_count)}",
+            "type": "Normal",
+            "count": 1,
+            "firstTimestamp": TIMESTAMP,
+            "lastTimestamp": TIMESTAMP
+        }
+
+    def log(self, i: int) -> str:
+        pod = self.pod_name(i)
+        return "\n".join(f"{TIMESTAMP} INFO {pod} handled request {k} in {k % 97}ms"
+                         for k in range(self.log_lines))
+
+    def pod_metrics(self, i: int, now: float):
+        d = i // self.replicas
+        wave = math.sin(now / 300 + i)
+        return {
+            "metadata": {"name": self.pod_name(i), "namespace": self.deployment_namespace(d)},
+            "timestamp": TIMESTAMP, "window": "30s",
+            "containers": [{"name": "app", "usage": {"cpu": f"{int(20 + (i * 37) % 300 + 15 * wave)}m",
+                                                     "memory": f"{64 + (i * 53) % 192 + int(8 * wave)}Mi"}}]
+        }
+
+    def node_metrics(self, n: int, now: float):
+        wave = math.sin(now / 300 + n)
+        return {
+            "metadata": {"name": self.node_name(n)},
+            "timestamp": TIMESTAMP, "window": "30s",
+            "usage": {"cpu": f"{int(1500 + (n * 911) % 5000 + 200 * wave)}m",
+                      "memory": f"{8 + (n * 7) % 18 + int(2 * wave)}Gi"}
+        }
+
+    # Collections
+
+    def objects(self, resource: str, namespace: str = None):
+        """Yields every object of `resource`, optionally restricted to one namespace."""
+        deployments = (self.deployments_by_ns.get(namespace, []) if namespace
+                       else range(self.deployment_count))
+        if resource == 'pods':
+            for d in deployments:
+                for i in range(d * self.replicas, min((d + 1) * self.replicas, self.pod_count)):
+                    yield self.pod(i)
+        elif resource == 'events':
+            for d in deployments:
+                for i in range(d * self.replicas, min((d + 1) * self.replicas, self.pod_count)):
+                    yield self.event(i)
+        elif resource in ('deployments', 'replicasets', 'services', 'configmaps', 'secrets', 'endpointslices'):
+            build = getattr(self, resource[:-1])
+            for d in deployments:
+                yield build(d)
+        elif resource == 'nodes':
+            for n in range(self.node_count):
+                yield self.node(n)
+        elif resource == 'namespaces':
+            for ns in self.namespaces:
+                yield self.namespace(ns)
+        # statefulsets, daemonsets and resourcequotas are served empty
+
+    def get(self, resource: str, name: str, namespace: str = None):
+        """Returns a single object, or None if it does not exist."""
+        if resource in ('pods', 'events'):
+            i = self.pod_index.get(name.split('.')[0])
+            if i is None:
+                return None
+            obj = self.pod(i) if resource == 'pods' else self.event(i)
+        elif resource == 'deployments':
+            d = self._deployment_index(name)
+            obj = None if d is None else self.deployment(d)
+        elif resource == 'replicasets':
+            d = self._deployment_index(name, r"-[0-9a-f]{10}")
+            obj = None if d is None or name != self.replicaset_name(d) else self.replicaset(d)
+        elif resource == 'services':
+            d = self._deployment_index(name)
+            obj = None if d is None else self.service(d)
+        elif resource == 'endpointslices':
+            d = self._deployment_index(name, r"-[0-9a-f]{5}")
+            obj = None if d is None or name != self.endpointslice(d)["metadata"]["name"] else self.endpointslice(d)
+        elif resource == 'configmaps':
+            d = self._deployment_index(name, '-config')
+            obj = None if d is None else self.configmap(d)
+        elif resource == 'secrets':
+            d = self._deployment_index(name, '-secret')
+            obj = None if d is None else self.secret(d)
+        elif resource == 'nodes':
+            m = re.fullmatch(r"node-(\d+)", name)
+            return self.node(int(m.group(1))) if m and int(m.group(1)) < self.node_count else None
+        elif resource == 'namespaces':
+            return self.namespace(name) if name in self.namespaces else None
+        else:
+            return None
+
+        if obj is not None and namespace and obj["metadata"]["namespace"] != namespace:
+            return None
+        return obj
+
+
+def _lookup(obj: dict, path: str):
+    for part in path.split('.'):
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(part)
+    return obj
+
+
+def _matches(obj: dict, label_selector: str, field_selector: str) -> bool:
+    labels = obj["metadata"].get("labels") or {}
+    for term in filter(None, (label_selector or '').split(',')):
+        key, _, value = term.partition('=')
+        if labels.get(key) != value:
+            return False
+    for term in filter(None, (field_selector or '').split(',')):
+        key, _, value = term.partition('=')
+        if str(_lookup(obj, key)) != value:
+            return False
+    return True
+
+
+KINDS = {
+    'pods': 'Pod', 'services': 'Service', 'configmaps': 'ConfigMap', 'secrets': 'Secret',
+    'events': 'Event', 'nodes': 'Node', 'namespaces': 'Namespace', 'resourcequotas': 'ResourceQuota',
+    'deployments': 'Deployment', 'replicasets': 'ReplicaSet', 'statefulsets': 'StatefulSet',
+    'daemonsets': 'DaemonSet', 'endpointslices': 'EndpointSlice',
+}
+
+ROUTE = re.compile(
+    r"^/(?:api/v1|apis/(?P<group>[\w.]+/v\w+))"
+    r"(?:/namespaces/(?P<namespace>[^/]+)(?=/))?"
+    r"/(?P<resource>[a-z]+)(?:/(?P<name>[^/]+))?(?P<log>/log)?$"
+)
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    cluster: SyntheticCluster = None
+    requests = Counter()
+    requests_lock = threading.Lock()
+
+    def _count(self, verb: str, resource: str):
+        with self.requests_lock:
+            self.requests[f"{verb} {resource}"] += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body, content_type: str = 'application/json'):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_found(self, resource, name):
+        self._send(404, {
+            "kind": "Status", "apiVersion": "v1", "status": "Failure", "reason": "NotFound", "code": 404,
+            "message": f'{resource} "{name}" not found'
+        })
+
+    def _watch(self, resource: str, query: dict):
+        """Streams a watch with no changes: a bookmark (or 410 for any other resourceVersion), then holds it open."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        if query.get('resourceVersion', RESOURCE_VERSION) != RESOURCE_VERSION:
+            event = {"type": "ERROR", "object": {"kind": "Status", "status": "Failure", "reason": "Expired",
+                                                 "code": 410, "message": "too old resource version"}}
+        else:
+            event = {"type": "BOOKMARK", "object": {"kind": KINDS[resource],
+                                                    "metadata": {"resourceVersion": RESOURCE_VERSION}}}
+        if event["type"] == "ERROR" or query.get('allowWatchBookmarks', '').lower() == 'true':
+            self.wfile.write(json.dumps(event).encode() + b"\n")
+            self.wfile.flush()
+        if event["type"] != "ERROR":
+            time.sleep(min(int(query.get('timeoutSeconds', MAX_WATCH_SECONDS)), MAX_WATCH_SECONDS))
+
+    def _metrics(self, resource: str, namespace: str = None):
+        self._count('list', f"metrics {resource}")
+        now = time.time()
+        if resource == 'nodes':
+            items = [self.cluster.node_metrics(n, now) for n in range(self.cluster.node_count)]
+        elif resource == 'pods':
+            items = [self.cluster.pod_metrics(i, now) for i in range(self.cluster.pod_count)
+                     if namespace is None or self.cluster.deployment_namespace(i // self.cluster.replicas) == namespace]
+        else:
+            return self._send(404, {"kind": "Status", "status": "Failure", "reason": "NotFound", "code": 404})
+        self._send(200, {"apiVersion": "metrics.k8s.io/v1beta1", "kind": f"{KINDS[resource]}MetricsList",
+                         "metadata": {}, "items": items})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path.rstrip('/') == '/version':
+            return self._send(200, {
+                "major": "1", "minor": "29", "gitVersion": "v1.29.0-fake", "gitCommit": "0" * 40,
+                "gitTreeState": "clean", "buildDate": TIMESTAMP, "goVersion": "go1.21", "compiler": "gc",
+                "platform": "linux/amd64"
+            })
+
+        if url.path == '/debug/requests':
+            with self.requests_lock:
+                return self._send(200, dict(self.requests))
+
+        m = ROUTE.match(url.path)
+        if m and (m.group('group') or '').startswith('metrics.k8s.io/') and not m.group('name'):
+            return self._metrics(m.group('resource'), m.group('namespace'))
+        if not m or m.group('resource') not in KINDS:
+            return self._send(404, {"kind": "Status", "status": "Failure", "reason": "NotFound", "code": 404})
+
+        resource, name, namespace = m.group('resource'), m.group('name'), m.group('namespace')
+        if query.get('watch', '').lower() in ('true', '1'):
+            self._count('watch', resource)
+            return self._watch(resource, query)
+        self._count('read' if name else 'list', resource)
+
+        if name:
+            obj = self.cluster.get(resource, name, namespace)
+            if obj is None:
+                return self._not_found(resource, name)
+            if m.group('log'):
+                return self._send(200, self.cluster.log(self.cluster.pod_index[name]).encode(), 'text/plain')
+            if 'as=PartialObjectMetadata;' in self.headers.get('Accept', ''):
+                self._count('metadata', resource)
+                return self._send(200, {"apiVersion": "meta.k8s.io/v1", "kind": "PartialObjectMetadata",
+                                        "metadata": obj["metadata"]})
+            return self._send(200, obj)
+
+        label_selector, field_selector = query.get('labelSelector'), query.get('fieldSelector')
+        if resource == 'events' and field_selector and 'involvedObject.name=' in field_selector:
+            pod = re.search(r"involvedObject\.name=([^,]+)", field_selector).group(1)
+            event = self.cluster.get('events', pod, namespace)
+            items = [event] if event and _matches(event, None, field_selector) else []
+        else:
+            items = [o for o in self.cluster.objects(resource, namespace)
+                     if _matches(o, label_selector, field_selector)]
+
+        if 'as=PartialObjectMetadataList' in self.headers.get('Accept', ''):
+            self._count('metadata', resource)
+            return self._send(200, {
+                "apiVersion": "meta.k8s.io/v1",
+                "kind": "PartialObjectMetadataList",
+                "metadata": {"resourceVersion": RESOURCE_VERSION},
+                "items": [{"apiVersion": "meta.k8s.io/v1", "kind": "PartialObjectMetadata", "metadata": o["metadata"]}
+                          for o in items]
+            })
+
+        group = m.group('group')
+        self._send(200, {
+            "apiVersion": group or "v1",
+            "kind": f"{KINDS[resource]}List",
+            "metadata": {"resourceVersion": RESOURCE_VERSION},
+            "items": items
+        })
+
+
+def write_kubeconfig(path: str, server: str):
+    """Writes a kubeconfig whose current context points at `server`."""
+    with open(path, 'w') as f:
+        json.dump({
+            "apiVersion": "v1",
+            "kind": "Config",
+            "clusters": [{"name": "fake", "cluster": {"server": server}}],
+            "users": [{"name": "fake", "user": {"token": "fake"}}],
+            "contexts": [{"name": "fake", "context": {"cluster": "fake", "user": "fake"}}],
+            "current-context": "fake"
+        }, f)
+
+
+def serve(cluster: SyntheticCluster, host: str = '127.0.0.1', port: int = 18080):
+    handler = type('Handler', (FakeApiHandler,), {'cluster': cluster})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a synthetic Kubernetes cluster")
+    parser.add_argument('--pods', type=int, default=100)
+    parser.add_argument('--namespaces', type=int, default=10)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--kubeconfig', help="Write a kubeconfig pointing at this server")
+    args = parser.parse_args()
+
+    if args.kubeconfig:
+        write_kubeconfig(args.kubeconfig, f"http://{args.host}:{args.port}")
+    print(f"Serving {args.pods} pods on http://{args.host}:{args.port}")
+    serve(SyntheticCluster(pods=args.pods, namespaces=args.namespaces), args.host, args.port)
@@ -0,0 +1,383 @@
+"""
+Record/Replay Harness
+Records OpenAI chat completions and Kubernetes API responses for a fixed query suite, then
+replays them offline against `LLM.call` to track rounds, tool calls, tokens and latency.
+
+Recording needs a reachable cluster and an OpenAI key; replaying needs neither. With
+`--fake-cluster` the suite is recorded against the fake API server instead, and each query's
+scripted `tool_calls` and `expected` answer stand in for the model.
+
+Usage:
+    python -m bench.replay record --cassettes bench/cassettes
+    python -m bench.replay record --fake-cluster 100         # no cluster or OpenAI key needed
+    python -m bench.replay replay --cassettes bench/cassettes --save baseline.json
+    python -m bench.replay replay --cassettes bench/cassettes --compare baseline.json
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from urllib.parse import urlencode, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_apiserver import SyntheticCluster, serve, write_kubeconfig
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), 'queries.json')
+
+# Metrics compared against the baseline, and the absolute slack allowed on top of the ratio
+REGRESSION_METRICS = {
+    'rounds': 0,
+    'tool_calls': 0,
+    'prompt_tokens': 50,
+    'completion_tokens': 20,
+    'simulated_latency': 0.05,
+}
+
+
+class ReplayMismatch(Exception):
+    """Raised when a replayed query makes a call that was not recorded."""
+
+
+def request_key(method: str, url: str, query_params=None, headers=None) -> str:
+    """Host independent key for a Kubernetes REST request.
+
+    Accept is part of the key: a metadata-only list and a full list share the same URL.
+    """
+    params = sorted((k, str(v)) for k, v in (query_params or []))
+    accept = (headers or {}).get('Accept', '')
+    return f"{method} {urlparse(url).path}?{urlencode(params)} Accept: {accept}"
+
+
+class _ReplayResponse:
+    """Stands in for the kubernetes client's RESTResponse / raw urllib3 response."""
+
+    def __init__(self, status, reason, data, headers):
+        self.status = status
+        self.reason = reason
+        self.data = data
+        self._headers = headers
+
+    def getheaders(self):
+        return self._headers
+
+    def getheader(self, name, default=None):
+        return self._headers.get(name, default)
+
+    def read(self, *args, **kwargs):
+        return self.data.encode() if isinstance(self.data, str) else self.data
+
+    def release_conn(self):
+        pass
+
+
+class KubernetesCassette:
+    """Records or replays REST responses at the kubernetes client's transport layer."""
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self.calls = 0
+        self.simulated_latency = 0.0
+        self._original = None
+
+    def record(self):
+        from kubernetes.client import rest
+        from kubernetes.client.exceptions import ApiException
+
+        original = self._original = rest.RESTClientObject.request
+        cassette = self
+
+        def store(key, status, reason, data, headers, latency):
+            if isinstance(data, bytes):
+                data = data.decode('utf8')
+            cassette.calls += 1
+            cassette.simulated_latency += latency
+            cassette.responses[key] = {
+                'status': status, 'reason': reason, 'data': data, 'headers': dict(headers or {}),
+                'latency': latency
+            }
+
+        def request(client, method, url, query_params=None, headers=None, *args, **kwargs):
+            key = request_key(method, url, query_params, headers)
+            start = time.perf_counter()
+            try:
+                r = original(client, method, url, query_params, headers, *args, **kwargs)
+            except ApiException as e:
+                store(key, e.status, e.reason, e.body, e.headers, time.perf_counter() - start)
+                raise
+            store(key, r.status, r.reason, r.data, r.getheaders(), time.perf_counter() - start)
+            return r
+
+        rest.RESTClientObject.request = request
+
+    def replay(self):
+        from kubernetes.client import rest
+        from kubernetes.client.exceptions import ApiException
+
+        self._original = rest.RESTClientObject.request
+        cassette = self
+
+        def request(client, method, url, query_params=None, headers=None, body=None,
+                    post_params=None, _preload_content=True, _request_timeout=None):
+            key = request_key(method, url, query_params, headers)
+            if key not in cassette.responses:
+                raise ReplayMismatch(f"Unrecorded Kubernetes request: {key}")
+            recorded = cassette.responses[key]
+            cassette.calls += 1
+            cassette.simulated_latency += recorded['latency']
+
+            data = recorded['data'] if _preload_content else (recorded['data'] or '').encode()
+            r = _ReplayResponse(recorded['status'], recorded['reason'], data, recorded['headers'])
+            if not 200 <= r.status <= 299:
+                raise ApiException(http_resp=r)
+            return r
+
+        rest.RESTClientObject.request = request
+
+    def stop(self):
+        if self._original:
+            from kubernetes.client import rest
+            rest.RESTClientObject.request = self._original
+            self._original = None
+
+
+class CompletionsCassette:
+    """Drop-in for `client.chat.completions` that records or replays completions in order."""
+
+    def __init__(self, completions=None, client=None):
+        self.completions = completions if completions is not None else []
+        self._client = client
+        self._position = 0
+        self.simulated_latency = 0.0
+
+    def create(self, **kwargs):
+        from openai.types.chat import ChatCompletion
+
+        if self._client is not None:
+            start = time.perf_counter()
+            completion = self._client.chat.completions.create(**kwargs)
+            latency = time.perf_counter() - start
+            self.completions.append({'latency': latency, 'completion': completion.model_dump()})
+            self.simulated_latency += latency
+            return completion
+
+        if self._position >= len(self.completions):
+            raise ReplayMismatch("Query made more LLM rounds than were recorded")
+        recorded = self.completions[self._position]
+        self._position += 1
+        self.simulated_latency += recorded['latency']
+        return ChatCompletion.model_validate(recorded['completion'])
+
+    @property
+    def chat(self):
+        return SimpleNamespace(completions=self)
+
+
+class ScriptedCompletions:
+    """Stand-in for the OpenAI client when recording against the fake cluster.
+
+    The first round asks for the query's scripted `tool_calls`, the next one answers with its
+    `expected` answer. Tokens are estimated at 4 characters each, so tool output size still shows.
+    """
+
+    def __init__(self, query: dict, model_name: str):
+        self.query = query
+        self.model_name = model_name
+        self.rounds = 0
+
+    def create(self, messages, tools=None, **kwargs):
+        from openai.types.chat import ChatCompletion
+
+        prompt = json.dumps([m if isinstance(m, dict) else m.model_dump() for m in messages]) + json.dumps(tools)
+        if self.rounds == 0:
+            message = {'role': 'assistant', 'content': None, 'tool_calls': [
+                {'id': f"call_{i}", 'type': 'function',
+                 'function': {'name': c['name'], 'arguments': json.dumps(c['arguments'])}}
+                for i, c in enumerate(self.query['tool_calls'])
+            ]}
+            finish_reason = 'tool_calls'
+        else:
+            message = {'role': 'assistant', 'content': self.query['expected']}
+            finish_reason = 'stop'
+        self.rounds += 1
+
+        completion_tokens = len(json.dumps(message)) // 4
+        return ChatCompletion.model_validate({
+            'id': f"scripted-{self.rounds}", 'object': 'chat.completion', 'created': 0,
+            'model': self.model_name,
+            'choices': [{'index': 0, 'message': message, 'finish_reason': finish_reason}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': completion_tokens,
+                      'total_tokens': len(prompt) // 4 + completion_tokens},
+        })
+
+    @property
+    def chat(self):
+        return SimpleNamespace(completions=self)
+
+
+def cassette_path(directory: str, query: str) -> str:
+    return os.path.join(directory, hashlib.sha1(query.encode()).hexdigest()[:16] + '.json')
+
+
+def query_metrics(query: str, answer: str, completions: list, k8s: KubernetesCassette,
+                  llm: CompletionsCassette, wall_time: float) -> dict:
+    usage = [c['completion'].get('usage') or {} for c in completions]
+    tool_calls = sum(len(c['completion']['choices'][0]['message'].get('tool_calls') or [])
+                     for c in completions)
+    return {
+        'query': query,
+        'answer': answer,
+        'rounds': len(completions),
+        'tool_calls': tool_calls,
+        'k8s_calls': k8s.calls,
+        'prompt_tokens': sum(u.get('prompt_tokens', 0) for u in usage),
+        'completion_tokens': sum(u.get('completion_tokens', 0) for u in usage),
+        # Recorded network time plus the local processing time actually spent replaying
+        'simulated_latency': round(llm.simulated_latency + k8s.simulated_latency + wall_time, 4),
+    }
+
+
+def record(queries, directory: str, model_name: str, fake_cluster: int = None):
+    os.makedirs(directory, exist_ok=True)
+    server = None
+    if fake_cluster:
+        server = _start_fake_cluster(fake_cluster)
+    else:
+        from openai import OpenAI
+        client = OpenAI()
+    try:
+        _record(queries, directory, model_name, lambda q: ScriptedCompletions(q, model_name) if server else client)
+    finally:
+        if server:
+            server.terminate()
+            server.join()
+
+
+def _start_fake_cluster(pods: int):
+    """Serves a synthetic cluster and points the tools at it; must run before the first tool call."""
+    from bench.bench_tools import _free_port, _wait_ready
+
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = multiprocessing.Process(target=serve, args=(SyntheticCluster(pods=pods), '127.0.0.1', port), daemon=True)
+    server.start()
+    _wait_ready(url)
+    kubeconfig = os.path.join(tempfile.mkdtemp(), 'config')
+    write_kubeconfig(kubeconfig, url)
+    os.environ['KUBECONFIG'] = kubeconfig
+    # Usage tools would otherwise sample the fake cluster in the background
+    os.environ['AK15_USAGE_INTERVAL'] = '0'
+    return server
+
+
+def _record(queries, directory: str, model_name: str, client_for):
+    from agent.LLM import LLM
+
+    for q in queries:
+        k8s, llm = KubernetesCassette(), CompletionsCassette(client=client_for(q))
+        k8s.record()
+        try:
+            answer = LLM(model_name, client=llm).call(q['query'])
+        finally:
+            k8s.stop()
+        with open(cassette_path(directory, q['query']), 'w') as f:
+            json.dump({'query': q['query'], 'model': model_name, 'answer': answer,
+                       'completions': llm.completions, 'kubernetes': k8s.responses}, f, indent=2)
+        print(f"[RECORDED] {q['query']} -> {answer}")
+
+
+def replay(queries, directory: str) -> list:
+    # The tools load a kubeconfig on first use; give them one that is never contacted
+    kubeconfig = os.path.join(tempfile.mkdtemp(), 'config')
+    write_kubeconfig(kubeconfig, 'http://replay.invalid')
+    os.environ['KUBECONFIG'] = kubeconfig
+    from agent.LLM import LLM
+
+    results = []
+    for q in queries:
+        with open(cassette_path(directory, q['query'])) as f:
+            cassette = json.load(f)
+
+        k8s = KubernetesCassette(cassette['kubernetes'])
+        llm = CompletionsCassette(cassette['completions'])
+        k8s.replay()
+        start = time.perf_counter()
+        try:
+            answer = LLM(cassette['model'], client=llm).call(q['query'])
+        finally:
+            k8s.stop()
+        wall_time = time.perf_counter() - start
+
+        metrics = query_metrics(q['query'], answer, cassette['completions'][:llm._position], k8s, llm, wall_time)
+        metrics['correct'] = q.get('expected') is None or str(answer).strip() == q['expected']
+        results.append(metrics)
+    return results
+
+
+def compare(results: list, baseline: list, threshold: float) -> list:
+    """Lists every metric of every query that regressed past `threshold` (ratio) plus slack."""
+    by_query = {b['query']: b for b in baseline}
+    regressions = []
+    for r in results:
+        base = by_query.get(r['query'])
+        if not base:
+            continue
+        for metric, slack in REGRESSION_METRICS.items():
+            if r[metric] > base[metric] * threshold + slack:
+                regressions.append(f"{r['query']!r}: {metric} {base[metric]} -> {r[metric]}")
+        if base.get('correct') and not r['correct']:
+            regressions.append(f"{r['query']!r}: answer changed to {r['answer']!r}")
+    return regressions
+
+
+def report(results: list) -> str:
+    lines = [
+        "| Query | Answer | Rounds | Tool Calls | K8s Calls | Prompt Tokens | Completion Tokens | Latency (s) |",
+        "|-------|--------|--------|------------|-----------|---------------|-------------------|-------------|"
+    ]
+    for r in results:
+        answer = r['answer'] if r['correct'] else f"{r['answer']} (wrong)"
+        lines.append(f"| {r['query']} | {answer} | {r['rounds']} | {r['tool_calls']} | {r['k8s_calls']} | "
+                     f"{r['prompt_tokens']} | {r['completion_tokens']} | {r['simulated_latency']} |")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or replay the query suite")
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('--cassettes', default=os.path.join(os.path.dirname(__file__), 'cassettes'))
+    parser.add_argument('--queries', default=QUERIES_PATH)
+    parser.add_argument('--model', default='gpt-4o')
+    parser.add_argument('--fake-cluster', type=int, metavar='PODS',
+                        help="Record against a synthetic cluster of this many pods with a scripted model")
+    parser.add_argument('--save', help="Write replay metrics as JSON to this file")
+    parser.add_argument('--compare', help="Baseline metrics JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args()
+
+    with open(args.queries) as f:
+        queries = json.load(f)
+
+    if args.mode == 'record':
+        record(queries, args.cassettes, args.model, args.fake_cluster)
+        sys.exit(0)
+
+    results = replay(queries, args.cassettes)
+    print(report(results))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r in regressions:
+            print(f"[REGRESSION] {r}")
+        sys.exit(1 if regressions else 0)
@@ -1,12 +1,35 @@
 from src.utils import setup_logger
+import contextvars
+import json
 import logging
-from flask import Flask, request, jsonify
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from pydantic import BaseModel, ValidationError
 from agent.LLM import LLM
+from agent.accounting import usage_totals
+from src.client import BatchCache, batch_scope
+from src import metrics, snapshot, store, tracing, usage_sampler
 
 app = Flask(__name__)
 agent = LLM('gpt-4o')
 
+
+def start_background():
+    """Starts the background work of a serving process; importing this module starts nothing."""
+    # Keep the object store (AK15_STORE) current, resuming from where the last run stopped.
+    # serve.py workers set AK15_STORE_WATCH=0 and read the store kept by its watcher process.
+    if store.current() is not None and os.getenv('AK15_STORE_WATCH', '1') == '1':
+        store.current().watch()
+
+    # Sample node and pod usage in the background so usage tools answer from memory (AK15_USAGE_INTERVAL=0 disables it).
+    # serve.py workers set AK15_USAGE_SAMPLE=0 and read the samples of its watcher process.
+    if snapshot.current() is None and usage_sampler.SAMPLING and usage_sampler.SAMPLE_INTERVAL > 0:
+        usage_sampler.current(wait=False)
+
+
 setup_logger()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.CRITICAL)
@@ -14,6 +37,38 @@ logger.setLevel(logging.CRITICAL)
 class QueryResponse(BaseModel):
     query: str
     answer: str
+    stats: Optional[dict] = None
+
+class BatchQueryResult(BaseModel):
+    query: str
+    answer: Optional[str] = None
+    error: Optional[str] = None
+    duration: float
+    stats: Optional[dict] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryResult]
+    duration: float
+    cache: dict
+
+BATCH_MAX_WORKERS = 8
+
+@app.before_request
+def start_query_metrics():
+    if request.path.startswith('/query'):
+        g.query_start = time.perf_counter()
+        metrics.QUERIES_IN_FLIGHT.inc(endpoint=request.path)
+
+@app.teardown_request
+def finish_query_metrics(_):
+    if 'query_start' in g:
+        metrics.QUERIES_IN_FLIGHT.dec(endpoint=request.path)
+        metrics.QUERY_DURATION.observe(time.perf_counter() - g.query_start, endpoint=request.path)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of agent, tool and Kubernetes client metrics."""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/query', methods=['POST'])
 def create_query():
@@ -22,14 +77,99 @@ def create_query():
         request_data = request.json
         query = request_data.get('query')
 
-        answer = agent.call(query)
+        # Each query gets its own conversation and stats, so concurrent requests don't read each other's
+        query_agent = LLM(agent.model_name, client=agent.model)
+        with tracing.span('query', endpoint='/query', query=query):
+            answer = query_agent.call(query)
 
         response = QueryResponse(query=query, answer=answer)
+        if request_data.get('stats'):
+            response.stats = query_agent.stats.to_dict()
         
-        return jsonify(response.dict())
+        return jsonify(response.dict(exclude_none=True))
     
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route('/query/batch', methods=['POST'])
+def batch_query():
+    """Answers many queries concurrently, sharing one snapshot of cluster reads between them."""
+    request_data = request.json or {}
+    queries = request_data.get('queries')
+    if not isinstance(queries, list) or not queries or not all(isinstance(q, str) and q.strip() for q in queries):
+        return jsonify({"error": "'queries' must be a non-empty list of non-empty strings"}), 400
+    max_workers = request_data.get('max_workers', BATCH_MAX_WORKERS)
+    # bool is an int subclass, so check it explicitly
+    if not isinstance(max_workers, int) or isinstance(max_workers, bool) or max_workers < 1:
+        return jsonify({"error": "'max_workers' must be a positive integer"}), 400
+
+    workers = min(max_workers, BATCH_MAX_WORKERS, len(queries))
+    include_stats = bool(request_data.get('stats'))
+    batch_start = time.perf_counter()
+
+    cache = BatchCache()
+
+    def answer(query):
+        start = time.perf_counter()
+        try:
+            # Worker threads don't inherit context, so each query enters the shared cache itself
+            with batch_scope(cache), tracing.span('query', endpoint='/query/batch', query=query):
+                query_agent = LLM(agent.model_name, client=agent.model)
+                result = query_agent.call(query)
+            return BatchQueryResult(
+                query=query,
+                answer=result,
+                duration=time.perf_counter() - start,
+                stats=query_agent.stats.to_dict() if include_stats else None
+            )
+        except Exception as e:
+            return BatchQueryResult(query=query, error=str(e), duration=time.perf_counter() - start)
+
+    with tracing.span('batch', size=len(queries)), ThreadPoolExecutor(max_workers=workers) as pool:
+        # Run each query in a copy of this context so its spans nest under the batch span
+        futures = [pool.submit(contextvars.copy_context().run, answer, q) for q in queries]
+        results = [f.result() for f in futures]
+
+    response = BatchQueryResponse(
+        results=results,
+        duration=time.perf_counter() - batch_start,
+        cache=cache.stats()
+    )
+    return jsonify(response.dict(exclude_none=True))
+
+@app.route('/stats', methods=['GET'])
+def get_stats():
+    """Token and latency totals across all queries served by this process, per tool."""
+    return jsonify(usage_totals.to_dict())
+
+@app.route('/query/stream', methods=['POST'])
+def stream_query():
+    """Streams tool-call progress and answer tokens as Server-Sent Events."""
+    request_data = request.json or {}
+    query = request_data.get('query')
+    if not query:
+        return jsonify({"error": "Missing 'query'"}), 400
+
+    # Each stream gets its own conversation so concurrent requests don't interleave
+    stream_agent = LLM(agent.model_name, client=agent.model)
+
+    def generate():
+        try:
+            with tracing.span('query', endpoint='/query/stream', query=query):
+                for event in stream_agent.stream(query):
+                    yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'event': 'error', 'error': str(e)})}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 if __name__ == "__main__":
+    # debug=True re-runs this module in a reloader child process, which is the one serving;
+    # starting in the watching parent as well would run two watchers on the same store
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background()
     app.run(host="localhost", port=8000, debug=True)
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+Multi-process Server
+Runs the agent in several worker processes that accept connections from one shared listening
+socket and read one shared object store (src/store.py).
+
+A single watcher process keeps the store current from the API server and samples node and pod
+usage, and the workers only read both, so throughput scales with cores while the API server sees
+the watches and metrics calls of one process. Metrics, /stats and token usage totals are kept per worker.
+
+Usage:
+    python serve.py --workers 8 --port 8000 --store /var/lib/ak15/store.db
+"""
+
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# fork keeps the listening socket open in the children; nothing from src/ is imported before it
+_mp = multiprocessing.get_context('fork')
+
+
+def _own_files(role: str):
+    """Gives this process its own log and trace files, since rotation and trace writes aren't multi-process safe."""
+    log_file = os.getenv('AK15_LOG_FILE', os.path.join(ROOT, 'agent.log'))
+    base, ext = os.path.splitext(log_file)
+    os.environ['AK15_LOG_FILE'] = f"{base}.{role}{ext}"
+    if os.getenv('AK15_TRACE_FILE'):
+        base, ext = os.path.splitext(os.environ['AK15_TRACE_FILE'])
+        os.environ['AK15_TRACE_FILE'] = f"{base}.{role}{ext}"
+
+
+def run_watcher(store_path: str, ready):
+    _own_files('watcher')
+    from src import store, usage_sampler
+    from src.utils import setup_logger
+
+    setup_logger()
+    local = store.load(store_path, os.getenv('AK15_STORE_SECRET_DATA') == '1')
+    # The schema exists (or was reset to the current version) once the store is loaded
+    ready.set()
+    local.watch()
+    if usage_sampler.SAMPLE_INTERVAL > 0:
+        usage_sampler.current(wait=False)
+    threading.Event().wait()
+
+
+def run_worker(index: int, fd: int, host: str, port: int, store_path: str):
+    _own_files(f"worker-{index}")
+    os.environ['AK15_STORE'] = store_path
+    os.environ['AK15_STORE_WATCH'] = '0'
+    os.environ['AK15_USAGE_SAMPLE'] = '0'
+    from werkzeug.serving import make_server
+    from main import app, start_background
+
+    start_background()
+    make_server(host, port, app, threaded=True, fd=fd).serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the agent from several worker processes")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--store', default=os.getenv('AK15_STORE', os.path.join(tempfile.gettempdir(), 'ak15-store.db')),
+                        help="Object store database shared by the watcher and the workers")
+    args = parser.parse_args()
+    # The watcher saves its usage samples here for the workers
+    os.environ.setdefault('AK15_USAGE_FILE', args.store + '.usage')
+
+    family = socket.AF_INET6 if ':' in args.host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(128)
+    sock.set_inheritable(True)
+
+    def start(target, *target_args):
+        process = _mp.Process(target=target, args=target_args, daemon=True)
+        process.start()
+        return process
+
+    # Workers open the database only once the watcher created or migrated it: a worker opening an
+    # older schema would reset it under the watcher
+    ready = _mp.Event()
+    processes = {'watcher': start(run_watcher, args.store, ready)}
+    while not ready.wait(1):
+        if not processes['watcher'].is_alive():
+            raise SystemExit(f"[ERROR] Watcher exited with code {processes['watcher'].exitcode} "
+                             f"before opening the store {args.store}")
+    for i in range(args.workers):
+        processes[i] = start(run_worker, i, sock.fileno(), args.host, args.port, args.store)
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers, store {args.store}")
+
+    stopping = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stopping.set())
+
+    while not stopping.wait(1):
+        for name, process in list(processes.items()):
+            if not process.is_alive():
+                print(f"[ERROR] {'Watcher' if name == 'watcher' else f'Worker {name}'} exited "
+                      f"with code {process.exitcode}, restarting")
+                if name == 'watcher':
+                    processes[name] = start(run_watcher, args.store, ready)
+                else:
+                    processes[name] = start(run_worker, name, sock.fileno(), args.host, args.port, args.store)
+
+    for process in processes.values():
+        process.terminate()
+    for process in processes.values():
+        process.join(5)
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
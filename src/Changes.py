@@ -0,0 +1,97 @@
+"""
+Kubernetes Changes Module
+Answers "what changed" questions from the object store's change journal: objects added, modified
+(with the changed fields of their spec, labels and data) and deleted, without reading the objects.
+"""
+
+import logging
+import re
+import time
+from datetime import datetime, timezone
+
+from src import store
+from src.registry import tool
+from src.snapshot import kind_name, resource_for_kind
+from src.utils import current_context
+
+logger = logging.getLogger(__name__)
+
+DURATION = re.compile(r"^(\d+(?:\.\d+)?)\s*([smhd])$")
+DURATION_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+MAX_CHANGES = 200
+
+
+def _since(value: str) -> float:
+    """Timestamp for '10m', '2h', '1d' (ago) or an ISO 8601 time ('2024-05-01T12:00:00Z')."""
+    m = DURATION.match(value.strip().lower())
+    if m:
+        return time.time() - float(m.group(1)) * DURATION_SECONDS[m.group(2)]
+    when = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+
+def _time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+@tool("Lists the Kubernetes objects that were added, modified or deleted recently, with the fields that changed "
+      "(spec, images, replicas, labels, data keys). Use it first for questions about recent changes.",
+      since="How far back to look, as a duration ('10m', '2h', '1d') or an ISO 8601 time. Defaults to '10m'.",
+      namespace="Only list changes in this namespace. Lists all namespaces if not specified.",
+      kind="Only list changes of this kind, e.g. 'Deployment' or 'ConfigMap'. Lists all kinds if not specified.",
+      include_status="When true, also lists modifications that changed only the status of an object.")
+def list_changes(since: str = '10m', namespace: str = None, kind: str = None, include_status: bool = False) -> str:
+    """
+    Lists changes to cluster objects from the object store's change journal.
+
+    Args:
+        since: Duration ago or ISO 8601 time to list changes from
+        namespace: Only list changes in this namespace
+        kind: Only list changes of this kind
+        include_status: Also list status-only modifications
+    """
+    logger.critical(f"[FUNCTION] Attempting to list changes since {since} (namespace={namespace}, kind={kind})")
+    local = store.current()
+    if current_context() is not None:
+        return "[ERROR] Attempting to list changes: change history is only kept for the current context"
+    if local is None:
+        logger.error("[ERROR] Attempting to list changes: the object store is not enabled")
+        return "[ERROR] Attempting to list changes: change history needs the object store (AK15_STORE)"
+    try:
+        start = _since(since)
+    except ValueError:
+        return f"[ERROR] Attempting to list changes: invalid time '{since}', use e.g. '10m', '2h' or an ISO 8601 time"
+    resource = None
+    if kind:
+        resource = resource_for_kind(kind)
+        if resource is None:
+            return f"[ERROR] Attempting to list changes: unknown kind '{kind}'"
+
+    changes, oldest = local.history(start, namespace, resource)
+    if not include_status:
+        changes = [c for c in changes if c[4] != 'MODIFIED' or c[5]]
+
+    scope = f" in namespace {namespace}" if namespace else ""
+    lines = [f"# Changes{scope} since {_time(start)} UTC", ""]
+    if oldest is None or oldest > start:
+        lines += [f"Note: changes are only recorded since {_time(oldest or time.time())} UTC.", ""]
+    if not changes:
+        lines.append("No changes found.")
+        return "\n".join(lines)
+
+    if len(changes) > MAX_CHANGES:
+        lines += [f"Showing the latest {MAX_CHANGES} of {len(changes)} changes.", ""]
+        changes = changes[-MAX_CHANGES:]
+    for when, res, ns, name, change_type, diff in changes:
+        where = f"{ns}/{name}" if ns else name
+        status_only = change_type == 'MODIFIED' and not diff
+        lines.append(f"- {_time(when)} {kind_name(res)} {where}: {change_type.lower()}{' (status)' if status_only else ''}")
+        for path, old, new in diff:
+            lines.append(f"  - {path}: {old if old is not None else '(none)'} -> {new if new is not None else '(none)'}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(list_changes(since='1h'))
@@ -1,19 +1,39 @@
 """
 Kubernetes Configuration Module
 Handles operations for ConfigMaps and Secrets, providing formatted information retrieval.
+Secrets are listed as metadata only, and their values are never returned unless
+AK15_ALLOW_SECRET_VALUES=1.
 """
 
-import json
+import base64
+import hashlib
 import logging
-from src.utils import load_kube_config
+import os
+import re
+from src.utils import LazyApi, deep_json, error_reason, load_kube_config
+from src.client import call_raw
+from src.records import list_records
+from src.registry import tool
 
 v1, apps_v1, version_api = load_kube_config()
+v1_metadata = LazyApi('CoreV1Api', metadata=True)
 logger = logging.getLogger(__name__)
 
+ALLOW_SECRET_VALUES = os.getenv('AK15_ALLOW_SECRET_VALUES') == '1'
+# Most bytes of one ConfigMap value returned per call, and the limits of a pattern search
+MAX_VALUE_BYTES = int(os.getenv('AK15_CONFIGMAP_MAX_BYTES', 16 * 1024))
+MAX_MATCHES = 100
+MAX_MATCH_CHARS = 300
+HASH_CHARS = 12
+# Holds the whole applied object, Secret values included
+LAST_APPLIED = 'kubectl.kubernetes.io/last-applied-configuration'
+
+@tool("Lists all ConfigMaps in a specified Kubernetes namespace.",
+      namespace="The Kubernetes namespace to list ConfigMaps from. Defaults to 'default' namespace if not specified.")
 def list_configmap_names(namespace: str = 'default') -> str:
     """Lists all ConfigMaps in the specified namespace."""
     logger.critical(f"[FUNCTION] Attempting to list configmaps in namespace: {namespace}")
-    cms = v1.list_namespaced_config_map(namespace=namespace).items
+    cms = list_records(v1.list_namespaced_config_map, namespace=namespace)
     
     if len(cms) == 0:
         return f"No ConfigMaps found in namespace {namespace}"
@@ -27,11 +47,50 @@ def list_configmap_names(namespace: str = 'default') -> str:
         lines.append("No ConfigMaps found in this namespace.")
     else:
         for cm in cms:
-            lines.append(f"- {cm.metadata.name}")
+            lines.append(f"- {cm.name}")
 
     return "\n".join(lines)
 
-def get_configmap_details(configmap_name: str, namespace: str = 'default', deep: bool = False) -> str:
+def _entries(cm: dict) -> dict:
+    """Value bytes and whether they are binary, per key of a raw ConfigMap."""
+    entries = {k: ((v or '').encode(), False) for k, v in (cm.get('data') or {}).items()}
+    entries.update((k, (base64.b64decode(v or ''), True)) for k, v in (cm.get('binaryData') or {}).items())
+    return entries
+
+
+def _size(n: int) -> str:
+    return f"{n} B" if n < 1024 else f"{n / 1024:.1f} KiB" if n < 1024 ** 2 else f"{n / 1024 ** 2:.1f} MiB"
+
+
+def _grep(entries: dict, pattern: str) -> list:
+    """Markdown lines for the lines of text values matching `pattern`, as key:line: text."""
+    regex = re.compile(pattern)
+    lines, matched = [], 0
+    for key, (value, binary) in entries.items():
+        if binary:
+            continue
+        for number, line in enumerate(value.decode(errors='replace').splitlines(), 1):
+            if regex.search(line):
+                matched += 1
+                if matched <= MAX_MATCHES:
+                    line = line if len(line) <= MAX_MATCH_CHARS else line[:MAX_MATCH_CHARS] + "..."
+                    lines.append(f"{key}:{number}: {line}")
+    if matched > MAX_MATCHES:
+        lines.append(f"... {matched - MAX_MATCHES} more matches, narrow the pattern or pass a key")
+    return lines
+
+
+@tool("Retrieves information about a specific ConfigMap in a Kubernetes namespace: its keys with their sizes and "
+      "hashes. Pass a key to read one value (or a byte range of it with offset and length), or a pattern to search values.",
+      configmap_name="The complete name of the ConfigMap to retrieve details for. Must match exactly as shown in Kubernetes.",
+      namespace="The Kubernetes namespace where the ConfigMap is located. Defaults to 'default' namespace if not specified.",
+      deep="When true, returns full detailed information about the ConfigMap, including every value.",
+      key="Returns the value of this key.",
+      offset="With key, the byte offset to start reading the value at. Defaults to 0.",
+      length="With key, the number of bytes to read. Defaults to the rest of the value, up to a limit.",
+      pattern="Returns the lines of the values (of key, if given) matching this regular expression, like grep.")
+def get_configmap_details(configmap_name: str, namespace: str = 'default', deep: bool = False, key: str = None,
+                          offset: int = 0, length: int = None, pattern: str = None) -> str:
     """
     Gets detailed information about a specific ConfigMap.
     
@@ -39,52 +98,94 @@ def get_configmap_details(configmap_name: str, namespace: str = 'default', deep:
         configmap_name: Name of the ConfigMap
         namespace: Kubernetes namespace
         deep: If True, returns raw JSON data instead of formatted markdown
+        key: Return the value of this key only
+        offset: Byte offset into the value of key
+        length: Number of bytes of the value of key to return
+        pattern: Regular expression to search the values for
     """
-    logger.critical(f"[FUNCTION] Attempting to get configmap details for {configmap_name} in namespace: {namespace} (deep={deep})")
+    logger.critical(f"[FUNCTION] Attempting to get configmap details for {configmap_name} in namespace: {namespace} "
+                    f"(deep={deep}, key={key}, pattern={pattern})")
     try:
-        cm = v1.read_namespaced_config_map(name=configmap_name, namespace=namespace)
+        cm = call_raw(v1.read_namespaced_config_map, name=configmap_name, namespace=namespace)
     except Exception as e:
-        logger.error(f"[ERROR] Attempting to get configmap details for {configmap_name} in namespace: {namespace}: {e.reason}")
-        return f"[ERROR] Attempting to get configmap details for {configmap_name} in namespace: {namespace}: {e.reason}"
+        logger.error(f"[ERROR] Attempting to get configmap details for {configmap_name} in namespace: {namespace}: {error_reason(e)}")
+        return f"[ERROR] Attempting to get configmap details for {configmap_name} in namespace: {namespace}: {error_reason(e)}"
 
     if deep:
-        return f"```json\n{json.dumps(cm.to_dict(), indent=2, default=str)}\n```"
+        return deep_json(cm)
+
+    entries = _entries(cm)
+    if key is not None and key not in entries:
+        return (f"[ERROR] Attempting to get key {key} of configmap {configmap_name} in namespace: {namespace}: "
+                f"no such key, keys are: {', '.join(entries) or 'none'}")
 
-    sections = [
+    if pattern:
+        try:
+            matches = _grep({key: entries[key]} if key is not None else entries, pattern)
+        except re.error as e:
+            return f"[ERROR] Attempting to search configmap {configmap_name}: invalid pattern '{pattern}': {e}"
+        return "\n".join([f"# ConfigMap: {configmap_name}", f"**Namespace**: {namespace}", "",
+                          f"## Lines matching `{pattern}`", *(matches or ["No matches found."])])
+
+    if key is not None:
+        value, binary = entries[key]
+        lines = [f"# ConfigMap: {configmap_name}", f"**Namespace**: {namespace}", "", f"## {key}"]
+        if binary:
+            lines.append(f"Binary data, {_size(len(value))}, SHA-256 {hashlib.sha256(value).hexdigest()[:HASH_CHARS]}")
+            return "\n".join(lines)
+        offset = offset or 0
+        if offset < 0 or (offset and offset >= len(value)):
+            return (f"[ERROR] Attempting to read key {key} of configmap {configmap_name} in namespace: {namespace}: "
+                    f"offset {offset} is outside the value of {len(value)} bytes")
+        if length is not None and length <= 0:
+            return (f"[ERROR] Attempting to read key {key} of configmap {configmap_name} in namespace: {namespace}: "
+                    f"length must be positive, got {length}")
+        end = min(len(value), offset + min(length or MAX_VALUE_BYTES, MAX_VALUE_BYTES))
+        if offset or end < len(value):
+            lines.append(f"Bytes {offset}-{end} of {len(value)}" +
+                         (f", pass offset={end} to read on." if end < len(value) else "."))
+        lines.append(f"```\n{value[offset:end].decode(errors='replace')}\n```")
+        return "\n".join(lines)
+
+    lines = [
         f"# ConfigMap: {configmap_name}",
         f"**Namespace**: {namespace}\n",
         "## Labels",
-        "\n".join(f"- {k}: {v}" for k, v in (cm.metadata.labels or {}).items()) or "None",
+        "\n".join(f"- {k}: {v}" for k, v in ((cm.get('metadata') or {}).get('labels') or {}).items()) or "None",
         "\n## Data Entries"
     ]
-
-    if cm.data:
-        sections.extend(f"### {key}\n```\n{value}\n```" for key, value in cm.data.items())
+    if entries:
+        lines += ["| Key | Size | Lines | SHA-256 |", "|-----|------|-------|---------|"]
+        for name, (value, binary) in entries.items():
+            line_count = "binary" if binary else len(value.splitlines())
+            lines.append(f"| {name} | {_size(len(value))} | {line_count} | {hashlib.sha256(value).hexdigest()[:HASH_CHARS]} |")
+        lines.append(f"\nTotal: {_size(sum(len(v) for v, _ in entries.values()))}. Pass key to read a value, "
+                     "or pattern to search them.")
     else:
-        sections.append("No data entries found.")
+        lines.append("No data entries found.")
 
-    if cm.binary_data:
-        sections.extend([
-            "\n## Binary Data Entries",
-            "\n".join(f"- {key} (binary)" for key in cm.binary_data.keys())
-        ])
-
-    return "\n".join(sections)
+    return "\n".join(lines)
 
+@tool("Lists all Secrets in a specified Kubernetes namespace.",
+      namespace="The Kubernetes namespace to list Secrets from. Defaults to 'default' namespace if not specified.")
 def list_secret_names(namespace: str = 'default') -> str:
     """Lists all Secrets in the specified namespace."""
     logger.critical(f"[FUNCTION] Attempting to list secrets in namespace: {namespace}")
-    secrets = v1.list_namespaced_secret(namespace=namespace).items
+    secrets = list_records(v1_metadata.list_namespaced_secret, namespace=namespace)
 
     if not secrets:
         return "No Secrets found in this namespace."
     
     lines = [f"# Secrets in namespace: {namespace}", ""]
     for secret in secrets:
-        lines.append(f"- {secret.metadata.name}")
+        lines.append(f"- {secret.name}")
         
     return "\n".join(lines)
 
+@tool("Retrieves information about a specific Secret in a Kubernetes namespace.",
+      secret_name="The complete name of the Secret to retrieve details for. Must match exactly as shown in Kubernetes.",
+      namespace="The Kubernetes namespace where the Secret is located. Defaults to 'default' namespace if not specified.",
+      deep="When true, returns the Secret as JSON. Only its metadata unless the server allows Secret values.")
 def get_secret_details(secret_name: str, namespace: str = 'default', deep: bool = False) -> str:
     """
     Gets detailed information about a specific Secret.
@@ -96,24 +197,34 @@ def get_secret_details(secret_name: str, namespace: str = 'default', deep: bool
     """
     logger.critical(f"[FUNCTION] Attempting to get secret details for {secret_name} in namespace: {namespace} (deep={deep})")
     try:
-        secret = v1.read_namespaced_secret(name=secret_name, namespace=namespace)
+        if ALLOW_SECRET_VALUES:
+            secret = call_raw(v1.read_namespaced_secret, name=secret_name, namespace=namespace)
+        else:
+            # Metadata only, so the values never leave the API server. Type and key names come with the values.
+            meta = call_raw(v1_metadata.read_namespaced_secret, name=secret_name, namespace=namespace)['metadata']
+            annotations = {k: v for k, v in (meta.get('annotations') or {}).items() if k != LAST_APPLIED}
+            secret = {'apiVersion': 'v1', 'kind': 'Secret', 'metadata': dict(meta, annotations=annotations)}
     except Exception as e:
-        logger.error(f"[ERROR] Attempting to get secret details for {secret_name} in namespace: {namespace}: {e.reason}")
-        return f"[ERROR] Attempting to get secret details for {secret_name} in namespace: {namespace}: {e.reason}"
+        logger.error(f"[ERROR] Attempting to get secret details for {secret_name} in namespace: {namespace}: {error_reason(e)}")
+        return f"[ERROR] Attempting to get secret details for {secret_name} in namespace: {namespace}: {error_reason(e)}"
 
     if deep:
-        return f"```json\n{json.dumps(secret.to_dict(), indent=2, default=str)}\n```"
+        return deep_json(secret)
 
+    if ALLOW_SECRET_VALUES:
+        keys = "\n".join(f"- {k}" for k in secret.get('data') or {}) or "No data keys found."
+    else:
+        keys = "Not shown: only the Secret's metadata is read, values and key names need AK15_ALLOW_SECRET_VALUES=1."
     return "\n".join([
         f"# Secret: {secret_name}",
         f"**Namespace**: {namespace}",
-        f"**Type**: {secret.type}",
+        f"**Type**: {secret.get('type') or 'Not shown'}",
         "",
         "## Labels",
-        "\n".join(f"- {k}: {v}" for k, v in (secret.metadata.labels or {}).items()) or "None",
+        "\n".join(f"- {k}: {v}" for k, v in (secret['metadata'].get('labels') or {}).items()) or "None",
         "",
         "## Data Keys",
-        "\n".join(f"- {k}" for k in (secret.data or {}).keys()) or "No data keys found."
+        keys
     ])
 
 if __name__ == "__main__":
@@ -3,29 +3,37 @@ Kubernetes Deployment Module
 Handles operations for Deployments, providing formatted information retrieval.
 """
 
-import json
 import logging
-from src.utils import load_kube_config
+from src.utils import deep_json, error_reason, load_kube_config
+from src.client import call, call_raw
+from src.records import deployment_pods, list_records
+from src.registry import tool
 
 v1, apps_v1, version_api = load_kube_config()
 logger = logging.getLogger(__name__)
 
+@tool("Lists all Deployments in a specified Kubernetes namespace.",
+      namespace="The Kubernetes namespace to list Deployments from. Defaults to 'default' namespace if not specified.")
 def list_deployments(namespace: str = 'default') -> str:
     """Lists all deployments in the specified namespace."""
     logger.critical(f"[FUNCTION] Attempting to list deployments in namespace: {namespace}")
     try:
-        deployments = apps_v1.list_namespaced_deployment(namespace=namespace).items
+        deployments = list_records(apps_v1.list_namespaced_deployment, namespace=namespace)
     except Exception as e:
-        logger.error(f"[ERROR] Attempting to list deployments in namespace: {namespace}: {e.reason}")
-        return f"[ERROR] Attempting to list deployments in namespace: {namespace}: {e.reason}"
+        logger.error(f"[ERROR] Attempting to list deployments in namespace: {namespace}: {error_reason(e)}")
+        return f"[ERROR] Attempting to list deployments in namespace: {namespace}: {error_reason(e)}"
     
-    deployment_names = [d.metadata.name for d in deployments]
+    deployment_names = [d.name for d in deployments]
     lines = [f"# Deployments in namespace: {namespace}", ""]
     for name in deployment_names:
         lines.append(f"- {name}")
 
     return "\n".join(lines)
 
+@tool("Retrieves information about a specific Deployment in a Kubernetes namespace.",
+      deployment_name="The complete name of the Deployment to retrieve details for. Must match exactly as shown in Kubernetes.",
+      namespace="The Kubernetes namespace where the Deployment is located. Defaults to 'default' namespace if not specified.",
+      deep="When true, returns full detailed information about the Deployment.")
 def get_deployment_details(deployment_name: str, namespace: str = 'default', deep: bool = False) -> str:
     """
     Gets detailed information about a specific Deployment.
@@ -37,20 +45,17 @@ def get_deployment_details(deployment_name: str, namespace: str = 'default', dee
     """
     logger.critical(f"[FUNCTION] Attempting to get deployment details for {deployment_name} in namespace: {namespace} (deep={deep})")
     try:
-        d = apps_v1.read_namespaced_deployment(name=deployment_name, namespace=namespace)
+        d = (call_raw if deep else call)(apps_v1.read_namespaced_deployment, name=deployment_name, namespace=namespace)
     except Exception as e:
-        logger.error(f"[ERROR] Attempting to get deployment details for {deployment_name} in namespace: {namespace}: {e.reason}")
-        return f"[ERROR] Attempting to get deployment details for {deployment_name} in namespace: {namespace}: {e.reason}"
+        logger.error(f"[ERROR] Attempting to get deployment details for {deployment_name} in namespace: {namespace}: {error_reason(e)}")
+        return f"[ERROR] Attempting to get deployment details for {deployment_name} in namespace: {namespace}: {error_reason(e)}"
 
     if deep:
-        return f"```json\n{json.dumps(d.to_dict(), indent=2, default=str)}\n```"
+        return deep_json(d)
 
-    selector = d.spec.selector.match_labels
-    selector_str = ','.join([f'{k}={v}' for k, v in selector.items()])
-    pods = v1.list_namespaced_pod(
-        namespace=namespace,
-        label_selector=selector_str
-    ).items
+    selector = d.spec.selector.match_labels or {}
+    pods = deployment_pods({'replica_set': apps_v1.list_namespaced_replica_set, 'pod': v1.list_namespaced_pod},
+                           namespace, deployment_name, ','.join(f'{k}={v}' for k, v in selector.items()))
 
     lines = [
         f"# Deployment: {deployment_name}",
@@ -74,10 +79,10 @@ def get_deployment_details(deployment_name: str, namespace: str = 'default', dee
     for c in (d.status.conditions or []):
         lines.append(f"| {c.type} | {c.status} | {c.reason} | {c.message} |")
 
-    lines.extend(["", "## Managed Pods", "| Pod Name | Status | Node | Pod IP |", "|-----------|--------|------|---------|"])
-    for pod in pods:
+    lines.extend(["", "## Managed Pods", "| Pod Name | ReplicaSet | Status | Node | Pod IP |", "|-----------|------------|--------|------|---------|"])
+    for rs_name, pod in pods:
         lines.append(
-            f"| {pod.metadata.name} | {pod.status.phase} | {pod.spec.node_name} | {pod.status.pod_ip} |"
+            f"| {pod.name} | {rs_name} | {pod.phase} | {pod.node} | {pod.pod_ip} |"
         )
 
     return "\n".join(lines)
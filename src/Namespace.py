@@ -3,19 +3,22 @@ Kubernetes Namespace Module
 Handles operations for Namespaces, providing formatted information retrieval.
 """
 
-import json
 import logging
-from src.utils import load_kube_config
+from src.utils import deep_json, error_reason, load_kube_config
+from src.client import call, call_raw
+from src.records import list_records
+from src.registry import tool
 
 v1, apps_v1, version_api = load_kube_config()
 logger = logging.getLogger(__name__)
 
+@tool("Lists all namespaces in the Kubernetes cluster.")
 def list_all_namespaces() -> str:
     """Lists all namespaces in the cluster."""
     try:
         logger.info("[INFO] Attempting to list all namespaces")
-        namespaces = v1.list_namespace().items
-        namespace_names = [ns.metadata.name for ns in namespaces]
+        namespaces = list_records(v1.list_namespace)
+        namespace_names = [ns.name for ns in namespaces]
 
         lines = ["# Namespace Names", ""]
         for name in namespace_names:
@@ -23,9 +26,12 @@ def list_all_namespaces() -> str:
 
         return "\n".join(lines)
     except Exception as e:
-        logger.error(f"[ERROR] Attempting to list all namespaces: {e.reason}")
-        return f"[ERROR] Attempting to list all namespaces: {e.reason}"
+        logger.error(f"[ERROR] Attempting to list all namespaces: {error_reason(e)}")
+        return f"[ERROR] Attempting to list all namespaces: {error_reason(e)}"
 
+@tool("Retrieves information about a specific Namespace in the Kubernetes cluster.",
+      namespace="The name of the Namespace to retrieve details for. Defaults to 'default' namespace if not specified.",
+      deep="When true, returns full detailed information about the Namespace.")
 def get_namespace_details(namespace: str = 'default', deep: bool = False) -> str:
     """
     Gets detailed information about a specific Namespace.
@@ -37,23 +43,26 @@ def get_namespace_details(namespace: str = 'default', deep: bool = False) -> str
     logger.critical(f"[FUNCTION] Attempting to get namespace details for {namespace} (deep={deep})")
 
     try:
-        ns = v1.read_namespace(name=namespace)
+        ns = (call_raw if deep else call)(v1.read_namespace, name=namespace)
     except Exception as e:
-        logger.error(f"[ERROR] Attempting to get namespace details for {namespace}: {e.reason}")
-        return f"[ERROR] Attempting to get namespace details for {namespace}: {e.reason}"
-
-    quotas = v1.list_namespaced_resource_quota(namespace=namespace).items
-    pods = v1.list_namespaced_pod(namespace=namespace).items
-    services = v1.list_namespaced_service(namespace=namespace).items
+        logger.error(f"[ERROR] Attempting to get namespace details for {namespace}: {error_reason(e)}")
+        return f"[ERROR] Attempting to get namespace details for {namespace}: {error_reason(e)}"
 
     if deep:
+        quotas = call_raw(v1.list_namespaced_resource_quota, namespace=namespace)["items"]
+        pods = call_raw(v1.list_namespaced_pod, namespace=namespace)["items"]
+        services = call_raw(v1.list_namespaced_service, namespace=namespace)["items"]
         data = {
-            "namespace": ns.to_dict(),
-            "resourceQuotas": [q.to_dict() for q in quotas],
-            "pods": [p.metadata.name for p in pods],
-            "services": [s.metadata.name for s in services]
+            "namespace": ns,
+            "resourceQuotas": quotas,
+            "pods": [p["metadata"]["name"] for p in pods],
+            "services": [s["metadata"]["name"] for s in services]
         }
-        return f"```json\n{json.dumps(data, indent=2, default=str)}\n```"
+        return deep_json(data)
+
+    quotas = call(v1.list_namespaced_resource_quota, namespace=namespace).items
+    pods = list_records(v1.list_namespaced_pod, namespace=namespace)
+    services = list_records(v1.list_namespaced_service, namespace=namespace)
 
     ns_phase = ns.status.phase
     labels = ns.metadata.labels or {}
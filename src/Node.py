@@ -3,17 +3,23 @@ Kubernetes Node Operations Module
 Provides functions to retrieve and format information about Kubernetes nodes and cluster version.
 """
 
-import json
 import logging
-from src.utils import load_kube_config
+from src import usage_sampler
+from src.usage_sampler import format_percent, format_value
+from src.utils import current_context, deep_json, error_reason, kube_contexts, load_kube_config
+from src.client import call, call_raw
+from src.records import list_records, parse_quantity, pods_by_node, requested
+from src.snapshot import matches, parse_selector
+from src.registry import tool
 
 v1, apps_v1, version_api = load_kube_config()
 logger = logging.getLogger(__name__)
 
+@tool("Retrieves the Kubernetes cluster version details.")
 def get_cluster_version_info() -> str:
     """Gets and formats Kubernetes cluster version details."""
     logger.critical("[RUNNING] Attempting to get cluster version info")
-    version_info = version_api.get_code()
+    version_info = call(version_api.get_code)
     lines = [
         "# Kubernetes Cluster Version",
         f"- **Major Version**: {version_info.major}",
@@ -23,13 +29,30 @@ def get_cluster_version_info() -> str:
     return "\n".join(lines)
 
 
+@tool("Lists the Kubernetes clusters (kubeconfig contexts) the agent can query.", per_context=False)
+def list_clusters() -> str:
+    """Lists the contexts tools accept as their `context` argument."""
+    logger.critical("[RUNNING] Attempting to list clusters")
+    try:
+        contexts, active = kube_contexts()
+    except Exception as e:
+        logger.error(f"[ERROR] Attempting to list clusters: {e}")
+        return f"[ERROR] Attempting to list clusters: {e}"
+
+    lines = ["# Clusters", ""]
+    for name in contexts or [active]:
+        lines.append(f"- {name}{' (current)' if name == active else ''}")
+    return "\n".join(lines)
+
+
+@tool("Lists all Kubernetes nodes in the cluster.")
 def list_all_nodes() -> str:
     """Lists all Kubernetes nodes in the cluster."""
     logger.critical("[RUNNING] Attempting to list all nodes") 
 
     try:
-        nodes = v1.list_node()
-        node_names = [node.metadata.name for node in nodes.items]
+        nodes = list_records(v1.list_node)
+        node_names = [node.name for node in nodes]
 
         # Create markdown formatted output
         lines = ["# Present Nodes", ""]
@@ -40,8 +63,11 @@ def list_all_nodes() -> str:
 
     except Exception as e:
         logger.error(f"[ERROR] Attempting to list all nodes: {e}")
-        return f"Error: {e.reason}"
+        return f"[ERROR] Attempting to list all nodes: {error_reason(e)}"
 
+@tool("Retrieves information about a specific Kubernetes node.",
+      node_name="The complete name of the node to retrieve details for. Must match exactly as shown in Kubernetes.",
+      deep="When true, returns full detailed information about the node.")
 def get_node_details(node_name: str, deep: bool = False) -> str:
     """
     Gets detailed information about a specific Kubernetes node.
@@ -53,14 +79,14 @@ def get_node_details(node_name: str, deep: bool = False) -> str:
     logger.critical(f"[RUNNING] Attempting to get node info for {node_name} (deep={deep})")
 
     try:
-        node = v1.read_node(node_name)
+        node = (call_raw if deep else call)(v1.read_node, name=node_name)
     except Exception as e:
         logger.error(f"[ERROR] Attempting to get node info for {node_name}: {e}")
-        return f"[ERROR] Attempting to get node info for {node_name}: {e.reason}"
+        return f"[ERROR] Attempting to get node info for {node_name}: {error_reason(e)}"
 
     # If deep is True, return all node info directly in JSON.
     if deep:
-        return f"```json\n{json.dumps(node.to_dict(), indent=2, default=str)}\n```"
+        return deep_json(node)
 
     labels = node.metadata.labels or {}
     conditions = node.status.conditions or []
@@ -96,6 +122,32 @@ def get_node_details(node_name: str, deep: bool = False) -> str:
     lines += [f"- {k}: {v}" for k, v in capacity.items()] if capacity else ["None"]
     lines += ["", "## Allocatable:"]
     lines += [f"- {k}: {v}" for k, v in allocatable.items()] if allocatable else ["None"]
+
+    # Current usage, when the background sampler (src/usage_sampler.py) has it
+    sampler = usage_sampler.sampled() if current_context() is None else None
+    stats = {m: sampler.stats('node', node_name, m) for m in ('cpu', 'memory')} if sampler else {}
+    if stats and all(stats.values()):
+        lines += ["", "## Usage:"]
+        for metric, s in stats.items():
+            percent = format_percent(s.latest, parse_quantity(allocatable.get(metric)))
+            lines.append(f"- {metric}: {format_value(metric, s.latest)} ({percent} of allocatable), "
+                         f"peak {format_value(metric, s.peak)}")
+
+    pods = pods_by_node(v1.list_pod_for_all_namespaces, node_name)[node_name]
+    cpu, memory = requested(pods)
+    lines += [
+        "",
+        f"## Pods ({len(pods)}):",
+        f"- Requested cpu: {format_value('cpu', cpu)} "
+        f"({format_percent(cpu, parse_quantity(allocatable.get('cpu')))} of allocatable)",
+        f"- Requested memory: {format_value('memory', memory)} "
+        f"({format_percent(memory, parse_quantity(allocatable.get('memory')))} of allocatable)",
+    ]
+    if pods:
+        lines += ["", "| Pod | Namespace | Status | CPU Request | Memory Request |",
+                  "|-----|-----------|--------|-------------|----------------|"]
+        lines += [f"| {p.name} | {p.namespace} | {p.phase} | {format_value('cpu', p.cpu_request)} | "
+                  f"{format_value('memory', p.memory_request)} |" for p in pods]
     lines += [
         "",
         "## Node System Info:",
@@ -109,6 +161,67 @@ def get_node_details(node_name: str, deep: bool = False) -> str:
 
     return "\n".join(lines)
 
+@tool("Shows how Pods are spread over Nodes: how many (matching) Pods run on each Node, and the CPU and memory "
+      "requested on each Node against its allocatable capacity. Use it for questions about which node runs which "
+      "pods, which node hosts the most pods of an application, or which nodes have room left.",
+      namespace="Only count Pods in this namespace. Counts Pods of all namespaces if not specified.",
+      name_contains="Only count Pods whose name contains this text, e.g. 'api'. Counts all Pods if not specified.",
+      label_selector="Only count Pods matching this label selector, e.g. 'app=api'. Counts all Pods if not specified.")
+def get_pod_placement(namespace: str = None, name_contains: str = None, label_selector: str = None) -> str:
+    """
+    Summarizes pod placement and requested resources per node.
+
+    Args:
+        namespace: Only count pods in this namespace
+        name_contains: Only count pods whose name contains this text
+        label_selector: Only count pods matching this label selector
+    """
+    logger.critical(f"[FUNCTION] Attempting to get pod placement (namespace={namespace}, "
+                    f"name_contains={name_contains}, label_selector={label_selector})")
+    try:
+        nodes = {n.name: n for n in list_records(v1.list_node)}
+        by_node = pods_by_node(v1.list_pod_for_all_namespaces)
+        requirements = parse_selector(label_selector)
+    except Exception as e:
+        logger.error(f"[ERROR] Attempting to get pod placement: {e}")
+        return f"[ERROR] Attempting to get pod placement: {e}"
+
+    filtered = bool(namespace or name_contains or label_selector)
+    rows = []
+    for node in list(nodes) + [n for n in by_node if n not in nodes]:
+        pods = by_node.get(node, [])
+        matching = [p for p in pods if (namespace is None or p.namespace == namespace)
+                    and (not name_contains or name_contains in p.name)
+                    and (not requirements or matches(requirements, p.labels))]
+        if filtered and not matching:
+            continue
+        rows.append((node, pods, matching))
+    rows.sort(key=lambda row: (-len(row[2]), row[0] or ''))
+
+    filters = [f for f in (namespace and f"namespace {namespace}", name_contains and f"name contains '{name_contains}'",
+                           label_selector and f"labels {label_selector}") if f]
+    lines = ["# Pod Placement" + (f" ({', '.join(filters)})" if filters else ""), ""]
+    if not rows:
+        lines.append("No matching pods found.")
+        return "\n".join(lines)
+
+    lines += ["| Node | Matching Pods | All Pods | CPU Requested | Memory Requested | Pods |",
+              "|------|---------------|----------|---------------|------------------|------|"]
+    for node, pods, matching in rows:
+        cpu, memory = requested(pods)
+        record = nodes.get(node)
+        names = ", ".join(p.name if namespace else f"{p.namespace}/{p.name}" for p in matching[:10])
+        if len(matching) > 10:
+            names += f", ... {len(matching) - 10} more"
+        lines.append(
+            f"| {node or '(unscheduled)'} | {len(matching)} | {len(pods)} | "
+            f"{format_value('cpu', cpu)} ({format_percent(cpu, record.cpu_allocatable if record else 0)}) | "
+            f"{format_value('memory', memory)} ({format_percent(memory, record.memory_allocatable if record else 0)}) | "
+            f"{names} |"
+        )
+    return "\n".join(lines)
+
+
 if __name__ == "__main__":
     print(list_all_nodes())
     print('-'*100)
@@ -3,21 +3,23 @@ Kubernetes Pod Module
 Handles operations for Pods, providing formatted information retrieval.
 """
 
-import json
 import logging
-from src.utils import load_kube_config
+from src.utils import deep_json, error_reason, load_kube_config
+from src.client import call, call_raw
+from src.records import list_records
+from src.registry import tool
 
 v1, apps_v1, version_api = load_kube_config()
 logger = logging.getLogger(__name__)
 
+@tool("Lists all Pods in the specified Kubernetes namespace.",
+      namespace="The Kubernetes namespace to list Pods from. Defaults to 'default' namespace if not specified.")
 def list_pods_in_namespace(namespace: str = 'default') -> str:
     """Lists all pods in the specified namespace."""
 
-    v1, apps_v1, version_api = load_kube_config()
-    
     logger.critical(f"[FUNCTION] Attempting to list pods in namespace: {namespace}")
     
-    pods = v1.list_namespaced_pod(namespace).items
+    pods = list_records(v1.list_namespaced_pod, namespace=namespace)
     if not pods:
         logger.error(f"[ERROR] No pods found in namespace: {namespace}")
         return f"# Pods in namespace: {namespace}\n\nNo pods found."
@@ -26,11 +28,15 @@ def list_pods_in_namespace(namespace: str = 'default') -> str:
 
     for pod in pods:
         lines.append(
-            f"| {pod.metadata.name} | {pod.status.phase} | {pod.spec.node_name} | {pod.status.pod_ip} |"
+            f"| {pod.name} | {pod.phase} | {pod.node} | {pod.pod_ip} |"
         )
     
     return "\n".join(lines)
 
+@tool("Retrieves information about a specific Pod in a Kubernetes namespace.",
+      pod_name="The complete name of the Pod to retrieve details for. Must match exactly as shown in Kubernetes.",
+      namespace="The Kubernetes namespace where the Pod is located. Defaults to 'default' namespace if not specified.",
+      deep="When true, returns full detailed information about the Pod, including events and logs.")
 def get_pod_details(pod_name: str, namespace: str = 'default', deep: bool = False) -> str:
     """
     Gets detailed information about a specific Pod.
@@ -40,34 +46,31 @@ def get_pod_details(pod_name: str, namespace: str = 'default', deep: bool = Fals
         namespace: Kubernetes namespace
         deep: If True, returns raw JSON data with full pod info, events, and logs
     """
-    v1, apps_v1, version_api = load_kube_config()
-
     logger.critical(f"[FUNCTION] Attempting to get pod details for {pod_name} in namespace: {namespace} (deep={deep})")
     try:
-        pod = v1.read_namespaced_pod(name=pod_name, namespace=namespace)
+        pod = (call_raw if deep else call)(v1.read_namespaced_pod, name=pod_name, namespace=namespace)
     except Exception as e:
-        logger.error(f"[ERROR] Attempting to get pod details for {pod_name} in namespace: {namespace}: {e.reason}")
-        return f"Error: {e.reason}"
+        logger.error(f"[ERROR] Attempting to get pod details for {pod_name} in namespace: {namespace}: {error_reason(e)}")
+        return f"[ERROR] Attempting to get pod details for {pod_name} in namespace: {namespace}: {error_reason(e)}"
 
     if deep:
         field_selector = f"involvedObject.kind=Pod,involvedObject.name={pod_name},involvedObject.namespace={namespace}"
-        events = v1.list_event_for_all_namespaces(field_selector=field_selector).items
-        events_dict = [e.to_dict() for e in events]
+        events = call_raw(v1.list_event_for_all_namespaces, field_selector=field_selector)["items"]
 
         container_logs = {}
-        for c in pod.spec.containers:
+        for c in pod["spec"]["containers"]:
             try:
-                log = v1.read_namespaced_pod_log(name=pod_name, namespace=namespace, container=c.name)
+                log = call(v1.read_namespaced_pod_log, name=pod_name, namespace=namespace, container=c["name"])
             except Exception as e:
                 log = "No logs available or unable to retrieve logs."
-            container_logs[c.name] = log
+            container_logs[c["name"]] = log
 
         data = {
-            "pod": pod.to_dict(),
-            "events": events_dict,
+            "pod": pod,
+            "events": events,
             "logs": container_logs
         }
-        return f"```json\n{json.dumps(data, indent=2, default=str)}\n```"
+        return deep_json(data)
 
     lines = [
         f"# Pod Details: {pod_name}",
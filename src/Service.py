@@ -3,22 +3,27 @@ Kubernetes Service Module
 Handles operations for Services, providing formatted information retrieval.
 """
 
-import json
 import logging
-from src.utils import load_kube_config
+from src.utils import LazyApi, deep_json, error_reason, load_kube_config
+from src.client import call, call_raw
+from src.records import endpoint_slices, list_records
+from src.registry import tool
 
 v1, apps_v1, version_api = load_kube_config()
+discovery_v1 = LazyApi('DiscoveryV1Api')
 logger = logging.getLogger(__name__)
 
+@tool("Lists all Services in the specified Kubernetes namespace.",
+      namespace="The Kubernetes namespace to list Services from. Defaults to 'default' namespace if not specified.")
 def list_service_names(namespace: str = 'default') -> str:
     """Lists all Services in the specified namespace."""
     logger.critical(f"[FUNCTION] Attempting to list services in namespace: {namespace}")
-    services = v1.list_namespaced_service(namespace=namespace).items
+    services = list_records(v1.list_namespaced_service, namespace=namespace)
 
     if not services:
         return f"No Services found in namespace {namespace}"
     
-    service_names = [s.metadata.name for s in services]
+    service_names = [s.name for s in services]
     lines = [
         f"# Services in namespace: {namespace}",
         ""
@@ -28,6 +33,34 @@ def list_service_names(namespace: str = 'default') -> str:
     return "\n".join(lines)
 
 
+def _endpoint_lines(service_name: str, namespace: str, has_selector: bool) -> list:
+    """Markdown lines for the ready and not-ready backends of a service, from its EndpointSlices."""
+    try:
+        slices = endpoint_slices(discovery_v1.list_namespaced_endpoint_slice, namespace, service_name)
+    except Exception as e:
+        logger.error(f"[ERROR] Attempting to get endpoints for {service_name} in namespace: {namespace}: {e}")
+        return [f"[ERROR] Attempting to get endpoints for {service_name} in namespace: {namespace}: {e}"]
+
+    endpoints = [e for s in slices for e in s.endpoints]
+    if not endpoints:
+        reason = "" if has_selector else " (the Service has no selector)"
+        return [f"No endpoints: the Service is not serving traffic{reason}"]
+
+    ready = sum(e.ready for e in endpoints)
+    ports = sorted({p for s in slices for p in s.ports})
+    lines = [f"- Ready: {ready}", f"- Not Ready: {len(endpoints) - ready}", f"- Ports: {', '.join(ports) or 'None'}", "",
+             "| Address | Pod | Node | Ready | Serving | Terminating |",
+             "|---------|-----|------|-------|---------|-------------|"]
+    for e in sorted(endpoints, key=lambda e: (e.ready, e.pod or e.address)):
+        lines.append(f"| {e.address} | {e.pod or '-'} | {e.node or '-'} | {e.ready} | {e.serving} | {e.terminating} |")
+    return lines
+
+
+@tool("Retrieves information about a specific Service in a Kubernetes namespace, including which Pods back it "
+      "and whether they are ready to serve traffic.",
+      service_name="The complete name of the Service to retrieve details for. Must match exactly as shown in Kubernetes.",
+      namespace="The Kubernetes namespace where the Service is located. Defaults to 'default' namespace if not specified.",
+      deep="When true, returns full detailed information about the Service.")
 def get_service_details(service_name: str, namespace: str = 'default', deep: bool = False) -> str:
     """
     Gets detailed information about a specific Service.
@@ -40,13 +73,13 @@ def get_service_details(service_name: str, namespace: str = 'default', deep: boo
     logger.critical(f"[FUNCTION] Attempting to get service details for {service_name} in namespace: {namespace} (deep={deep})")
 
     try:
-        svc = v1.read_namespaced_service(name=service_name, namespace=namespace)
+        svc = (call_raw if deep else call)(v1.read_namespaced_service, name=service_name, namespace=namespace)
     except Exception as e:
-        logger.error(f"[ERROR] Attempting to get service details for {service_name} in namespace: {namespace}: {e.reason}")
-        return f"[ERROR] Attempting to get service details for {service_name} in namespace: {namespace}: {e.reason}"
+        logger.error(f"[ERROR] Attempting to get service details for {service_name} in namespace: {namespace}: {error_reason(e)}")
+        return f"[ERROR] Attempting to get service details for {service_name} in namespace: {namespace}: {error_reason(e)}"
 
     if deep:
-        return f"```json\n{json.dumps(svc.to_dict(), indent=2, default=str)}\n```"
+        return deep_json(svc)
 
     lines = [
         f"# Service: {service_name}",
@@ -68,6 +101,9 @@ def get_service_details(service_name: str, namespace: str = 'default', deep: boo
             port_info.append(f"  - TargetPort: {p.target_port}")
         lines.extend(port_info)
 
+    lines.extend(["", "## Endpoints"])
+    lines.extend(_endpoint_lines(service_name, namespace, bool(svc.spec.selector)))
+
     return "\n".join(lines)
 
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+"""
+Kubernetes Resource Usage Module
+Answers CPU and memory usage questions (top consumers, trends, saturation) from the usage history
+kept in memory by the background sampler (src/usage_sampler.py).
+"""
+
+import logging
+
+from src import usage_sampler
+from src.usage_sampler import format_percent, format_value
+from src.records import list_records
+from src.registry import tool
+from src.utils import current_context, load_kube_config
+
+v1, apps_v1, version_api = load_kube_config()
+logger = logging.getLogger(__name__)
+
+KINDS = ('pod', 'node')
+METRIC_NAMES = {'cpu': 'CPU', 'memory': 'Memory'}
+
+
+def _sampler(action: str):
+    """The sampler with at least one sample, or an error message for the LLM."""
+    if current_context() is not None:
+        return None, f"[ERROR] Attempting to {action}: usage history is only kept for the current context"
+    try:
+        return usage_sampler.current(), None
+    except Exception as e:
+        logger.error(f"[ERROR] Attempting to {action}: metrics API not available: {e}")
+        return None, f"[ERROR] Attempting to {action}: metrics API (metrics-server) not available: {e}"
+
+
+def _allocatable() -> dict:
+    """Allocatable (cores, bytes) per node name."""
+    return {n.name: {'cpu': n.cpu_allocatable, 'memory': n.memory_allocatable} for n in list_records(v1.list_node)}
+
+
+def _window(sampler) -> str:
+    seconds = sampler.window()
+    span = f"{seconds / 60:.0f}m" if seconds >= 60 else f"{seconds:.0f}s"
+    return f"{span}, sampled every {sampler.interval:g}s"
+
+
+@tool("Lists the Pods or Nodes using the most CPU or memory right now, with their average and peak usage "
+      "over the recent history.",
+      kind="Which objects to rank: 'pod' or 'node'. Defaults to 'pod'.",
+      metric="What to rank by: 'cpu' or 'memory'. Defaults to 'memory'.",
+      namespace="Only rank Pods in this namespace. Ranks Pods of all namespaces if not specified.",
+      count="How many objects to list. Defaults to 10.")
+def get_top_resource_usage(kind: str = 'pod', metric: str = 'memory', namespace: str = None, count: int = 10) -> str:
+    """
+    Ranks pods or nodes by their current CPU or memory usage.
+
+    Args:
+        kind: 'pod' or 'node'
+        metric: 'cpu' or 'memory'
+        namespace: Only rank pods in this namespace
+        count: Number of objects to list
+    """
+    logger.critical(f"[FUNCTION] Attempting to get top {kind}s by {metric} usage (namespace={namespace})")
+    kind, metric = kind.lower().rstrip('s'), metric.lower()
+    if kind not in KINDS or metric not in METRIC_NAMES:
+        return "[ERROR] Attempting to get top resource usage: kind must be 'pod' or 'node' and metric 'cpu' or 'memory'"
+    sampler, error = _sampler("get top resource usage")
+    if error:
+        return error
+
+    top = sampler.top(kind, metric, count, namespace if kind == 'pod' else None)
+    scope = f" in namespace {namespace}" if namespace and kind == 'pod' else ""
+    lines = [f"# Top {kind}s by {METRIC_NAMES[metric]} usage{scope}", f"Over the last {_window(sampler)}.", ""]
+    if not top:
+        lines.append(f"No {kind} usage found.")
+        return "\n".join(lines)
+
+    if kind == 'node':
+        allocatable = _allocatable()
+        lines += ["| Node | Current | % of Allocatable | Average | Peak |", "|------|---------|------------------|---------|------|"]
+        for name, s in top:
+            percent = format_percent(s.latest, allocatable.get(name, {}).get(metric))
+            lines.append(f"| {name} | {format_value(metric, s.latest)} | {percent} | "
+                         f"{format_value(metric, s.mean)} | {format_value(metric, s.peak)} |")
+    else:
+        lines += ["| Pod | Namespace | Current | Average | Peak |", "|-----|-----------|---------|---------|------|"]
+        for (ns, name), s in top:
+            lines.append(f"| {name} | {ns} | {format_value(metric, s.latest)} | "
+                         f"{format_value(metric, s.mean)} | {format_value(metric, s.peak)} |")
+    return "\n".join(lines)
+
+
+@tool("Retrieves the CPU and memory usage history of a specific Pod or Node: current, lowest, average and peak "
+      "usage and whether it is rising or falling. For Nodes, also the share of allocatable capacity in use.",
+      name="The complete name of the Pod or Node. Must match exactly as shown in Kubernetes.",
+      kind="'pod' or 'node'. Defaults to 'pod'.",
+      namespace="The Kubernetes namespace of the Pod. Defaults to 'default' namespace if not specified.")
+def get_resource_usage_trend(name: str, kind: str = 'pod', namespace: str = 'default') -> str:
+    """
+    Summarizes the usage history of one pod or node.
+
+    Args:
+        name: Name of the pod or node
+        kind: 'pod' or 'node'
+        namespace: Kubernetes namespace of the pod
+    """
+    logger.critical(f"[FUNCTION] Attempting to get usage trend of {kind} {name} (namespace={namespace})")
+    kind = kind.lower().rstrip('s')
+    if kind not in KINDS:
+        return f"[ERROR] Attempting to get usage trend of {name}: kind must be 'pod' or 'node'"
+    sampler, error = _sampler(f"get usage trend of {kind} {name}")
+    if error:
+        return error
+
+    key = name if kind == 'node' else (namespace, name)
+    stats = {metric: sampler.stats(kind, key, metric) for metric in METRIC_NAMES}
+    where = name if kind == 'node' else f"{namespace}/{name}"
+    if stats['cpu'] is None:
+        return f"[ERROR] Attempting to get usage trend of {kind} {where}: no usage samples found"
+
+    allocatable = _allocatable().get(name, {}) if kind == 'node' else {}
+    lines = [f"# Usage of {kind} {where}", f"Over the last {_window(sampler)} ({stats['cpu'].samples} samples).", ""]
+    header = "| Metric | Current | Low | Average | Peak | Trend per Hour |"
+    lines += [header + (" % of Allocatable |" if allocatable else ""),
+              "|--------|---------|-----|---------|------|----------------|" + ("------------------|" if allocatable else "")]
+    for metric, s in stats.items():
+        trend = "n/a" if s.slope != s.slope else f"{'+' if s.slope >= 0 else '-'}{format_value(metric, abs(s.slope))}"
+        row = (f"| {METRIC_NAMES[metric]} | {format_value(metric, s.latest)} | {format_value(metric, s.low)} | "
+               f"{format_value(metric, s.mean)} | {format_value(metric, s.peak)} | {trend} |")
+        if allocatable:
+            row += f" {format_percent(s.latest, allocatable.get(metric))} |"
+        lines.append(row)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(get_top_resource_usage(kind='pod', metric='memory'))
+    print('-'*100)
+    print(get_top_resource_usage(kind='node', metric='cpu'))
+    print('-'*100)
+    print(get_resource_usage_trend(name='node-0', kind='node'))
@@ -3,26 +3,33 @@ Kubernetes Workload Module
 Handles operations for DaemonSets, StatefulSets, and ReplicaSets.
 """
 
-import json
 import logging
-from src.utils import load_kube_config
+from src.utils import deep_json, error_reason, load_kube_config
+from src.client import call, call_raw
+from src.records import Ownership, list_records
+from src.registry import tool
+from src.snapshot import kind_name, resource_for_kind
 
 v1, apps_v1, version_api = load_kube_config()
 logger = logging.getLogger(__name__)
 
+OWNERSHIP_RESOURCES = ('deployment', 'replica_set', 'stateful_set', 'daemon_set', 'pod')
+
+@tool("Lists all DaemonSets in the specified Kubernetes namespace.",
+      namespace="The Kubernetes namespace to list DaemonSets from. Defaults to 'default' namespace if not specified.")
 def list_daemonset_names(namespace: str = 'default') -> str:
     """Lists all DaemonSets in the specified namespace."""
     logger.critical(f"[FUNCTION] Attempting to list daemonsets in namespace: {namespace}")
     try:
-        daemonsets = apps_v1.list_namespaced_daemon_set(namespace=namespace).items
+        daemonsets = list_records(apps_v1.list_namespaced_daemon_set, namespace=namespace)
     except Exception as e:
-        logger.error(f"[ERROR] Attempting to list daemonsets in namespace: {namespace}: {e.reason}")
-        return f"[ERROR] Attempting to list daemonsets in namespace: {namespace}: {e.reason}"
+        logger.error(f"[ERROR] Attempting to list daemonsets in namespace: {namespace}: {error_reason(e)}")
+        return f"[ERROR] Attempting to list daemonsets in namespace: {namespace}: {error_reason(e)}"
     
     if len(daemonsets) == 0:
         return f"No DaemonSets found in namespace {namespace}"
     
-    ds_names = [ds.metadata.name for ds in daemonsets]
+    ds_names = [ds.name for ds in daemonsets]
 
     # Create markdown formatted output
     lines = [
@@ -36,6 +43,10 @@ def list_daemonset_names(namespace: str = 'default') -> str:
     return "\n".join(lines)
 
 
+@tool("Retrieves information about a specific DaemonSet in a Kubernetes namespace.",
+      daemonset_name="The complete name of the DaemonSet to retrieve details for. Must match exactly as shown in Kubernetes.",
+      namespace="The Kubernetes namespace where the DaemonSet is located. Defaults to 'default' namespace if not specified.",
+      deep="When true, returns full detailed information about the DaemonSet.")
 def get_daemonset_details(daemonset_name: str, namespace: str = 'default', deep: bool = False) -> str:
     """
     Gets detailed information about a specific DaemonSet.
@@ -47,13 +58,13 @@ def get_daemonset_details(daemonset_name: str, namespace: str = 'default', deep:
     """
     logger.critical(f"[FUNCTION] Attempting to get daemonset details for {daemonset_name} in namespace: {namespace} (deep={deep})")
     try:
-        ds = apps_v1.read_namespaced_daemon_set(name=daemonset_name, namespace=namespace)
+        ds = (call_raw if deep else call)(apps_v1.read_namespaced_daemon_set, name=daemonset_name, namespace=namespace)
     except Exception as e:
-        logger.error(f"[ERROR] Attempting to get daemonset details for {daemonset_name} in namespace: {namespace}: {e.reason}")
-        return f"[ERROR] Attempting to get daemonset details for {daemonset_name} in namespace: {namespace}: {e.reason}"
+        logger.error(f"[ERROR] Attempting to get daemonset details for {daemonset_name} in namespace: {namespace}: {error_reason(e)}")
+        return f"[ERROR] Attempting to get daemonset details for {daemonset_name} in namespace: {namespace}: {error_reason(e)}"
 
     if deep:
-        return f"```json\n{json.dumps(ds.to_dict(), indent=2, default=str)}\n```"
+        return deep_json(ds)
 
     status = ds.status
     container_images = [c.image for c in ds.spec.template.spec.containers]
@@ -102,13 +113,15 @@ def get_daemonset_details(daemonset_name: str, namespace: str = 'default', deep:
     return "\n".join(lines)
 
 
+@tool("Lists all StatefulSets in the specified Kubernetes namespace.",
+      namespace="The Kubernetes namespace to list StatefulSets from. Defaults to 'default' namespace if not specified.")
 def list_statefulset_names(namespace: str = 'default') -> str:
     """Lists all StatefulSets in the specified namespace."""
     logger.critical(f"[FUNCTION] Attempting to list statefulsets in namespace: {namespace}")
     
-    statefulsets = apps_v1.list_namespaced_stateful_set(namespace=namespace).items
+    statefulsets = list_records(apps_v1.list_namespaced_stateful_set, namespace=namespace)
     
-    sts_names = [sts.metadata.name for sts in statefulsets]
+    sts_names = [sts.name for sts in statefulsets]
 
     lines = [
         f"# StatefulSets in namespace: {namespace}",
@@ -123,6 +136,10 @@ def list_statefulset_names(namespace: str = 'default') -> str:
 
     return "\n".join(lines)
 
+@tool("Retrieves information about a specific StatefulSet in a Kubernetes namespace.",
+      statefulset_name="The complete name of the StatefulSet to retrieve details for. Must match exactly as shown in Kubernetes.",
+      namespace="The Kubernetes namespace where the StatefulSet is located. Defaults to 'default' namespace if not specified.",
+      deep="When true, returns full detailed information about the StatefulSet.")
 def get_statefulset_details(statefulset_name: str, namespace: str = 'default', deep: bool = False) -> str:
     """
     Gets detailed information about a specific StatefulSet.
@@ -134,13 +151,13 @@ def get_statefulset_details(statefulset_name: str, namespace: str = 'default', d
     """
     logger.critical(f"[FUNCTION] Attempting to get statefulset details for {statefulset_name} in namespace: {namespace} (deep={deep})")
     try:
-        sts = apps_v1.read_namespaced_stateful_set(name=statefulset_name, namespace=namespace)
+        sts = (call_raw if deep else call)(apps_v1.read_namespaced_stateful_set, name=statefulset_name, namespace=namespace)
     except Exception as e:
-        logger.error(f"[ERROR] Attempting to get statefulset details for {statefulset_name} in namespace: {namespace}: {e.reason}")
-        return f"[ERROR] Attempting to get statefulset details for {statefulset_name} in namespace: {namespace}: {e.reason}"
+        logger.error(f"[ERROR] Attempting to get statefulset details for {statefulset_name} in namespace: {namespace}: {error_reason(e)}")
+        return f"[ERROR] Attempting to get statefulset details for {statefulset_name} in namespace: {namespace}: {error_reason(e)}"
 
     if deep:
-        return f"```json\n{json.dumps(sts.to_dict(), indent=2, default=str)}\n```"
+        return deep_json(sts)
 
     lines = [
         f"# StatefulSet: {statefulset_name}",
@@ -192,10 +209,12 @@ def get_statefulset_details(statefulset_name: str, namespace: str = 'default', d
 
     return "\n".join(lines)
 
+@tool("Lists all ReplicaSets in the specified Kubernetes namespace.",
+      namespace="The Kubernetes namespace to list ReplicaSets from. Defaults to 'default' namespace if not specified.")
 def list_replicaset_names(namespace: str = 'default') -> str:
     """Lists all ReplicaSets in the specified namespace."""
     logger.critical(f"[FUNCTION] Attempting to list replicasets in namespace: {namespace}")
-    replicasets = apps_v1.list_namespaced_replica_set(namespace=namespace).items
+    replicasets = list_records(apps_v1.list_namespaced_replica_set, namespace=namespace)
     lines = [
         f"# ReplicaSets in namespace: {namespace}",
         ""  # Empty line for better readability
@@ -205,10 +224,14 @@ def list_replicaset_names(namespace: str = 'default') -> str:
         lines.append("No ReplicaSets found in this namespace.")
     else:
         for rs in replicasets:
-            lines.append(f"- {rs.metadata.name}")
+            lines.append(f"- {rs.name}")
 
     return "\n".join(lines)
 
+@tool("Retrieves information about a specific ReplicaSet in a Kubernetes namespace.",
+      replicaset_name="The complete name of the ReplicaSet to retrieve details for. Must match exactly as shown in Kubernetes.",
+      namespace="The Kubernetes namespace where the ReplicaSet is located. Defaults to 'default' namespace if not specified.",
+      deep="When true, returns full detailed information about the ReplicaSet.")
 def get_replicaset_details(replicaset_name: str, namespace: str = 'default', deep: bool = False) -> str:
     """
     Gets detailed information about a specific ReplicaSet.
@@ -220,13 +243,13 @@ def get_replicaset_details(replicaset_name: str, namespace: str = 'default', dee
     """
     logger.critical(f"[FUNCTION] Attempting to get replicaset details for {replicaset_name} in namespace: {namespace} (deep={deep})")
     try:
-        rs = apps_v1.read_namespaced_replica_set(name=replicaset_name, namespace=namespace)
+        rs = (call_raw if deep else call)(apps_v1.read_namespaced_replica_set, name=replicaset_name, namespace=namespace)
     except Exception as e:
-        logger.error(f"[ERROR] Attempting to get replicaset details for {replicaset_name} in namespace: {namespace}: {e.reason}")
-        return f"[ERROR] Attempting to get replicaset details for {replicaset_name} in namespace: {namespace}: {e.reason}"
+        logger.error(f"[ERROR] Attempting to get replicaset details for {replicaset_name} in namespace: {namespace}: {error_reason(e)}")
+        return f"[ERROR] Attempting to get replicaset details for {replicaset_name} in namespace: {namespace}: {error_reason(e)}"
 
     if deep:
-        return f"```json\n{json.dumps(rs.to_dict(), indent=2, default=str)}\n```"
+        return deep_json(rs)
 
     lines = [
         f"# ReplicaSet: {replicaset_name}",
@@ -252,6 +275,69 @@ def get_replicaset_details(replicaset_name: str, namespace: str = 'default', dee
     return "\n".join(lines)
 
 
+def _describe(resource: str, record) -> str:
+    if resource == 'pod':
+        return f"Pod {record.name} ({record.phase}, node {record.node})"
+    return f"{kind_name(resource)} {record.name} ({record.ready or 0}/{record.replicas or 0} ready)"
+
+
+@tool("Shows what owns a Pod, ReplicaSet, Deployment, StatefulSet or DaemonSet (e.g. Pod <- ReplicaSet <- "
+      "Deployment) and everything it controls. Use it instead of guessing ownership from name suffixes.",
+      kind="The kind of the object: 'Pod', 'ReplicaSet', 'Deployment', 'StatefulSet' or 'DaemonSet'.",
+      name="The complete name of the object. Must match exactly as shown in Kubernetes.",
+      namespace="The Kubernetes namespace of the object. Defaults to 'default' namespace if not specified.")
+def get_ownership(kind: str, name: str, namespace: str = 'default') -> str:
+    """
+    Gets the owner chain and the controlled objects of a workload object.
+
+    Args:
+        kind: Kind of the object
+        name: Name of the object
+        namespace: Kubernetes namespace
+    """
+    logger.critical(f"[FUNCTION] Attempting to get ownership of {kind} {name} in namespace: {namespace}")
+    resource = resource_for_kind(kind)
+    if resource not in OWNERSHIP_RESOURCES:
+        return f"[ERROR] Attempting to get ownership of {kind} {name}: kind must be one of Pod, ReplicaSet, Deployment, StatefulSet or DaemonSet"
+    # Resolved per call, so the list calls go to the context of this call
+    graph = Ownership({
+        'deployment': apps_v1.list_namespaced_deployment,
+        'replica_set': apps_v1.list_namespaced_replica_set,
+        'stateful_set': apps_v1.list_namespaced_stateful_set,
+        'daemon_set': apps_v1.list_namespaced_daemon_set,
+        'pod': v1.list_namespaced_pod,
+    }, namespace)
+    try:
+        record = graph.get(resource, name)
+        if record is None:
+            return f"[ERROR] Attempting to get ownership of {kind_name(resource)} {name} in namespace: {namespace}: not found"
+
+        lines = [f"# Ownership of {kind_name(resource)}: {name}", f"**Namespace**: {namespace}", "", "## Owner Chain",
+                 f"- {_describe(resource, record)}"]
+        depth, owned = 1, record
+        while owned.owner_kind:
+            owner_resource, owner = graph.owner(owned)
+            if owner is None:
+                missing = "not indexed" if owner_resource is None else "not found"
+                lines.append(f"{'  ' * depth}- owned by {owned.owner_kind} {owned.owner_name} ({missing})")
+                break
+            lines.append(f"{'  ' * depth}- owned by {_describe(owner_resource, owner)}")
+            depth, owned = depth + 1, owner
+
+        lines += ["", "## Controlled Objects"]
+        stack = [(0, child) for child in reversed(graph.children(resource, name))]
+        if not stack:
+            lines.append("None")
+        while stack:
+            depth, (child_resource, child) = stack.pop()
+            lines.append(f"{'  ' * depth}- {_describe(child_resource, child)}")
+            stack += [(depth + 1, c) for c in reversed(graph.children(child_resource, child.name))]
+    except Exception as e:
+        logger.error(f"[ERROR] Attempting to get ownership of {kind} {name} in namespace: {namespace}: {e}")
+        return f"[ERROR] Attempting to get ownership of {kind} {name} in namespace: {namespace}: {e}"
+
+    return "\n".join(lines)
+
 
 
 if __name__ == "__main__":
@@ -290,4 +376,6 @@ if __name__ == "__main__":
     print('-'*100)
     print(get_replicaset_details(replicaset_name='hello', namespace='hello', deep=True))
     print('-'*100)
-    print(get_replicaset_details(replicaset_name='hello', namespace='hello', deep=False))
\ No newline at end of file
+    print(get_replicaset_details(replicaset_name='hello', namespace='hello', deep=False))
+    print('-'*100)
+    print(get_ownership(kind='Deployment', name='hello', namespace='default'))
@@ -0,0 +1,239 @@
+"""
+Kubernetes API Call Layer
+Routes read calls from the component modules through one place so they can be shared between queries.
+"""
+
+import contextvars
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from src import metrics, resilience, snapshot, store, tracing
+from src.utils import current_context
+
+_batch_cache = contextvars.ContextVar('batch_cache', default=None)
+_api_timers = contextvars.ContextVar('api_timers', default=())
+
+
+class _Entry:
+    """Result slot for a single API call, filled in by whichever thread runs it first."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BatchCache:
+    """Object cache shared by all queries of one batch.
+
+    Every distinct API call is made at most once per batch: later callers get the
+    stored result, and callers arriving while the call is still running wait for it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_call(self, key, fn):
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._entries[key] = _Entry()
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.CACHE_REQUESTS.inc(cache='batch', result='miss' if owner else 'hit')
+
+        if owner:
+            try:
+                entry.result = fn()
+            except Exception as e:
+                entry.error = e
+            finally:
+                entry.done.set()
+        else:
+            entry.done.wait()
+
+        if entry.error is not None:
+            raise entry.error
+        return entry.result
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class SingleFlight:
+    """Coalesces identical API calls that are in flight at the same time.
+
+    Unlike `BatchCache` nothing is kept once a call finishes: only callers that
+    arrive while it is running share its result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            entry = self._inflight.get(key)
+            owner = entry is None
+            if owner:
+                entry = self._inflight[key] = _Entry()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        metrics.CACHE_REQUESTS.inc(cache='single_flight', result='miss' if owner else 'hit')
+
+        if owner:
+            try:
+                entry.result = fn()
+            except Exception as e:
+                entry.error = e
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+                entry.done.set()
+        else:
+            entry.done.wait()
+
+        if entry.error is not None:
+            raise entry.error
+        return entry.result
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+
+single_flight = SingleFlight()
+
+
+@contextmanager
+def batch_scope(cache: BatchCache = None):
+    """Serves every API call made inside the block from `cache` (a new one if not given)."""
+    cache = cache or BatchCache()
+    token = _batch_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _batch_cache.reset(token)
+
+
+class ApiTimer:
+    """Accumulates the number of API calls and the time spent in them."""
+
+    __slots__ = ('calls', 'seconds')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+
+@contextmanager
+def api_timer():
+    """Times every API call made inside the block. Timers nest, each one sees all inner calls."""
+    timer = ApiTimer()
+    token = _api_timers.set(_api_timers.get() + (timer,))
+    try:
+        yield timer
+    finally:
+        _api_timers.reset(token)
+
+
+def call_key(method, args: tuple, kwargs: dict) -> tuple:
+    """Identifies an API call independently of which module's client instance made it, per context."""
+    owner = getattr(method, '__self__', None)
+    api = type(owner).__name__ + (':metadata' if getattr(owner, 'metadata_only', False) else '')
+    return (current_context(), api, method.__name__, args, tuple(sorted((k, str(v)) for k, v in kwargs.items())))
+
+
+@lru_cache(maxsize=None)
+def verb_resource(method_name: str) -> tuple:
+    """Splits a client method name into verb and resource, e.g. list_namespaced_pod -> (list, pod)."""
+    m = re.match(r"^(list|read|get)_(?:namespaced_)?(.+?)(?:_for_all_namespaces)?$", method_name)
+    return (m.group(1), m.group(2)) if m else ('call', method_name)
+
+
+def _metadata_only(verb: str, body: dict) -> dict:
+    """Reduces a raw list or read response to PartialObjectMetadata, as a metadata-only call gets from the API server."""
+    if verb == 'read':
+        return {'apiVersion': 'meta.k8s.io/v1', 'kind': 'PartialObjectMetadata', 'metadata': body.get('metadata')}
+    body['items'] = [{'apiVersion': 'meta.k8s.io/v1', 'kind': 'PartialObjectMetadata', 'metadata': item.get('metadata')}
+                     for item in body.get('items') or []]
+    return body
+
+
+def _request(method, args: tuple, kwargs: dict):
+    """Makes the actual API request, recording its latency and failures.
+
+    The request is answered from the loaded snapshot in offline mode, and from the
+    object store when it holds the resource. Both hold the kubeconfig's current context only.
+    Requests to an API server go through its context's rate limit, retries and circuit breaker.
+    """
+    verb, resource = verb_resource(method.__name__)
+    raw = kwargs.get('_preload_content') is False
+    metadata = verb in ('list', 'read') and getattr(getattr(method, '__self__', None), 'metadata_only', False)
+    offline = snapshot.current()
+    local = store.current() if current_context() is None else None
+    start = time.perf_counter()
+    try:
+        with tracing.span(f"k8s.{verb}", resource=resource, params=kwargs, context=current_context()):
+            if offline is not None:
+                result = offline.serve(verb, resource, args, kwargs)
+                return _metadata_only(verb, result) if metadata else result
+            if local is not None:
+                result = local.serve(verb, resource, args, kwargs, metadata=metadata)
+                if result is not None:
+                    return _metadata_only(verb, result) if metadata else result
+            result = resilience.backend('k8s', current_context()).call(method, *args, **kwargs)
+            return json.loads(result.data) if raw else result
+    except Exception as e:
+        metrics.K8S_REQUEST_ERRORS.inc(verb=verb, resource=resource, code=getattr(e, 'status', None) or 'error')
+        raise
+    finally:
+        metrics.K8S_REQUEST_DURATION.observe(time.perf_counter() - start, verb=verb, resource=resource)
+
+
+def call(method, *args, **kwargs):
+    """Calls a kubernetes client read method.
+
+    The call is served from the active batch cache if any, and otherwise shares
+    the result of an identical call already in flight from another thread.
+    """
+    key = call_key(method, args, kwargs)
+
+    def fetch():
+        return single_flight.do(key, lambda: _request(method, args, kwargs))
+
+    timers = _api_timers.get()
+    start = time.perf_counter()
+    try:
+        cache = _batch_cache.get()
+        if cache is None:
+            return fetch()
+        return cache.get_or_call(key, fetch)
+    finally:
+        if timers:
+            elapsed = time.perf_counter() - start
+            for timer in timers:
+                timer.calls += 1
+                timer.seconds += elapsed
+
+
+def call_raw(method, *args, **kwargs) -> dict:
+    """Like `call`, but returns the response as parsed JSON instead of client model objects.
+
+    Used for deep output, which needs the whole object as JSON anyway: it skips building
+    the models and converting them back with `to_dict()`.
+    """
+    return call(method, *args, _preload_content=False, **kwargs)
@@ -0,0 +1,165 @@
+"""
+Metrics Module
+Minimal Prometheus-style counters, gauges and histograms, rendered in the text exposition format.
+"""
+
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, '') for n in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One slot per bucket plus +Inf, then the running sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[i] += 1
+            counts[-1] += value
+
+    def _render_sample(self, key, counts):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = f'le="{_number(bound)}"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(counts[-1])}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Queries
+QUERY_DURATION = registry.register(Histogram(
+    'ak15_query_duration_seconds', 'End to end duration of query requests.', ['endpoint']))
+QUERIES_IN_FLIGHT = registry.register(Gauge(
+    'ak15_queries_in_flight', 'Query requests currently being served.', ['endpoint']))
+
+# LLM
+LLM_ROUND_DURATION = registry.register(Histogram(
+    'ak15_llm_round_duration_seconds', 'Duration of each chat completion round.', ['model']))
+LLM_TOKENS = registry.register(Counter(
+    'ak15_llm_tokens_total', 'Tokens used by chat completions.', ['model', 'type']))
+LLM_ERRORS = registry.register(Counter(
+    'ak15_llm_errors_total', 'Failed chat completion calls.', ['model']))
+
+# Tools
+TOOL_DURATION = registry.register(Histogram(
+    'ak15_tool_duration_seconds', 'Duration of each tool call.', ['tool']))
+TOOL_OUTPUT_BYTES = registry.register(Histogram(
+    'ak15_tool_output_bytes', 'Size of tool outputs returned to the LLM.', ['tool'], SIZE_BUCKETS))
+TOOL_ERRORS = registry.register(Counter(
+    'ak15_tool_errors_total', 'Tool calls that failed or returned an error.', ['tool']))
+
+# Kubernetes API
+K8S_REQUEST_DURATION = registry.register(Histogram(
+    'ak15_k8s_request_duration_seconds', 'Duration of Kubernetes API requests.', ['verb', 'resource']))
+K8S_REQUEST_ERRORS = registry.register(Counter(
+    'ak15_k8s_request_errors_total', 'Failed Kubernetes API requests.', ['verb', 'resource', 'code']))
+CACHE_REQUESTS = registry.register(Counter(
+    'ak15_cache_requests_total', 'Kubernetes reads served by a cache layer, by result.', ['cache', 'result']))
+
+# Backends (Kubernetes API servers and the OpenAI API, see src/resilience.py)
+BACKEND_RETRIES = registry.register(Counter(
+    'ak15_backend_retries_total', 'Retries of transient backend failures.', ['backend']))
+BACKEND_THROTTLED_SECONDS = registry.register(Counter(
+    'ak15_backend_throttled_seconds_total', 'Time calls waited for the client-side rate limit.', ['backend']))
+BACKEND_REJECTED = registry.register(Counter(
+    'ak15_backend_rejected_total', 'Calls failed fast because the backend circuit was open.', ['backend']))
+BACKEND_CIRCUIT_OPEN = registry.register(Gauge(
+    'ak15_backend_circuit_open', 'Whether the backend circuit is open (1) or closed (0).', ['backend']))
@@ -0,0 +1,475 @@
+"""
+Compact Records Module
+Small slotted records holding only the fields the list and summary renderers use, built
+straight from raw API JSON. Repeated strings are interned and identical label sets are shared,
+so a 50k-pod cluster takes tens of MB instead of the GBs of full client model objects.
+
+With the object store enabled (src/store.py), records are kept in memory and updated from the
+store's change journal; otherwise they are built per call from `call_raw`. Full objects are
+still read with `call`/`call_raw` for details and deep output.
+"""
+
+import json
+import re
+import sys
+import threading
+
+from src import snapshot, store
+from src.client import call_raw, verb_resource
+from src.snapshot import field_value, matches, parse_selector
+from src.utils import current_context
+
+_intern = sys.intern
+
+QUANTITY = re.compile(r"^([+-]?[0-9.]+(?:[eE][+-]?[0-9]+)?)([a-zA-Z]*)$")
+QUANTITY_SUFFIXES = {
+    '': 1, 'n': 1e-9, 'u': 1e-6, 'm': 1e-3, 'k': 1e3, 'M': 1e6, 'G': 1e9, 'T': 1e12, 'P': 1e15, 'E': 1e18,
+    'Ki': 2 ** 10, 'Mi': 2 ** 20, 'Gi': 2 ** 30, 'Ti': 2 ** 40, 'Pi': 2 ** 50, 'Ei': 2 ** 60,
+}
+
+
+def parse_quantity(value) -> float:
+    """Converts a Kubernetes quantity ('250m', '1Gi', '2') to a number of base units (cores, bytes)."""
+    if value is None:
+        return 0.0
+    m = QUANTITY.match(str(value).strip())
+    if not m or m.group(2) not in QUANTITY_SUFFIXES:
+        raise ValueError(f"invalid quantity: {value!r}")
+    return float(m.group(1)) * QUANTITY_SUFFIXES[m.group(2)]
+
+
+class _Interner:
+    """Shares identical label dicts and string tuples between records."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shared = {}
+
+    def labels(self, labels: dict) -> dict:
+        if not labels:
+            return {}
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            shared = self._shared.get(key)
+            if shared is None:
+                shared = self._shared[key] = {_intern(k): _intern(str(v)) for k, v in key}
+        return shared
+
+    def strings(self, values) -> tuple:
+        key = tuple(_intern(str(v)) for v in values)
+        with self._lock:
+            return self._shared.setdefault(key, key)
+
+
+class Record:
+    """Fields common to every kind. `labels` is shared between records and must not be modified."""
+
+    __slots__ = ('namespace', 'name', 'labels', 'owner_kind', 'owner_name')
+
+    def __init__(self, obj: dict, interner: _Interner):
+        metadata = obj.get('metadata') or {}
+        self.namespace = _intern(metadata.get('namespace') or '')
+        self.name = metadata.get('name')
+        self.labels = interner.labels(metadata.get('labels'))
+        owner = next((o for o in metadata.get('ownerReferences') or [] if o.get('controller')), None)
+        self.owner_kind = _intern(owner['kind']) if owner else None
+        self.owner_name = owner['name'] if owner else None
+
+
+class PodRecord(Record):
+    __slots__ = ('phase', 'node', 'pod_ip', 'images', 'ready', 'restarts', 'cpu_request', 'memory_request')
+
+    def __init__(self, obj: dict, interner: _Interner):
+        super().__init__(obj, interner)
+        spec, status = obj.get('spec') or {}, obj.get('status') or {}
+        containers = spec.get('containers') or []
+        statuses = status.get('containerStatuses') or []
+        self.phase = _intern(status.get('phase') or 'Unknown')
+        self.node = _intern(spec['nodeName']) if spec.get('nodeName') else None
+        self.pod_ip = status.get('podIP')
+        self.images = interner.strings(c.get('image') for c in containers)
+        self.ready = sum(1 for s in statuses if s.get('ready'))
+        self.restarts = sum(s.get('restartCount') or 0 for s in statuses)
+        requests = [(c.get('resources') or {}).get('requests') or {} for c in containers]
+        self.cpu_request = sum(parse_quantity(r.get('cpu')) for r in requests)
+        self.memory_request = sum(parse_quantity(r.get('memory')) for r in requests)
+
+
+class ServiceRecord(Record):
+    __slots__ = ('type', 'cluster_ip', 'selector', 'ports')
+
+    def __init__(self, obj: dict, interner: _Interner):
+        super().__init__(obj, interner)
+        spec = obj.get('spec') or {}
+        self.type = _intern(spec.get('type') or 'ClusterIP')
+        self.cluster_ip = spec.get('clusterIP')
+        self.selector = interner.labels(spec.get('selector'))
+        self.ports = interner.strings(f"{p.get('port')}/{p.get('protocol', 'TCP')}" for p in spec.get('ports') or [])
+
+
+class WorkloadRecord(Record):
+    """Deployments, ReplicaSets, StatefulSets and DaemonSets."""
+
+    __slots__ = ('replicas', 'ready', 'available', 'updated', 'selector', 'images')
+
+    def __init__(self, obj: dict, interner: _Interner):
+        super().__init__(obj, interner)
+        spec, status = obj.get('spec') or {}, obj.get('status') or {}
+        self.replicas = spec.get('replicas', status.get('desiredNumberScheduled') or 0)
+        self.ready = status.get('readyReplicas', status.get('numberReady')) or 0
+        self.available = status.get('availableReplicas', status.get('numberAvailable')) or 0
+        self.updated = status.get('updatedReplicas', status.get('updatedNumberScheduled')) or 0
+        self.selector = interner.labels((spec.get('selector') or {}).get('matchLabels'))
+        containers = field_value(spec, 'template.spec.containers') or []
+        self.images = interner.strings(c.get('image') for c in containers)
+
+
+class NodeRecord(Record):
+    __slots__ = ('ready', 'unschedulable', 'cpu_allocatable', 'memory_allocatable')
+
+    def __init__(self, obj: dict, interner: _Interner):
+        super().__init__(obj, interner)
+        spec, status = obj.get('spec') or {}, obj.get('status') or {}
+        self.ready = any(c.get('type') == 'Ready' and c.get('status') == 'True' for c in status.get('conditions') or [])
+        self.unschedulable = bool(spec.get('unschedulable'))
+        allocatable = status.get('allocatable') or {}
+        self.cpu_allocatable = parse_quantity(allocatable.get('cpu'))
+        self.memory_allocatable = parse_quantity(allocatable.get('memory'))
+
+
+class NamespaceRecord(Record):
+    __slots__ = ('phase',)
+
+    def __init__(self, obj: dict, interner: _Interner):
+        super().__init__(obj, interner)
+        self.phase = _intern((obj.get('status') or {}).get('phase') or 'Unknown')
+
+
+class ConfigRecord(Record):
+    """ConfigMaps and Secrets: key names only."""
+
+    __slots__ = ('keys',)
+
+    def __init__(self, obj: dict, interner: _Interner):
+        super().__init__(obj, interner)
+        self.keys = interner.strings(sorted({**(obj.get('data') or {}), **(obj.get('binaryData') or {})}))
+
+
+SERVICE_NAME_LABEL = 'kubernetes.io/service-name'
+
+
+class Endpoint:
+    __slots__ = ('address', 'ready', 'serving', 'terminating', 'pod', 'node')
+
+    def __init__(self, endpoint: dict):
+        conditions = endpoint.get('conditions') or {}
+        self.address = ','.join(endpoint.get('addresses') or [])
+        # Unset conditions mean ready, serving as ready, and not terminating
+        self.ready = conditions.get('ready') is not False
+        self.serving = conditions.get('serving', self.ready) is not False
+        self.terminating = bool(conditions.get('terminating'))
+        target = endpoint.get('targetRef') or {}
+        self.pod = target.get('name') if target.get('kind') == 'Pod' else None
+        self.node = _intern(endpoint.get('nodeName')) if endpoint.get('nodeName') else None
+
+
+class EndpointSliceRecord(Record):
+    """One EndpointSlice of a service: its ports and backends."""
+
+    __slots__ = ('service', 'ports', 'endpoints')
+
+    def __init__(self, obj: dict, interner: _Interner):
+        super().__init__(obj, interner)
+        self.service = self.labels.get(SERVICE_NAME_LABEL)
+        self.ports = interner.strings(f"{p.get('port')}/{p.get('protocol', 'TCP')}" for p in obj.get('ports') or [])
+        self.endpoints = tuple(Endpoint(e) for e in obj.get('endpoints') or [])
+
+
+# Workload kinds that own other objects through a controller ownerReference, and what they own
+OWNER_RESOURCES = {'Deployment': 'deployment', 'ReplicaSet': 'replica_set', 'StatefulSet': 'stateful_set',
+                   'DaemonSet': 'daemon_set'}
+CHILD_RESOURCES = {'deployment': ('replica_set',), 'replica_set': ('pod',), 'stateful_set': ('pod',),
+                   'daemon_set': ('pod',)}
+
+RECORD_TYPES = {
+    'pod': PodRecord,
+    'service': ServiceRecord,
+    'deployment': WorkloadRecord,
+    'replica_set': WorkloadRecord,
+    'stateful_set': WorkloadRecord,
+    'daemon_set': WorkloadRecord,
+    'node': NodeRecord,
+    'namespace': NamespaceRecord,
+    'config_map': ConfigRecord,
+    'secret': ConfigRecord,
+    'endpoint_slice': EndpointSliceRecord,
+}
+
+
+class RecordCache:
+    """Records of the object store's contents, loaded per resource on first use and kept current from its journal.
+
+    Pods are also indexed by node name (None for unscheduled pods), workload objects by their
+    controlling owner, for ownership lookups, and EndpointSlices by service.
+    """
+
+    def __init__(self, object_store):
+        self.store = object_store
+        self._lock = threading.Lock()
+        self._interner = _Interner()
+        self._records = {}
+        self._pods_by_node = {}
+        self._children = {}
+        self._slices_by_service = {}
+        self._seq = object_store.last_seq()
+
+    def _build(self, resource: str, body: bytes):
+        return RECORD_TYPES[resource](json.loads(body), self._interner)
+
+    @staticmethod
+    def _remove(index: dict, index_key, key):
+        entries = index[index_key]
+        del entries[key]
+        if not entries:
+            del index[index_key]
+
+    def _set(self, resource: str, key: tuple, record):
+        self._drop(resource, key)
+        if resource == 'pod':
+            self._pods_by_node.setdefault(record.node, {})[key] = record
+        elif resource == 'endpoint_slice':
+            self._slices_by_service.setdefault((record.namespace, record.service), {})[key] = record
+        if record.owner_kind in OWNER_RESOURCES:
+            owner = (OWNER_RESOURCES[record.owner_kind], record.namespace, record.owner_name)
+            self._children.setdefault(owner, {})[(resource, record.name)] = record
+        self._records[resource][key] = record
+
+    def _drop(self, resource: str, key: tuple):
+        record = self._records[resource].pop(key, None)
+        if record is None:
+            return
+        if resource == 'pod':
+            self._remove(self._pods_by_node, record.node, key)
+        elif resource == 'endpoint_slice':
+            self._remove(self._slices_by_service, (record.namespace, record.service), key)
+        if record.owner_kind in OWNER_RESOURCES:
+            owner = (OWNER_RESOURCES[record.owner_kind], record.namespace, record.owner_name)
+            self._remove(self._children, owner, (resource, record.name))
+
+    def _load(self, resource: str):
+        for key in list(self._records.get(resource, ())):
+            self._drop(resource, key)
+        self._records[resource] = {}
+        for ns, name, body in self.store.rows(resource):
+            self._set(resource, (ns, name), self._build(resource, body))
+
+    def _sync(self):
+        changes, oldest = self.store.changes_since(self._seq)
+        if oldest is not None and oldest > self._seq + 1:
+            # Fell behind the journal: everything loaded may be stale
+            for resource in list(self._records):
+                self._load(resource)
+        else:
+            for _, _, resource, namespace, name, change_type in changes:
+                records = self._records.get(resource)
+                if records is None:
+                    continue
+                if change_type == 'RELISTED':
+                    self._load(resource)
+                elif change_type == 'DELETED':
+                    self._drop(resource, (namespace, name))
+                else:
+                    for ns, n, body in self.store.rows(resource, namespace, name):
+                        self._set(resource, (ns, n), self._build(resource, body))
+        if changes:
+            self._seq = changes[-1][0]
+
+    def list(self, resource: str, namespace: str = None) -> list:
+        with self._lock:
+            self._sync()
+            if resource not in self._records:
+                self._load(resource)
+            records = list(self._records[resource].values())
+        if namespace is not None:
+            records = [r for r in records if r.namespace == namespace]
+        return sorted(records, key=lambda r: (r.namespace, r.name))
+
+    def _loaded(self, resources):
+        self._sync()
+        for resource in resources:
+            if resource not in self._records:
+                self._load(resource)
+
+    def get(self, resource: str, namespace: str, name: str):
+        with self._lock:
+            self._loaded((resource,))
+            return self._records[resource].get((namespace, name))
+
+    def children(self, resource: str, namespace: str, name: str) -> list:
+        """(resource, record) of the objects `resource` namespace/name controls."""
+        with self._lock:
+            self._loaded(CHILD_RESOURCES.get(resource, ()))
+            return list(((r, record) for (r, _), record in self._children.get((resource, namespace, name), {}).items()))
+
+    def endpoint_slices(self, namespace: str, service: str) -> list:
+        with self._lock:
+            self._loaded(('endpoint_slice',))
+            return list(self._slices_by_service.get((namespace, service), {}).values())
+
+    def pods_by_node(self, node: str = None) -> dict:
+        """Pod records per node name, of all nodes or only `node`."""
+        with self._lock:
+            self._sync()
+            if 'pod' not in self._records:
+                self._load('pod')
+            if node is not None:
+                return {node: list(self._pods_by_node.get(node, {}).values())}
+            return {n: list(pods.values()) for n, pods in self._pods_by_node.items()}
+
+    def count(self) -> dict:
+        with self._lock:
+            return {resource: len(records) for resource, records in self._records.items()}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def _store_cache(resource: str):
+    """The record cache of the active object store, if it holds `resource`."""
+    global _cache
+    local = store.current() if current_context() is None else None
+    if local is None or snapshot.current() is not None or local.resource_version(resource) is None:
+        return None
+    with _cache_lock:
+        if _cache is None or _cache.store is not local:
+            _cache = RecordCache(local)
+    return _cache
+
+
+def list_records(method, namespace: str = None, label_selector: str = None, **kwargs) -> list:
+    """Compact records for a client list call, e.g. `list_records(v1.list_namespaced_pod, namespace='default')`."""
+    resource = verb_resource(method.__name__)[1]
+    cache = _store_cache(resource)
+    if cache is None:
+        if namespace is not None:
+            kwargs['namespace'] = namespace
+        if label_selector:
+            kwargs['label_selector'] = label_selector
+        items = call_raw(method, **kwargs)["items"]
+        interner = _Interner()
+        return [RECORD_TYPES[resource](obj, interner) for obj in items]
+
+    records = cache.list(resource, namespace)
+    if label_selector:
+        requirements = parse_selector(label_selector)
+        records = [r for r in records if matches(requirements, r.labels)]
+    return records
+
+
+def pods_by_node(method, node: str = None) -> dict:
+    """Pod records per node name (None: unscheduled), of all nodes or only `node`, sorted by namespace and name.
+
+    `method` is the all-namespaces pod list call (`v1.list_pod_for_all_namespaces`). With the object store,
+    the record cache's node index answers without a scan; otherwise one list call is made, filtered by
+    the API server to `node` when given.
+    """
+    cache = _store_cache('pod')
+    if cache is not None:
+        by_node = cache.pods_by_node(node)
+    else:
+        kwargs = {'field_selector': f"spec.nodeName={node}"} if node is not None else {}
+        by_node = {}
+        for pod in list_records(method, **kwargs):
+            by_node.setdefault(pod.node, []).append(pod)
+        if node is not None:
+            by_node.setdefault(node, [])
+    return {n: sorted(pods, key=lambda p: (p.namespace, p.name)) for n, pods in by_node.items()}
+
+
+def endpoint_slices(method, namespace: str, service: str) -> list:
+    """EndpointSlice records of a service, sorted by name.
+
+    `method` is the namespaced EndpointSlice list call. With the object store, the record cache's
+    service index answers; otherwise one list call is made, selected by the service name label.
+    """
+    cache = _store_cache('endpoint_slice')
+    if cache is not None:
+        slices = cache.endpoint_slices(namespace, service)
+    else:
+        slices = list_records(method, namespace=namespace, label_selector=f"{SERVICE_NAME_LABEL}={service}")
+    return sorted(slices, key=lambda s: s.name)
+
+
+def deployment_pods(methods: dict, namespace: str, name: str, label_selector: str) -> list:
+    """(ReplicaSet name, pod record) of the pods a Deployment controls, sorted by ReplicaSet and pod name.
+
+    `methods` maps 'replica_set' and 'pod' to their namespaced list calls. With the object store, the
+    record cache's owner index answers; otherwise one pod list call is made with the Deployment's
+    selector, and the pods controlled by a ReplicaSet are grouped by it.
+    """
+    if _store_cache('replica_set') is not None and _store_cache('pod') is not None:
+        graph = Ownership(methods, namespace)
+        pods = [(rs.name, pod) for _, rs in graph.children('deployment', name)
+                for _, pod in graph.children('replica_set', rs.name)]
+    else:
+        pods = [(pod.owner_name, pod) for pod in list_records(methods['pod'], namespace=namespace,
+                                                              label_selector=label_selector)
+                if pod.owner_kind == 'ReplicaSet']
+    return sorted(pods, key=lambda p: (p[0], p[1].name))
+
+
+def requested(pods: list) -> tuple:
+    """CPU cores and memory bytes requested by the pods that hold node resources (not Succeeded or Failed)."""
+    active = [p for p in pods if p.phase not in ('Succeeded', 'Failed')]
+    return sum(p.cpu_request for p in active), sum(p.memory_request for p in active)
+
+
+class Ownership:
+    """Owner and controlled-object lookups within one namespace, e.g. Deployment -> ReplicaSets -> Pods.
+
+    `methods` maps a resource to its namespaced list call (`{'pod': v1.list_namespaced_pod, ...}`). With
+    the object store, lookups are answered from the record cache's owner index; otherwise each resource
+    is listed once on first use and indexed by owner.
+    """
+
+    def __init__(self, methods: dict, namespace: str):
+        self.methods = methods
+        self.namespace = namespace
+        self._listed = {}
+
+    def _index(self, resource: str) -> tuple:
+        """(records by name, (resource, record) lists by owner) of one listed resource."""
+        if resource not in self._listed:
+            by_name, by_owner = {}, {}
+            for record in list_records(self.methods[resource], namespace=self.namespace):
+                by_name[record.name] = record
+                if record.owner_kind in OWNER_RESOURCES:
+                    owner = (OWNER_RESOURCES[record.owner_kind], record.owner_name)
+                    by_owner.setdefault(owner, []).append((resource, record))
+            self._listed[resource] = by_name, by_owner
+        return self._listed[resource]
+
+    def get(self, resource: str, name: str):
+        cache = _store_cache(resource)
+        if cache is not None:
+            return cache.get(resource, self.namespace, name)
+        return self._index(resource)[0].get(name)
+
+    def owner(self, record):
+        """(resource, record) of the controlling owner of `record`; record is None if it is not indexed."""
+        resource = OWNER_RESOURCES.get(record.owner_kind)
+        if resource is None:
+            return None, None
+        return resource, self.get(resource, record.owner_name)
+
+    def children(self, resource: str, name: str) -> list:
+        """(resource, record) of the objects controlled by `resource` `name`, sorted by name."""
+        children = []
+        for child in CHILD_RESOURCES.get(resource, ()):
+            cache = _store_cache(child)
+            if cache is not None:
+                children += [c for c in cache.children(resource, self.namespace, name) if c[0] == child]
+            else:
+                children += self._index(child)[1].get((resource, name), [])
+        return sorted(children, key=lambda c: c[1].name)
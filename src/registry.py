@@ -0,0 +1,169 @@
+"""
+Tool Registry Module
+Tools are declared once with the @tool decorator on their src/ function; the registry derives
+the OpenAI function schema from the signature and provides a prebuilt dispatch table.
+
+In multi-cluster mode (AK15_CONTEXTS set), every tool also takes a `context` argument naming
+the kubeconfig context to query, or 'all' to run the tool on every context concurrently.
+"""
+
+import contextvars
+import importlib
+import inspect
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from src import utils
+
+# Modules whose functions are exposed to the LLM, in the order they are presented
+TOOL_MODULES = [
+    'src.Configuration',
+    'src.Deployment',
+    'src.Namespace',
+    'src.Node',
+    'src.Pod',
+    'src.Workload',
+    'src.Service',
+    'src.Changes',
+    'src.Usage',
+]
+
+JSON_TYPES = {str: 'string', bool: 'boolean', int: 'integer', float: 'number'}
+
+ALL_CONTEXTS = 'all'
+CONTEXT_WORKERS = int(os.getenv('AK15_CONTEXT_WORKERS', 8))
+CONTEXT_DESCRIPTION = ("The Kubernetes context (cluster) to query, as listed by list_clusters. "
+                       f"Use '{ALL_CONTEXTS}' to query every cluster. Defaults to the current context.")
+
+TOOLS = {}
+
+
+class ToolArgumentError(ValueError):
+    """Raised when the LLM calls a tool with missing, unknown or mistyped arguments."""
+
+
+class Tool:
+    """A registered tool: its function, OpenAI schema and argument rules."""
+
+    __slots__ = ('name', 'function', 'schema', 'types', 'required', 'defaults', 'per_context')
+
+    def __init__(self, function, description: str, param_descriptions: dict, per_context: bool = True):
+        self.name = function.__name__
+        self.per_context = per_context and bool(utils.CONTEXTS)
+        self.function = function
+        self.types = {}
+        self.required = []
+        self.defaults = {}
+
+        properties = {}
+        for param in inspect.signature(function).parameters.values():
+            annotation = param.annotation if param.annotation is not inspect.Parameter.empty else str
+            if annotation not in JSON_TYPES:
+                raise TypeError(f"Tool {self.name}: unsupported type {annotation!r} for '{param.name}'")
+            if param.name not in param_descriptions:
+                raise TypeError(f"Tool {self.name}: missing description for '{param.name}'")
+
+            self.types[param.name] = annotation
+            prop = {"type": JSON_TYPES[annotation], "description": param_descriptions[param.name]}
+            if param.default is inspect.Parameter.empty:
+                self.required.append(param.name)
+            else:
+                self.defaults[param.name] = param.default
+                if param.default is not None:
+                    prop["default"] = param.default
+            properties[param.name] = prop
+        if self.per_context:
+            properties['context'] = {"type": "string", "description": CONTEXT_DESCRIPTION}
+
+        parameters = {"type": "object", "properties": properties, "additionalProperties": False}
+        if self.required:
+            parameters["required"] = self.required
+        self.schema = {
+            "type": "function",
+            "function": {"name": self.name, "description": description, "parameters": parameters}
+        }
+
+    def validate(self, args: dict) -> dict:
+        """Checks `args` against the signature and fills in defaults."""
+        for key, value in args.items():
+            expected = self.types.get(key)
+            if expected is None:
+                raise ToolArgumentError(f"unknown argument '{key}'")
+            if value is None:
+                # null only stands for a parameter that defaults to None, a required one counts as missing
+                if key in self.defaults and self.defaults[key] is not None:
+                    raise ToolArgumentError(f"argument '{key}' must be of type {JSON_TYPES[expected]}, not null")
+                continue
+            # bool is an int subclass, so check it explicitly
+            if not isinstance(value, expected) or (expected is not bool and isinstance(value, bool)):
+                if not (expected is float and isinstance(value, int)):
+                    raise ToolArgumentError(f"argument '{key}' must be of type {JSON_TYPES[expected]}")
+        missing = [name for name in self.required if args.get(name) is None]
+        if missing:
+            raise ToolArgumentError(f"missing required argument(s): {', '.join(missing)}")
+        return {**self.defaults, **args}
+
+    def __call__(self, args: dict):
+        if not self.per_context:
+            return self.function(**self.validate(args))
+        args = dict(args)
+        context = args.pop('context', None)
+        if not isinstance(context, (str, type(None))):
+            raise ToolArgumentError("argument 'context' must be of type string")
+        args = self.validate(args)
+        if context == ALL_CONTEXTS:
+            return self._fan_out(args)
+        if context is not None:
+            contexts, active = utils.kube_contexts()
+            if context not in contexts and context != active:
+                raise ToolArgumentError(f"unknown context '{context}', available: {', '.join(contexts)}")
+        with utils.use_context(context):
+            return self.function(**args)
+
+    def _run_in(self, context: str, args: dict) -> str:
+        try:
+            with utils.use_context(context):
+                return self.function(**args)
+        except Exception as e:
+            return f"[ERROR] {e}"
+
+    def _fan_out(self, args: dict) -> str:
+        """Runs the tool on every context concurrently and merges the results, one section per cluster."""
+        contexts, _ = utils.kube_contexts()
+        with ThreadPoolExecutor(max_workers=min(CONTEXT_WORKERS, len(contexts) or 1)) as pool:
+            # Each task runs in a copy of the caller's context, keeping its batch cache, timers and trace
+            results = [pool.submit(contextvars.copy_context().run, self._run_in, c, args) for c in contexts]
+            return "\n\n".join(f"# Cluster: {c}\n{r.result()}" for c, r in zip(contexts, results))
+
+
+def tool(description: str, per_context: bool = True, **param_descriptions):
+    """Registers the decorated function as an LLM tool.
+
+    Args:
+        description: Tool description shown to the LLM
+        per_context: Whether the tool takes the `context` argument in multi-cluster mode
+        **param_descriptions: Description of each parameter of the function
+    """
+    def decorator(function):
+        TOOLS[function.__name__] = Tool(function, description, param_descriptions, per_context)
+        return function
+    return decorator
+
+
+def load_tools() -> dict:
+    """Imports every tool module so their tools are registered, and returns the registry."""
+    for module in TOOL_MODULES:
+        importlib.import_module(module)
+    return TOOLS
+
+
+def schemas() -> list:
+    """OpenAI function schemas of all registered tools."""
+    return [t.schema for t in load_tools().values()]
+
+
+if __name__ == "__main__":
+    # Tool modules register into src.registry, not into this __main__ copy of it
+    from src import registry
+    print(json.dumps(registry.schemas(), indent=4))
@@ -0,0 +1,207 @@
+"""
+Resilience Module
+Protects the backends the agent calls (each Kubernetes API server and the OpenAI API) with a
+token-bucket rate limit, jittered retries of transient failures (429, 5xx, timeouts, connection
+errors) and a circuit breaker that fails fast while a backend keeps failing.
+
+Settings, with `<B>` = K8S or OPENAI:
+  AK15_<B>_QPS, AK15_<B>_BURST      Requests per second and burst size (0 QPS disables the limit)
+  AK15_<B>_RETRIES                 Retries of a transient failure (default 3)
+  AK15_RETRY_BASE, AK15_RETRY_MAX  Backoff base and cap in seconds (full jitter, default 0.2 and 5)
+  AK15_BREAKER_FAILURES            Consecutive transient failures that open a circuit (default 5)
+  AK15_BREAKER_RESET               Seconds an open circuit fails fast before a trial call (default 30)
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+
+from src import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE = float(os.getenv('AK15_RETRY_BASE', 0.2))
+RETRY_MAX = float(os.getenv('AK15_RETRY_MAX', 5))
+BREAKER_FAILURES = int(os.getenv('AK15_BREAKER_FAILURES', 5))
+BREAKER_RESET = float(os.getenv('AK15_BREAKER_RESET', 30))
+
+# backend kind -> (QPS, burst, retries) defaults
+DEFAULTS = {'k8s': (50, 100, 3), 'openai': (10, 20, 3)}
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+# Exception class names (anywhere in the MRO) of timeouts and connection failures, from the
+# standard library, urllib3 (kubernetes client) and httpx/openai, matched by name so neither is imported
+TRANSIENT_ERRORS = frozenset((
+    'TimeoutError', 'ConnectionError', 'MaxRetryError', 'ProtocolError', 'NewConnectionError', 'ReadTimeoutError',
+    'ConnectTimeoutError', 'APIConnectionError', 'APITimeoutError', 'TimeoutException', 'NetworkError',
+))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit is open."""
+
+    def __init__(self, backend: str, retry_in: float):
+        super().__init__(f"{backend} is unavailable after repeated failures, not retrying for {retry_in:.0f}s")
+        self.backend = backend
+        self.status = 503
+
+
+def status_code(e: Exception):
+    """HTTP status of a kubernetes (`status`) or openai (`status_code`) error, or None."""
+    return getattr(e, 'status', None) or getattr(e, 'status_code', None)
+
+
+def transient(e: Exception) -> bool:
+    """Whether a failed call is worth retrying: throttling, a server error, a timeout or a dropped connection."""
+    if isinstance(e, CircuitOpenError):
+        return False
+    if status_code(e) in RETRY_STATUSES:
+        return True
+    return any(c.__name__ in TRANSIENT_ERRORS for c in type(e).__mro__)
+
+
+def retry_after(e: Exception):
+    """Seconds from a Retry-After header of the failed response, if any."""
+    headers = getattr(e, 'headers', None) or getattr(getattr(e, 'response', None), 'headers', None)
+    try:
+        return float(headers.get('Retry-After')) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average and bursts of up to `burst` calls."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Takes a token, waiting for one if the bucket is empty. Returns the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve the token now, so concurrent callers queue up behind each other
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive transient failures; after `reset` seconds one trial call is let through."""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset: float = BREAKER_RESET):
+        self.failures = failures
+        self.reset = reset
+        self._count = 0
+        self._opened = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def open(self) -> bool:
+        return self._opened is not None
+
+    def allow(self):
+        """None if a call may go ahead, otherwise the seconds until the next trial call."""
+        with self._lock:
+            if self._opened is None:
+                return None
+            remaining = self._opened + self.reset - time.monotonic()
+            if remaining > 0 or self._trial:
+                return max(remaining, 0.0)
+            self._trial = True
+            return None
+
+    def success(self):
+        with self._lock:
+            self._count, self._opened, self._trial = 0, None, False
+
+    def failure(self) -> bool:
+        """Records a transient failure, returning True if it opened the circuit."""
+        with self._lock:
+            self._count += 1
+            reopened = self._trial
+            self._trial = False
+            if reopened or (self._opened is None and self._count >= self.failures):
+                self._opened = time.monotonic()
+                return True
+            return False
+
+
+class Backend:
+    """Rate limit, retries and circuit breaker of one backend."""
+
+    def __init__(self, name: str, qps: float, burst: int, retries: int):
+        self.name = name
+        self.retries = retries
+        self.bucket = TokenBucket(qps, burst)
+        self.breaker = CircuitBreaker()
+
+    def _succeeded(self):
+        if self.breaker.open:
+            metrics.BACKEND_CIRCUIT_OPEN.set(0, backend=self.name)
+        self.breaker.success()
+
+    def call(self, fn, *args, **kwargs):
+        """Calls `fn`, retrying transient failures with jittered exponential backoff."""
+        attempt = 0
+        while True:
+            retry_in = self.breaker.allow()
+            if retry_in is not None:
+                metrics.BACKEND_REJECTED.inc(backend=self.name)
+                raise CircuitOpenError(self.name, retry_in)
+            waited = self.bucket.acquire()
+            if waited:
+                metrics.BACKEND_THROTTLED_SECONDS.inc(waited, backend=self.name)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not transient(e):
+                    # The backend answered (404, 403, bad request): it is up
+                    self._succeeded()
+                    raise
+                if self.breaker.failure():
+                    metrics.BACKEND_CIRCUIT_OPEN.set(1, backend=self.name)
+                    logger.error(f"[ERROR] {self.name} circuit opened after repeated failures "
+                                 f"({status_code(e) or type(e).__name__})")
+                if attempt >= self.retries or self.breaker.open:
+                    raise
+                attempt += 1
+                delay = retry_after(e) or random.uniform(0, min(RETRY_MAX, RETRY_BASE * 2 ** attempt))
+                metrics.BACKEND_RETRIES.inc(backend=self.name)
+                logger.error(f"[ERROR] {self.name} call failed ({status_code(e) or type(e).__name__}), "
+                             f"retry {attempt}/{self.retries} in {delay:.2f}s")
+                time.sleep(min(delay, RETRY_MAX))
+                continue
+            self._succeeded()
+            return result
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def backend(kind: str, name: str = None) -> Backend:
+    """The shared Backend `kind` ('k8s' or 'openai'), one per `name` (e.g. per kube context)."""
+    key = f"{kind}:{name}" if name else kind
+    b = _backends.get(key)
+    if b is None:
+        with _backends_lock:
+            b = _backends.get(key)
+            if b is None:
+                qps, burst, retries = DEFAULTS[kind]
+                prefix = f"AK15_{kind.upper()}_"
+                b = _backends[key] = Backend(key, float(os.getenv(prefix + 'QPS', qps)),
+                                             int(os.getenv(prefix + 'BURST', burst)),
+                                             int(os.getenv(prefix + 'RETRIES', retries)))
+    return b
@@ -0,0 +1,421 @@
+"""
+Cluster Snapshot Module
+Exports every resource kind the tools read (plus events and bounded pod logs) into a single
+compressed, indexed file, and serves the tools' API calls from such a file instead of the API server.
+
+File layout: a magic header, then one zlib-compressed JSON blob per object, then the compressed
+JSON index, then a fixed trailer pointing at the index. The index maps resource -> namespace ->
+name to the blob's offset and length, together with each object's labels and selectable fields,
+so opening a snapshot only parses the index and objects are decompressed from the memory-mapped
+file when a tool reads them.
+
+Usage:
+    python -m src.snapshot export cluster.ak15snap [--log-lines 200] [--include-secret-data]
+    python -m src.snapshot info cluster.ak15snap
+    AK15_SNAPSHOT=cluster.ak15snap python main.py   # offline mode
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+MAGIC = b'AK15SNAP'
+FORMAT_VERSION = 1
+TRAILER = struct.Struct('<QQ8s')  # index offset, index length, magic
+
+# resource (as in the client method names) -> (API class, model class, namespaced)
+RESOURCES = {
+    'namespace': ('CoreV1Api', 'V1Namespace', False),
+    'node': ('CoreV1Api', 'V1Node', False),
+    'pod': ('CoreV1Api', 'V1Pod', True),
+    'service': ('CoreV1Api', 'V1Service', True),
+    'config_map': ('CoreV1Api', 'V1ConfigMap', True),
+    'secret': ('CoreV1Api', 'V1Secret', True),
+    'resource_quota': ('CoreV1Api', 'V1ResourceQuota', True),
+    'event': ('CoreV1Api', 'CoreV1Event', True),
+    'deployment': ('AppsV1Api', 'V1Deployment', True),
+    'daemon_set': ('AppsV1Api', 'V1DaemonSet', True),
+    'stateful_set': ('AppsV1Api', 'V1StatefulSet', True),
+    'replica_set': ('AppsV1Api', 'V1ReplicaSet', True),
+    'endpoint_slice': ('DiscoveryV1Api', 'V1EndpointSlice', True),
+}
+
+# Fields stored in the index so field selectors don't need to decompress objects
+INDEXED_FIELDS = {
+    'pod': ('spec.nodeName', 'status.phase'),
+    'event': ('involvedObject.kind', 'involvedObject.name', 'involvedObject.namespace', 'reason', 'type'),
+}
+
+LIST_PAGE_SIZE = 500
+LOG_WORKERS = 16
+
+
+def resource_for_kind(kind: str):
+    """Resource for a kind as the LLM may write it: 'Deployment', 'deployments', 'config-map', ..."""
+    wanted = kind.lower().replace('-', '').replace('_', '').rstrip('s')
+    return next((r for r in RESOURCES if r.replace('_', '') == wanted), None)
+
+
+def kind_name(resource: str) -> str:
+    """Kind of a resource, e.g. replica_set -> ReplicaSet."""
+    return ''.join(part.title() for part in resource.split('_'))
+
+
+def field_value(obj: dict, path: str):
+    """Value at a dotted field path of a raw (camelCase) object, or None."""
+    for part in path.split('.'):
+        if not isinstance(obj, dict):
+            return None
+        obj = obj.get(part)
+    return obj
+
+
+def parse_selector(selector: str) -> list:
+    """Parses a label or field selector into (key, op, value) requirements.
+
+    Supports `k=v`, `k==v`, `k!=v`, `k` (exists) and `!k` (does not exist).
+    """
+    requirements = []
+    for term in filter(None, (t.strip() for t in (selector or '').split(','))):
+        if '!=' in term:
+            key, value = term.split('!=', 1)
+            requirements.append((key.strip(), '!=', value.strip()))
+        elif '=' in term:
+            key, value = term.replace('==', '=').split('=', 1)
+            requirements.append((key.strip(), '=', value.strip()))
+        elif term.startswith('!'):
+            requirements.append((term[1:].strip(), '!', None))
+        else:
+            requirements.append((term, 'exists', None))
+    return requirements
+
+
+def matches(requirements: list, values: dict) -> bool:
+    for key, op, value in requirements:
+        actual = values.get(key)
+        if op == '=' and (actual is None or str(actual) != value):
+            return False
+        if op == '!=' and actual is not None and str(actual) == value:
+            return False
+        if op == 'exists' and key not in values:
+            return False
+        if op == '!' and key in values:
+            return False
+    return True
+
+
+def not_found(what: str, where: str = 'snapshot'):
+    """The 404 ApiException the API server would have raised for a missing object."""
+    from kubernetes.client.rest import ApiException
+    error = ApiException(status=404, reason="Not Found")
+    error.body = f"{what} is not in the {where}"
+    return error
+
+
+class _Raw:
+    """Minimal response object for ApiClient.deserialize."""
+
+    __slots__ = ('data',)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+_api_client = None
+
+
+def deserialize(data: bytes, model: str):
+    """Builds a kubernetes client model (e.g. 'V1PodList') from raw JSON, as the client does for responses."""
+    global _api_client
+    if _api_client is None:
+        from kubernetes.client import ApiClient
+        _api_client = ApiClient()
+    return _api_client.deserialize(_Raw(data), model)
+
+
+def list_body(items: list, resource_version: str) -> bytes:
+    """Raw JSON of a list response holding the already encoded `items`."""
+    return (b'{"metadata":{"resourceVersion":"' + (resource_version or '').encode() + b'"},"items":['
+            + b','.join(items) + b']}')
+
+
+class SnapshotWriter:
+    """Writes objects one by one to a snapshot file; the index is written on close."""
+
+    def __init__(self, path: str, level: int = 6):
+        self.path = path
+        self.level = level
+        self._tmp = path + '.tmp'
+        self._file = open(self._tmp, 'wb')
+        self._file.write(MAGIC)
+        self._lock = threading.Lock()
+        self.objects = 0
+        self.index = {"resources": {r: {} for r in RESOURCES}, "logs": {}, "singletons": {}}
+
+    def _put(self, data: bytes) -> list:
+        blob = zlib.compress(data, self.level)
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(blob)
+        return [offset, len(blob)]
+
+    def add_object(self, resource: str, obj: dict):
+        metadata = obj.get('metadata') or {}
+        fields = {f: field_value(obj, f) for f in INDEXED_FIELDS.get(resource, ())}
+        ref = self._put(json.dumps(obj, separators=(',', ':')).encode())
+        by_name = self.index["resources"][resource].setdefault(metadata.get('namespace') or '', {})
+        by_name[metadata['name']] = ref + [metadata.get('labels') or {}, fields]
+        self.objects += 1
+
+    def add_singleton(self, name: str, obj: dict):
+        self.index["singletons"][name] = self._put(json.dumps(obj).encode())
+
+    def add_log(self, namespace: str, pod: str, container: str, text: str):
+        ref = self._put(text.encode())
+        with self._lock:
+            self.index["logs"][f"{namespace}/{pod}/{container}"] = ref
+
+    def close(self, **meta):
+        self.index.update(meta, version=FORMAT_VERSION, objects=self.objects)
+        index = zlib.compress(json.dumps(self.index, separators=(',', ':')).encode(), self.level)
+        offset = self._file.tell()
+        self._file.write(index)
+        self._file.write(TRAILER.pack(offset, len(index), MAGIC))
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+
+def list_raw(method, **kwargs) -> tuple:
+    """All items of a list call as raw dicts (paginated, no model deserialization), and the list resourceVersion."""
+    items, token = [], None
+    while True:
+        response = method(limit=LIST_PAGE_SIZE, _continue=token, _preload_content=False, **kwargs)
+        body = json.loads(response.data)
+        items.extend(body.get('items') or [])
+        token = (body.get('metadata') or {}).get('continue')
+        if not token:
+            return items, (body.get('metadata') or {}).get('resourceVersion')
+
+
+def redact_secret(obj: dict):
+    """Keeps the key names of a Secret but not its values."""
+    if 'data' in obj:
+        obj['data'] = {k: '' for k in obj['data'] or {}}
+    obj.pop('stringData', None)
+    annotations = (obj.get('metadata') or {}).get('annotations') or {}
+    annotations.pop('kubectl.kubernetes.io/last-applied-configuration', None)
+
+
+def export(path: str, log_lines: int = 200, log_bytes: int = 64 * 1024, include_secret_data: bool = False,
+           progress=print) -> dict:
+    """Dumps the current cluster state into a snapshot file at `path`.
+
+    Args:
+        path: Output file
+        log_lines: Lines of log kept per container (0 to skip logs)
+        log_bytes: Maximum bytes of log kept per container
+        include_secret_data: Keep Secret values instead of only their key names
+        progress: Called with a line of text after each step
+
+    Returns:
+        dict: Object counts per resource
+    """
+    from src.utils import get_api
+
+    start = time.perf_counter()
+    writer = SnapshotWriter(path)
+    counts, resource_versions, pods = {}, {}, []
+    try:
+        writer.add_singleton('version', json.loads(get_api('VersionApi').get_code(_preload_content=False).data))
+
+        for resource, (api_name, _, namespaced) in RESOURCES.items():
+            api = get_api(api_name)
+            method = getattr(api, f"list_{resource}_for_all_namespaces" if namespaced else f"list_{resource}")
+            items, resource_versions[resource] = list_raw(method)
+            for obj in items:
+                if resource == 'secret' and not include_secret_data:
+                    redact_secret(obj)
+                writer.add_object(resource, obj)
+            if resource == 'pod':
+                pods = items
+            counts[resource] = len(items)
+            progress(f"{resource}: {len(items)}")
+
+        if log_lines > 0:
+            v1 = get_api('CoreV1Api')
+
+            def fetch_log(namespace, pod, container):
+                try:
+                    response = v1.read_namespaced_pod_log(
+                        pod, namespace, container=container, tail_lines=log_lines, limit_bytes=log_bytes,
+                        _preload_content=False
+                    )
+                    writer.add_log(namespace, pod, container, response.data.decode(errors='replace'))
+                    return 1
+                except Exception:
+                    return 0
+
+            targets = [
+                (p['metadata']['namespace'], p['metadata']['name'], c['name'])
+                for p in pods if (p.get('status') or {}).get('phase') in ('Running', 'Succeeded', 'Failed')
+                for c in (p.get('spec') or {}).get('containers') or []
+            ]
+            with ThreadPoolExecutor(max_workers=LOG_WORKERS) as pool:
+                counts['log'] = sum(pool.map(lambda t: fetch_log(*t), targets))
+            progress(f"log: {counts['log']} of {len(targets)} containers")
+
+        writer.close(created=time.time(), resource_versions=resource_versions)
+    except BaseException:
+        writer._file.close()
+        os.remove(writer._tmp)
+        raise
+
+    progress(f"Wrote {writer.objects} objects to {path} ({os.path.getsize(path) / 1e6:.1f} MB) "
+             f"in {time.perf_counter() - start:.1f}s")
+    return counts
+
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file that answers client read calls."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        offset, length, magic = TRAILER.unpack(self._mm[-TRAILER.size:])
+        if self._mm[:len(MAGIC)] != MAGIC or magic != MAGIC:
+            raise ValueError(f"{path} is not an ak15 snapshot")
+        self.index = json.loads(zlib.decompress(self._mm[offset:offset + length]))
+        if self.index.get('version') != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported snapshot version {self.index.get('version')}")
+        self.resources = self.index['resources']
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def _blob(self, ref) -> bytes:
+        offset, length = ref[0], ref[1]
+        return zlib.decompress(self._mm[offset:offset + length])
+
+    def _select(self, resource: str, namespace: str, label_selector: str, field_selector: str) -> list:
+        by_namespace = self.resources[resource]
+        namespaces = [namespace] if namespace is not None else list(by_namespace)
+        labels = parse_selector(label_selector)
+        fields = parse_selector(field_selector)
+        indexed = set(INDEXED_FIELDS.get(resource, ())) | {'metadata.name', 'metadata.namespace'}
+        need_object = any(key not in indexed for key, _, _ in fields)
+
+        blobs = []
+        for ns in namespaces:
+            for name, entry in by_namespace.get(ns, {}).items():
+                if labels and not matches(labels, entry[2]):
+                    continue
+                blob = None
+                if fields:
+                    values = dict(entry[3], **{'metadata.name': name, 'metadata.namespace': ns})
+                    if need_object:
+                        blob = self._blob(entry)
+                        obj = json.loads(blob)
+                        values = {key: field_value(obj, key) for key, _, _ in fields}
+                    if not matches(fields, values):
+                        continue
+                blobs.append(blob or self._blob(entry))
+        return blobs
+
+    def _log(self, name: str, namespace: str, container: str = None, tail_lines: int = None, **_) -> str:
+        prefix = f"{namespace}/{name}/"
+        if container is None:
+            keys = [k for k in self.index['logs'] if k.startswith(prefix)]
+            if len(keys) != 1:
+                raise not_found(f"log of pod {namespace}/{name}")
+            container = keys[0][len(prefix):]
+        ref = self.index['logs'].get(prefix + container)
+        if ref is None:
+            raise not_found(f"log of {namespace}/{name}/{container}")
+        text = self._blob(ref).decode()
+        if tail_lines is not None:
+            text = "\n".join(text.splitlines()[-tail_lines:])
+        return text
+
+    def serve(self, verb: str, resource: str, args: tuple, kwargs: dict):
+        """Answers a client read call, split by `client.verb_resource`, from the snapshot."""
+        params = dict(zip(('name', 'namespace'), args), **kwargs)
+        raw = params.pop('_preload_content', True) is False
+
+        if resource == 'pod_log':
+            return self._log(**params)
+        if verb == 'get' and resource == 'code':
+            blob = self._blob(self.index['singletons']['version'])
+            return json.loads(blob) if raw else deserialize(blob, 'VersionInfo')
+        if resource not in RESOURCES or verb not in ('list', 'read'):
+            raise not_found(f"{verb} {resource}")
+
+        model = RESOURCES[resource][1]
+        namespace = params.get('namespace')
+        if verb == 'read':
+            entry = self.resources[resource].get(namespace or '', {}).get(params.get('name'))
+            if entry is None:
+                raise not_found(f"{resource} {namespace + '/' if namespace else ''}{params.get('name')}")
+            blob = self._blob(entry)
+            return json.loads(blob) if raw else deserialize(blob, model)
+
+        blobs = self._select(resource, namespace, params.get('label_selector'), params.get('field_selector'))
+        rv = (self.index.get('resource_versions') or {}).get(resource)
+        body = list_body(blobs, rv)
+        return json.loads(body) if raw else deserialize(body, model + 'List')
+
+    def info(self) -> dict:
+        counts = {r: sum(len(names) for names in by_ns.values()) for r, by_ns in self.resources.items()}
+        counts['log'] = len(self.index['logs'])
+        return {
+            "path": self.path,
+            "created": self.index.get('created'),
+            "bytes": os.path.getsize(self.path),
+            "objects": self.index.get('objects'),
+            "counts": counts,
+        }
+
+
+_current = None
+
+
+def load(path: str = None):
+    """Serves all API calls from the snapshot at `path` (offline mode), or from the API server when None."""
+    global _current
+    previous, _current = _current, Snapshot(path) if path else None
+    if previous is not None:
+        previous.close()
+
+
+def current():
+    """The snapshot calls are served from, or None when online."""
+    return _current
+
+
+if os.getenv('AK15_SNAPSHOT'):
+    load(os.getenv('AK15_SNAPSHOT'))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or inspect cluster snapshots")
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser('export', help="Dump the cluster of the current kubeconfig")
+    export_parser.add_argument('path')
+    export_parser.add_argument('--log-lines', type=int, default=200, help="Log lines per container, 0 to skip logs")
+    export_parser.add_argument('--log-bytes', type=int, default=64 * 1024, help="Maximum log bytes per container")
+    export_parser.add_argument('--include-secret-data', action='store_true', help="Keep Secret values")
+    info_parser = commands.add_parser('info', help="Show what a snapshot contains")
+    info_parser.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        export(args.path, args.log_lines, args.log_bytes, args.include_secret_data)
+    else:
+        print(json.dumps(Snapshot(args.path).info(), indent=2))
@@ -0,0 +1,433 @@
+"""
+Object Store Module
+Keeps the cluster objects the tools read in a local SQLite database, kept current by one
+list+watch loop per resource, and answers the tools' API calls from it.
+
+Every object is stored with its resourceVersion, and each resource with the resourceVersion
+its watch has reached, so a restarted worker serves queries from disk immediately and resumes
+its watches where it stopped instead of relisting the cluster. A resource is only relisted
+when the API server no longer has that version (410 Gone).
+
+Every write is also appended to a bounded `changes` journal, which lets other processes
+(see src/records.py) follow the store incrementally and answers "what changed" questions
+(src/Changes.py). Modifications carry a field-level diff of the object's spec, labels and data.
+Events are not journaled; they are a change log of their own.
+
+Enabled by setting AK15_STORE to the database path. Secrets are listed and watched as metadata
+only (PartialObjectMetadata), so their values are never transferred or written to disk, unless
+AK15_STORE_SECRET_DATA=1; Secret reads then go to the API server.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from src import metrics
+from src.snapshot import (INDEXED_FIELDS, RESOURCES, deserialize, field_value, list_body, list_raw, matches,
+                          not_found, parse_selector, redact_secret)
+
+logger = logging.getLogger(__name__)
+
+WATCH_TIMEOUT = int(os.getenv('AK15_STORE_WATCH_TIMEOUT', 300))
+MAX_BACKOFF = 30
+CHANGES_KEPT = int(os.getenv('AK15_STORE_CHANGES_KEPT', 100000))
+UNJOURNALED = {'event'}
+
+# Parts of an object whose changes are recorded in the journal, and how many changed fields are kept
+DIFF_ROOTS = ('spec', 'metadata.labels', 'data', 'binaryData')
+DIFF_MAX_FIELDS = 20
+DIFF_MAX_VALUE = 80
+
+# Bumped on schema changes; the store is a cache, so an older database is simply recreated
+SCHEMA_VERSION = 4
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    resource TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    name TEXT NOT NULL,
+    resource_version TEXT,
+    labels TEXT,
+    fields TEXT,
+    body BLOB NOT NULL,
+    PRIMARY KEY (resource, namespace, name)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync (
+    resource TEXT PRIMARY KEY,
+    resource_version TEXT,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    resource TEXT NOT NULL,
+    namespace TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    diff TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_time ON changes (time);
+"""
+
+
+def _short(value):
+    text = value if isinstance(value, str) else json.dumps(value, separators=(',', ':'))
+    return text if len(text) <= DIFF_MAX_VALUE else text[:DIFF_MAX_VALUE - 3] + '...'
+
+
+def _diff(path: str, old, new, out: list):
+    if old == new:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in sorted(old.keys() | new.keys()):
+            _diff(f"{path}.{key}", old.get(key), new.get(key), out)
+    elif (isinstance(old, list) and isinstance(new, list) and
+          all(isinstance(x, dict) and 'name' in x for x in old + new)):
+        # Containers, ports, volumes, env: match list entries by name
+        old_named, new_named = {x['name']: x for x in old}, {x['name']: x for x in new}
+        for key in list(old_named) + [k for k in new_named if k not in old_named]:
+            _diff(f"{path}[{key}]", old_named.get(key), new_named.get(key), out)
+    else:
+        out.append([path, None if old is None else _short(old), None if new is None else _short(new)])
+
+
+def diff_objects(old: dict, new: dict) -> list:
+    """Changed fields under DIFF_ROOTS as [path, old, new]. Data values are reduced to their length."""
+    out = []
+    for root in DIFF_ROOTS:
+        before, after = field_value(old, root), field_value(new, root)
+        if root in ('data', 'binaryData'):
+            before, after = before or {}, after or {}
+            for key in sorted(before.keys() | after.keys()):
+                if before.get(key) != after.get(key):
+                    out.append([f"{root}.{key}", *(None if key not in d else f"({len(d[key] or '')} chars)"
+                                                   for d in (before, after))])
+        else:
+            _diff(root, before, after, out)
+    return out[:DIFF_MAX_FIELDS]
+
+
+class _Expired(Exception):
+    """The watch's resourceVersion is too old (410 Gone), a relist is needed."""
+
+
+class ObjectStore:
+    """SQLite-backed copy of the cluster objects, written by the watchers and read by `call()`."""
+
+    def __init__(self, path: str, secret_data: bool = False):
+        self.path = path
+        self.secret_data = secret_data
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        if self._writer.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self._writer.executescript("DROP TABLE IF EXISTS objects; DROP TABLE IF EXISTS sync; "
+                                       "DROP TABLE IF EXISTS changes;")
+            self._writer.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._writer.executescript(SCHEMA)
+        self._watchers = []
+        self._stop = threading.Event()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @property
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # Writes
+
+    def _row(self, resource: str, obj: dict) -> tuple:
+        if resource == 'secret' and not self.secret_data:
+            redact_secret(obj)
+        metadata = obj.get('metadata') or {}
+        fields = {f: field_value(obj, f) for f in INDEXED_FIELDS.get(resource, ())}
+        return (resource, metadata.get('namespace') or '', metadata['name'], metadata.get('resourceVersion'),
+                json.dumps(metadata.get('labels') or {}), json.dumps(fields),
+                json.dumps(obj, separators=(',', ':')).encode())
+
+    def _set_version(self, resource: str, resource_version: str):
+        self._writer.execute("INSERT OR REPLACE INTO sync VALUES (?, ?, ?)", (resource, resource_version, time.time()))
+
+    def _journal(self, resource: str, namespace: str, name: str, change_type: str, diff: list = None):
+        if resource in UNJOURNALED:
+            return
+        seq = self._writer.execute(
+            "INSERT INTO changes (time, resource, namespace, name, type, diff) VALUES (?, ?, ?, ?, ?, ?)",
+            (time.time(), resource, namespace, name, change_type, json.dumps(diff) if diff else None)
+        ).lastrowid
+        if seq % 1000 == 0:
+            self._writer.execute("DELETE FROM changes WHERE seq <= ?", (seq - CHANGES_KEPT,))
+
+    def _relist_changes(self, resource: str, items: list, rows: list) -> list:
+        """What a relist changed compared to the stored objects, as journal entries."""
+        stored = {(ns, name): rv for ns, name, rv in self._writer.execute(
+            "SELECT namespace, name, resource_version FROM objects WHERE resource = ?", (resource,))}
+        if not stored:
+            return []
+        changes = []
+        for obj, row in zip(items, rows):
+            key = row[1:3]
+            if key not in stored:
+                changes.append((*key, 'ADDED', None))
+            elif stored.pop(key) != row[3]:
+                old = self._writer.execute("SELECT body FROM objects WHERE resource = ? AND namespace = ? AND name = ?",
+                                           row[:3]).fetchone()[0]
+                changes.append((*key, 'MODIFIED', diff_objects(json.loads(old), obj)))
+        changes.extend((*key, 'DELETED', None) for key in stored)
+        return changes
+
+    def replace(self, resource: str, items: list, resource_version: str):
+        """Replaces every stored object of `resource` with the result of a list call."""
+        rows = [self._row(resource, obj) for obj in items]
+        with self._write_lock:
+            self._writer.execute("BEGIN")
+            try:
+                changes = [] if resource in UNJOURNALED else self._relist_changes(resource, items, rows)
+                self._writer.execute("DELETE FROM objects WHERE resource = ?", (resource,))
+                self._writer.executemany("INSERT INTO objects VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                self._set_version(resource, resource_version)
+                for namespace, name, change_type, diff in changes:
+                    self._journal(resource, namespace, name, change_type, diff)
+                self._journal(resource, '', '', 'RELISTED')
+                self._writer.execute("COMMIT")
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+
+    def apply(self, resource: str, event_type: str, obj: dict) -> str:
+        """Applies one watch event and returns the resourceVersion it brings the resource to."""
+        resource_version = (obj.get('metadata') or {}).get('resourceVersion')
+        with self._write_lock:
+            self._writer.execute("BEGIN")
+            try:
+                row = self._row(resource, obj)
+                diff = None
+                if event_type == 'MODIFIED' and resource not in UNJOURNALED:
+                    old = self._writer.execute(
+                        "SELECT body FROM objects WHERE resource = ? AND namespace = ? AND name = ?", row[:3]
+                    ).fetchone()
+                    diff = diff_objects(json.loads(old[0]), obj) if old else None
+                if event_type in ('ADDED', 'MODIFIED'):
+                    self._writer.execute("INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+                elif event_type == 'DELETED':
+                    self._writer.execute("DELETE FROM objects WHERE resource = ? AND namespace = ? AND name = ?",
+                                         row[:3])
+                self._journal(resource, row[1], row[2], event_type, diff)
+                self._set_version(resource, resource_version)
+                self._writer.execute("COMMIT")
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+        return resource_version
+
+    # Reads
+
+    def resource_version(self, resource: str):
+        """The resourceVersion stored objects of `resource` are current to, or None if never synced."""
+        row = self._reader.execute("SELECT resource_version FROM sync WHERE resource = ?", (resource,)).fetchone()
+        return row[0] if row else None
+
+    def changes_since(self, seq: int) -> tuple:
+        """Journal entries (seq, time, resource, namespace, name, type) after `seq`, and the oldest seq still kept.
+
+        When the oldest kept seq is past `seq + 1`, entries were pruned and the caller has to reload.
+        """
+        rows = self._reader.execute(
+            "SELECT seq, time, resource, namespace, name, type FROM changes WHERE seq > ? ORDER BY seq", (seq,)
+        ).fetchall()
+        oldest = self._reader.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+        return rows, oldest
+
+    def last_seq(self) -> int:
+        """Seq of the newest journal entry, 0 when the journal is empty."""
+        return self._reader.execute("SELECT MAX(seq) FROM changes").fetchone()[0] or 0
+
+    def history(self, since: float, namespace: str = None, resource: str = None) -> tuple:
+        """Object changes (time, resource, namespace, name, type, diff) since the `since` timestamp, oldest first,
+        and the time of the oldest entry the journal still holds (None if empty)."""
+        query = "SELECT time, resource, namespace, name, type, diff FROM changes WHERE time >= ? AND type != 'RELISTED'"
+        params = [since]
+        if namespace is not None:
+            query += " AND namespace = ?"
+            params.append(namespace)
+        if resource is not None:
+            query += " AND resource = ?"
+            params.append(resource)
+        rows = [(*row[:5], json.loads(row[5]) if row[5] else []) for row in
+                self._reader.execute(query + " ORDER BY seq", params)]
+        return rows, self._reader.execute("SELECT MIN(time) FROM changes").fetchone()[0]
+
+    def rows(self, resource: str, namespace: str = None, name: str = None):
+        """(namespace, name, body) of the stored objects of `resource`, optionally of one namespace or object."""
+        query = "SELECT namespace, name, body FROM objects WHERE resource = ?"
+        params = [resource]
+        if namespace is not None:
+            query += " AND namespace = ?"
+            params.append(namespace)
+        if name is not None:
+            query += " AND name = ?"
+            params.append(name)
+        return self._reader.execute(query, params)
+
+    def _select(self, resource: str, namespace: str, label_selector: str, field_selector: str) -> list:
+        query = "SELECT namespace, name, labels, fields, body FROM objects WHERE resource = ?"
+        params = [resource]
+        if namespace is not None:
+            query += " AND namespace = ?"
+            params.append(namespace)
+        labels = parse_selector(label_selector)
+        fields = parse_selector(field_selector)
+        indexed = set(INDEXED_FIELDS.get(resource, ())) | {'metadata.name', 'metadata.namespace'}
+        need_object = any(key not in indexed for key, _, _ in fields)
+
+        bodies = []
+        for ns, name, row_labels, row_fields, body in self._reader.execute(query + " ORDER BY namespace, name", params):
+            if labels and not matches(labels, json.loads(row_labels)):
+                continue
+            if fields:
+                if need_object:
+                    obj = json.loads(body)
+                    values = {key: field_value(obj, key) for key, _, _ in fields}
+                else:
+                    values = dict(json.loads(row_fields), **{'metadata.name': name, 'metadata.namespace': ns})
+                if not matches(fields, values):
+                    continue
+            bodies.append(body)
+        return bodies
+
+    def serve(self, verb: str, resource: str, args: tuple, kwargs: dict, metadata: bool = False):
+        """Answers a client read call from the store, or returns None when the store doesn't hold that resource.
+
+        `metadata` marks a metadata-only call, which stored Secrets without their data can answer.
+        """
+        if resource not in RESOURCES or verb not in ('list', 'read'):
+            return None
+        if resource == 'secret' and verb == 'read' and not self.secret_data and not metadata:
+            # Stored Secrets have no data, a full read of one Secret goes to the API server
+            return None
+        resource_version = self.resource_version(resource)
+        if resource_version is None:
+            metrics.CACHE_REQUESTS.inc(cache='store', result='miss')
+            return None
+        metrics.CACHE_REQUESTS.inc(cache='store', result='hit')
+
+        model = RESOURCES[resource][1]
+        params = dict(zip(('name', 'namespace'), args), **kwargs)
+        raw = params.get('_preload_content') is False
+        namespace = params.get('namespace')
+        if verb == 'read':
+            row = self._reader.execute(
+                "SELECT body FROM objects WHERE resource = ? AND namespace = ? AND name = ?",
+                (resource, namespace or '', params.get('name'))
+            ).fetchone()
+            if row is None:
+                raise not_found(f"{resource} {namespace + '/' if namespace else ''}{params.get('name')}", 'store')
+            return json.loads(row[0]) if raw else deserialize(row[0], model)
+
+        bodies = self._select(resource, namespace, params.get('label_selector'), params.get('field_selector'))
+        body = list_body(bodies, resource_version)
+        return json.loads(body) if raw else deserialize(body, model + 'List')
+
+    def stats(self) -> dict:
+        rows = self._reader.execute("SELECT resource, COUNT(*) FROM objects GROUP BY resource").fetchall()
+        counts = dict(rows)
+        synced = dict(self._reader.execute("SELECT resource, resource_version FROM sync").fetchall())
+        return {r: {"objects": counts.get(r, 0), "resource_version": synced.get(r)} for r in RESOURCES}
+
+    # Watches
+
+    def watch(self, resources=None):
+        """Starts one background list+watch loop per resource, resuming from the stored resourceVersions."""
+        for resource in resources or RESOURCES:
+            thread = threading.Thread(target=self._watch_loop, args=(resource,), name=f"store-{resource}",
+                                      daemon=True)
+            thread.start()
+            self._watchers.append(thread)
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch_loop(self, resource: str):
+        from src.utils import get_api
+
+        api_name, _, namespaced = RESOURCES[resource]
+        suffix = f"{resource}_for_all_namespaces" if namespaced else resource
+        resource_version = self.resource_version(resource)
+        if resource_version is not None:
+            logger.critical(f"[STORE] Resuming {resource} watch from resourceVersion {resource_version}")
+        backoff = 1
+
+        while not self._stop.is_set():
+            try:
+                api = get_api(api_name, metadata=resource == 'secret' and not self.secret_data)
+                if resource_version is None:
+                    items, resource_version = list_raw(getattr(api, f"list_{suffix}"))
+                    self.replace(resource, items, resource_version)
+                    logger.critical(f"[STORE] Listed {len(items)} {resource} objects at resourceVersion {resource_version}")
+                resource_version = self._watch(resource, getattr(api, f"list_{suffix}"), resource_version)
+                backoff = 1
+            except Exception as e:
+                if not isinstance(e, _Expired) and getattr(e, 'status', None) != 410:
+                    logger.error(f"[ERROR] {resource} watch failed, retrying in {backoff}s: {e}")
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, MAX_BACKOFF)
+                    continue
+                logger.critical(f"[STORE] {resource} resourceVersion {resource_version} expired, relisting")
+                resource_version = None
+
+    def _watch(self, resource: str, method, resource_version: str) -> str:
+        """Applies watch events until the server ends the watch, returning the last resourceVersion seen."""
+        from kubernetes.watch.watch import iter_resp_lines
+
+        response = method(watch=True, resource_version=resource_version, allow_watch_bookmarks=True,
+                          timeout_seconds=WATCH_TIMEOUT, _request_timeout=(10, WATCH_TIMEOUT + 30),
+                          _preload_content=False)
+        try:
+            for line in iter_resp_lines(response):
+                if self._stop.is_set():
+                    break
+                event = json.loads(line)
+                obj = event.get('object') or {}
+                if event.get('type') == 'ERROR':
+                    if obj.get('code') == 410:
+                        raise _Expired()
+                    raise RuntimeError(obj.get('message') or line)
+                if event.get('type') == 'BOOKMARK':
+                    with self._write_lock:
+                        self._set_version(resource, obj['metadata']['resourceVersion'])
+                    resource_version = obj['metadata']['resourceVersion']
+                else:
+                    resource_version = self.apply(resource, event['type'], obj)
+        finally:
+            response.release_conn()
+        return resource_version
+
+
+_current = None
+
+
+def load(path: str = None, secret_data: bool = False):
+    """Serves API calls from the store at `path` (created if missing), or disables the store when None."""
+    global _current
+    if _current is not None:
+        _current.stop()
+    _current = ObjectStore(path, secret_data) if path else None
+    return _current
+
+
+def current():
+    """The object store calls are served from, or None."""
+    return _current
+
+
+if os.getenv('AK15_STORE'):
+    load(os.getenv('AK15_STORE'), os.getenv('AK15_STORE_SECRET_DATA') == '1')
@@ -0,0 +1,105 @@
+"""
+Tracing Module
+Hierarchical trace spans for queries, LLM rounds, tool calls and Kubernetes API requests.
+
+Spans are written in the Chrome Trace Event format, which can be opened offline in
+Perfetto (ui.perfetto.dev) or chrome://tracing. Tracing is enabled by setting
+AK15_TRACE_FILE; AK15_TRACE_SAMPLE_RATE (0.0 - 1.0) controls the share of root spans
+(and everything under them) that get recorded.
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar('trace_span', default=None)
+_ids = itertools.count(1)
+
+
+class Span:
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'sampled', 'attributes', 'start')
+
+    def __init__(self, name: str, parent, sampled: bool, attributes: dict):
+        self.name = name
+        self.span_id = next(_ids)
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.parent_id = parent.span_id if parent else None
+        self.sampled = sampled
+        self.attributes = attributes
+        self.start = time.time()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+class TraceWriter:
+    """Appends finished spans to a trace file as Chrome "complete" events."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', buffering=1 << 16)
+        if new:
+            # The trace viewers accept an unterminated array, which keeps the file append-only
+            self._file.write("[\n")
+
+    def write(self, span: Span, end: float):
+        event = {
+            "name": span.name,
+            "cat": span.name.split('.')[0],
+            "ph": "X",
+            "ts": int(span.start * 1e6),
+            "dur": int((end - span.start) * 1e6),
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+            "args": dict(span.attributes, trace_id=span.trace_id, span_id=span.span_id, parent_id=span.parent_id),
+        }
+        line = json.dumps(event, default=str) + ",\n"
+        with self._lock:
+            self._file.write(line)
+            if span.parent_id is None:
+                self._file.flush()
+
+
+_writer = None
+sample_rate = 1.0
+
+
+def configure(path: str = None, rate: float = None):
+    """Enables tracing to `path` (or disables it when None) with the given sampling rate."""
+    global _writer, sample_rate
+    _writer = TraceWriter(path) if path else None
+    if rate is not None:
+        sample_rate = max(0.0, min(1.0, rate))
+
+
+configure(os.getenv('AK15_TRACE_FILE'), float(os.getenv('AK15_TRACE_SAMPLE_RATE', '1.0')))
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Records the enclosed block as a span, nested under the current span if there is one."""
+    if _writer is None:
+        yield None
+        return
+
+    parent = _current.get()
+    sampled = parent.sampled if parent else random.random() < sample_rate
+    s = Span(name, parent, sampled, attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.set(error=repr(e))
+        raise
+    finally:
+        _current.reset(token)
+        if sampled and _writer is not None:
+            _writer.write(s, time.time())
@@ -0,0 +1,295 @@
+"""
+Resource Usage Module
+Samples node and pod CPU and memory usage from the metrics API (metrics.k8s.io, served by
+metrics-server) in a background thread, and keeps a fixed-size history of each object in memory.
+Usage questions are answered from that history, without a metrics API call per query.
+
+Each object's history is a pair of `array('f')` ring buffers (CPU cores, memory bytes) aligned with
+one shared ring of sample times; samples where the object was missing are NaN. Objects are dropped
+once they have been missing for the whole window.
+
+Settings: AK15_USAGE_INTERVAL (seconds between samples, default 30, 0 disables the background
+sampler) and AK15_USAGE_SAMPLES (samples kept per object, default 120). With AK15_USAGE_FILE, the
+history is saved to that file after every sample; a process with AK15_USAGE_SAMPLE=0 samples nothing
+and reads the file instead (serve.py workers, while its watcher process samples).
+"""
+
+import heapq
+import logging
+import marshal
+import math
+import operator
+import os
+import threading
+import time
+from array import array
+from itertools import compress, repeat
+
+from src.client import call_raw
+from src.records import parse_quantity
+from src.utils import LazyApi
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = float(os.getenv('AK15_USAGE_INTERVAL', 30))
+SAMPLES = int(os.getenv('AK15_USAGE_SAMPLES', 120))
+USAGE_FILE = os.getenv('AK15_USAGE_FILE')
+SAMPLING = os.getenv('AK15_USAGE_SAMPLE', '1') == '1'
+MAX_BACKOFF = 300
+METRICS = ('cpu', 'memory')
+NAN = float('nan')
+
+custom_api = LazyApi('CustomObjectsApi')
+
+
+class Series:
+    """Usage history of one node or pod."""
+
+    __slots__ = ('cpu', 'memory', 'last_seen')
+
+    def __init__(self, samples: int):
+        # float32 keeps 50k pods x 2 metrics x 120 samples under 50 MB
+        self.cpu = array('f', [NAN]) * samples
+        self.memory = array('f', [NAN]) * samples
+        self.last_seen = 0
+
+
+class Stats:
+    """Summary of one metric over the window, in cores or bytes. `slope` is the change per hour.
+
+    `times` and `values` are whole buffers, oldest first; the sums and extremes run over them in C
+    (compress, map, fsum, min, max) rather than element by element in Python.
+    """
+
+    __slots__ = ('latest', 'low', 'mean', 'peak', 'slope', 'samples')
+
+    def __init__(self, times: array, values: array):
+        self.latest = values[-1] if values else NAN
+        # NaN != NaN, so this keeps the samples where the object was seen
+        seen = list(map(operator.eq, values, values))
+        ys = array('d', compress(values, seen))
+        n = self.samples = len(ys)
+        if not n:
+            self.low = self.mean = self.peak = self.slope = NAN
+            return
+        self.low, self.peak = min(ys), max(ys)
+        sum_y = math.fsum(ys)
+        self.mean = sum_y / n
+        # Least-squares slope of value over time, from the sums over the buffers
+        t0 = next(compress(times, seen))
+        xs = array('d', map(operator.sub, compress(times, seen), repeat(t0, n)))
+        sum_x = math.fsum(xs)
+        var = n * math.fsum(map(operator.mul, xs, xs)) - sum_x * sum_x
+        cov = n * math.fsum(map(operator.mul, xs, ys)) - sum_x * sum_y
+        self.slope = cov / var * 3600 if var else 0.0
+
+
+class UsageSampler:
+    """Ring-buffer history of node and pod usage, fed by `sample()`."""
+
+    def __init__(self, samples: int = SAMPLES, interval: float = SAMPLE_INTERVAL, file: str = None):
+        self.samples = samples
+        self.interval = interval
+        self.file = file
+        self.count = 0
+        self.error = None
+        self._loaded = None
+        self._times = array('d', [NAN]) * samples
+        self._series = {'node': {}, 'pod': {}}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    # Sampling
+
+    def _fetch(self, plural: str) -> dict:
+        items = call_raw(custom_api.list_cluster_custom_object, 'metrics.k8s.io', 'v1beta1', plural)["items"]
+        usage = {}
+        for item in items:
+            metadata = item['metadata']
+            if plural == 'nodes':
+                key, values = metadata['name'], [item.get('usage') or {}]
+            else:
+                key = (metadata.get('namespace'), metadata['name'])
+                values = [c.get('usage') or {} for c in item.get('containers') or []]
+            usage[key] = (sum(parse_quantity(v.get('cpu')) for v in values),
+                          sum(parse_quantity(v.get('memory')) for v in values))
+        return usage
+
+    def _record(self, series: dict, usage: dict, slot: int):
+        for key, (cpu, memory) in usage.items():
+            s = series.get(key)
+            if s is None:
+                s = series[key] = Series(self.samples)
+            s.cpu[slot], s.memory[slot] = cpu, memory
+            s.last_seen = self.count
+        for key in [k for k in series if k not in usage]:
+            s = series[key]
+            if self.count - s.last_seen >= self.samples:
+                del series[key]
+            else:
+                s.cpu[slot] = s.memory[slot] = NAN
+
+    def sample(self):
+        """Takes one sample of every node and pod."""
+        nodes, pods = self._fetch('nodes'), self._fetch('pods')
+        with self._lock:
+            slot = self.count % self.samples
+            self._times[slot] = time.time()
+            self._record(self._series['node'], nodes, slot)
+            self._record(self._series['pod'], pods, slot)
+            self.count += 1
+        self.error = None
+        if self.file:
+            self.save(self.file)
+
+    def start(self):
+        """Samples in a background thread every `interval` seconds."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="usage-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        delay = self.interval if self.count else 0
+        while not self._stop.wait(delay):
+            try:
+                self.sample()
+                delay = self.interval
+            except Exception as e:
+                self.error = e
+                delay = min(max(delay * 2, self.interval), MAX_BACKOFF)
+                logger.error(f"[ERROR] Usage sampling failed, retrying in {delay:.0f}s: {e}")
+
+    # Sharing with other processes
+
+    def save(self, path: str):
+        """Writes the history to `path`, replacing it atomically, for processes that `load` it."""
+        with self._lock:
+            state = {'samples': self.samples, 'interval': self.interval, 'count': self.count,
+                     'times': self._times.tobytes(),
+                     'series': {kind: {key: (s.cpu.tobytes(), s.memory.tobytes(), s.last_seen)
+                                       for key, s in series.items()} for kind, series in self._series.items()}}
+        temp = f"{path}.{os.getpid()}.tmp"
+        # marshal, as the file is only read by processes of the same interpreter
+        with open(temp, 'wb') as f:
+            marshal.dump(state, f)
+        os.replace(temp, path)
+
+    def load(self, path: str) -> bool:
+        """Replaces the history with the one saved at `path`, if it changed since the last load."""
+        try:
+            modified = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if modified == self._loaded:
+            return False
+        with open(path, 'rb') as f:
+            state = marshal.load(f)
+        times = array('d')
+        times.frombytes(state['times'])
+        series = {}
+        for kind, saved in state['series'].items():
+            series[kind] = {}
+            for key, (cpu, memory, last_seen) in saved.items():
+                s = series[kind][key] = Series(0)
+                s.cpu.frombytes(cpu)
+                s.memory.frombytes(memory)
+                s.last_seen = last_seen
+        with self._lock:
+            self.samples, self.interval, self.count = state['samples'], state['interval'], state['count']
+            self._times, self._series = times, series
+        self._loaded = modified
+        return True
+
+    # Queries
+
+    def _window(self, buffer: array) -> array:
+        """The sampled part of a ring buffer, oldest first, as one array."""
+        if self.count < self.samples:
+            return buffer[:self.count]
+        start = self.count % self.samples
+        return buffer[start:] + buffer[:start]
+
+    def stats(self, kind: str, key, metric: str):
+        """Stats of `metric` for one object over the window, or None if it was never sampled."""
+        with self._lock:
+            s = self._series[kind].get(key)
+            if s is None:
+                return None
+            return Stats(self._window(self._times), self._window(getattr(s, metric)))
+
+    def top(self, kind: str, metric: str, count: int, namespace: str = None) -> list:
+        """The `count` objects with the highest latest `metric`, as (key, Stats). `namespace` applies to pods."""
+        with self._lock:
+            if not self.count:
+                return []
+            last = (self.count - 1) % self.samples
+            latest = ((getattr(s, metric)[last], key) for key, s in self._series[kind].items()
+                      if namespace is None or key[0] == namespace)
+            # One value per object; NaN (not seen in the last sample) is left out
+            keys = [key for value, key in heapq.nlargest(count, (p for p in latest if p[0] == p[0]))]
+        return [(key, self.stats(kind, key, metric)) for key in keys]
+
+    def window(self) -> float:
+        """Seconds between the oldest and newest sample kept."""
+        with self._lock:
+            times = self._window(self._times)
+            return times[-1] - times[0] if times else 0.0
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def _shared():
+    """The history saved by the sampling process, reloaded when it changed. Called with _sampler_lock held."""
+    global _sampler
+    if _sampler is None:
+        _sampler = UsageSampler()
+    if USAGE_FILE:
+        _sampler.load(USAGE_FILE)
+    return _sampler
+
+
+def current(wait: bool = True):
+    """The usage sampler, started on first use. With `wait`, takes a first sample if there is none yet.
+
+    With AK15_USAGE_SAMPLE=0, the history shared through AK15_USAGE_FILE, without sampling.
+    """
+    global _sampler
+    with _sampler_lock:
+        if not SAMPLING:
+            sampler = _shared()
+            if wait and not sampler.count:
+                raise RuntimeError("no usage sample shared yet by the sampling process")
+            return sampler
+        if _sampler is None:
+            _sampler = UsageSampler(file=USAGE_FILE)
+        if wait and not _sampler.count:
+            _sampler.sample()
+        if _sampler.interval > 0:
+            _sampler.start()
+    return _sampler
+
+
+def sampled():
+    """The usage sampler if it has taken a sample, without starting it."""
+    if not SAMPLING:
+        with _sampler_lock:
+            _shared()
+    return _sampler if _sampler is not None and _sampler.count else None
+
+
+def format_value(metric: str, value: float) -> str:
+    if value != value:
+        return "n/a"
+    if metric == 'cpu':
+        return f"{value * 1000:.0f}m"
+    return f"{value / 2 ** 20:.0f}Mi"
+
+
+def format_percent(value: float, total: float) -> str:
+    return f"{100 * value / total:.0f}%" if total and value == value else "n/a"
@@ -1,46 +1,259 @@
+import atexit
+import contextvars
+import json
 import logging
-from kubernetes import client, config
+import logging.handlers
 import os
+import queue
+import random
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+from src import snapshot
+
+LOG_FILE = os.getenv('AK15_LOG_FILE', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'agent.log'))
+LOG_MAX_BYTES = int(os.getenv('AK15_LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('AK15_LOG_BACKUP_COUNT', 5))
+LOG_QUEUE_SIZE = int(os.getenv('AK15_LOG_QUEUE_SIZE', 10000))
+LOG_PREVIEW_CHARS = int(os.getenv('AK15_LOG_PREVIEW_CHARS', 2000))
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('AK15_LOG_PAYLOAD_SAMPLE_RATE', 1.0))
+
+_log_listener = None
+
+
+def _preview(text: str) -> str:
+    if not LOG_PREVIEW_CHARS or len(text) <= LOG_PREVIEW_CHARS:
+        return text
+    return f"{text[:LOG_PREVIEW_CHARS]}... [truncated {len(text) - LOG_PREVIEW_CHARS} chars]"
+
+
+class _BoundedQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the background writer, truncating large messages and
+    dropping records instead of blocking when the queue is full."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        if record.args:
+            # Cut large %-style arguments before formatting so they are never copied in full
+            if isinstance(record.args, tuple):
+                record.args = tuple(_preview(a) if isinstance(a, str) else a for a in record.args)
+            return super().prepare(record)
+
+        record = super().prepare(record)
+        record.msg = record.message = _preview(record.msg)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _BoundedQueueHandler.dropped += 1
+
+
+class _PayloadSampler(logging.Filter):
+    """Keeps only a sample of records logged with `extra={'payload': True}` (e.g. tool responses)."""
+
+    def filter(self, record):
+        if getattr(record, 'payload', False) and LOG_PAYLOAD_SAMPLE_RATE < 1.0:
+            return random.random() < LOG_PAYLOAD_SAMPLE_RATE
+        return True
+
 
 def setup_logger():
-    # Get absolute path for the log file
-    log_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'agent.log')
-    
+    """Route all logging through a bounded queue to a background thread that writes
+    a size-rotated log file, so logging never does disk I/O on the request thread."""
+    global _log_listener
+
+    # Already configured by an earlier import
+    if _log_listener is not None:
+        return
+
     try:
-        # Create the file if it doesn't exist
-        with open(log_file, 'w') as _:
-            pass
-        
-        # Configure file handler explicitly
-        file_handler = logging.FileHandler(log_file, mode='a')
+        # Configure rotating file handler, written only by the listener thread
+        # Runs append to the same file, which is only rotated once it reaches LOG_MAX_BYTES, and
+        # the file is not created until something is logged
+        file_handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True
+        )
         file_handler.setLevel(logging.CRITICAL)
-        
+
         # Create formatter and add it to the handler
         formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         file_handler.setFormatter(formatter)
-        
+
+        queue_handler = _BoundedQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        queue_handler.addFilter(_PayloadSampler())
+
         # Get the root logger and add the handler
         root_logger = logging.getLogger()
         root_logger.setLevel(logging.CRITICAL)
-        
+
         # Remove existing handlers to avoid duplicates
         for handler in root_logger.handlers[:]:
             root_logger.removeHandler(handler)
-        
-        # Add our file handler
-        root_logger.addHandler(file_handler)
-        
+
+        # Add our queue handler
+        root_logger.addHandler(queue_handler)
+
+        _log_listener = logging.handlers.QueueListener(queue_handler.queue, file_handler)
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
+
     except Exception as e:
         print(f"Error setting up logger: {str(e)}")
         raise
 
+# Contexts the agent may query besides the current one: a comma-separated list, or '*' for every
+# context in the kubeconfig. Unset means single-cluster mode, and tools take no context argument.
+CONTEXTS = os.getenv('AK15_CONTEXTS', '')
+
+_apis = {}
+_apis_lock = threading.Lock()
+_api_clients = {}
+_metadata_clients = {}
+_kube_context = contextvars.ContextVar('kube_context', default=None)
+
+
+def _kubeconfig_path() -> str:
+    return os.path.expanduser(os.getenv("KUBECONFIG", "~/.kube/config"))
+
+
+@lru_cache(maxsize=1)
+def kube_contexts() -> tuple:
+    """The contexts available to tools (see AK15_CONTEXTS) and the kubeconfig's current context."""
+    from kubernetes import config
+    contexts, active = config.list_kube_config_contexts(config_file=_kubeconfig_path())
+    names = [c['name'] for c in contexts]
+    if CONTEXTS.strip() != '*':
+        names = [n.strip() for n in CONTEXTS.split(',') if n.strip()]
+    return tuple(names), active['name'] if active else None
+
+
+def current_context():
+    """The context API calls of this thread go to, or None for the kubeconfig's current context."""
+    return _kube_context.get()
+
+
+@contextmanager
+def use_context(name: str = None):
+    """Sends every API call made inside the block to kubeconfig context `name` (None: the current context)."""
+    if name is not None and name == kube_contexts()[1]:
+        # The current context is the default clients, which the snapshot and object store also hold
+        name = None
+    token = _kube_context.set(name)
+    try:
+        yield
+    finally:
+        _kube_context.reset(token)
+
+
+def _api_client(context: str):
+    """The ApiClient, with its own connection pool, for a non-default context. Called with _apis_lock held."""
+    api_client = _api_clients.get(context)
+    if api_client is None:
+        if snapshot.current() is not None:
+            raise ValueError(f"Context '{context}' is not available offline, the snapshot holds one cluster")
+        from kubernetes import client, config
+        configuration = client.Configuration()
+        config.load_kube_config(config_file=_kubeconfig_path(), context=context, client_configuration=configuration)
+        api_client = _api_clients[context] = client.ApiClient(configuration)
+    return api_client
+
+
+# Accept headers asking the API server for metadata only (PartialObjectMetadata), falling back to full objects
+METADATA_LIST_ACCEPT = "application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,application/json"
+METADATA_OBJECT_ACCEPT = "application/json;as=PartialObjectMetadata;g=meta.k8s.io;v=v1,application/json"
+
+
+def _metadata_client(context: str):
+    """An ApiClient whose list, read and watch requests return metadata only. Called with _apis_lock held."""
+    api_client = _metadata_clients.get(context)
+    if api_client is None:
+        from kubernetes import client
+
+        class MetadataApiClient(client.ApiClient):
+            def call_api(self, resource_path, method, path_params=None, query_params=None, header_params=None,
+                         *args, **kwargs):
+                # A read or watch event is one object, a list is a list
+                single = 'name' in (path_params or {}) or any(k == 'watch' and v for k, v in query_params or [])
+                accept = METADATA_OBJECT_ACCEPT if single else METADATA_LIST_ACCEPT
+                return super().call_api(resource_path, method, path_params, query_params,
+                                        dict(header_params or {}, Accept=accept), *args, **kwargs)
+
+        configuration = (_api_client(context).configuration if context is not None
+                         else client.Configuration.get_default_copy())
+        api_client = _metadata_clients[context] = MetadataApiClient(configuration)
+    return api_client
+
+
+def get_api(api_name: str, metadata: bool = False):
+    """Returns the shared kubernetes client API object `api_name` (e.g. 'CoreV1Api') of the current context.
+
+    The kubernetes package is imported and the kubeconfig loaded on first use, so
+    importing the tool modules works without a reachable cluster. No kubeconfig is
+    needed while a snapshot is loaded (offline mode). Inside `use_context`, the API
+    object of that context is returned; each context has its own client and pool.
+    With `metadata`, its list, read and watch calls return PartialObjectMetadata (raw responses only),
+    e.g. Secrets without their data.
+    """
+    key = (_kube_context.get(), api_name, metadata)
+    api = _apis.get(key)
+    if api is None:
+        with _apis_lock:
+            api = _apis.get(key)
+            if api is None:
+                from kubernetes import client, config
+                context = key[0]
+                if context is None and not any(c is None for c, *_ in _apis) and snapshot.current() is None:
+                    config.load_kube_config(config_file=_kubeconfig_path())
+                if metadata:
+                    api = getattr(client, api_name)(_metadata_client(context))
+                    api.metadata_only = True
+                elif context is not None:
+                    api = getattr(client, api_name)(_api_client(context))
+                else:
+                    api = getattr(client, api_name)()
+                _apis[key] = api
+    return api
+
+
+class LazyApi:
+    """Stands in for a kubernetes client API object until one of its methods is used."""
+
+    def __init__(self, api_name: str, metadata: bool = False):
+        self.api_name = api_name
+        self.metadata = metadata
+
+    def __getattr__(self, name):
+        return getattr(get_api(self.api_name, self.metadata), name)
+
+
 def load_kube_config():
-    kubeconfig_path = os.path.expanduser("~/.kube/config")
-    config.load_kube_config(config_file=kubeconfig_path)
-    v1 = client.CoreV1Api()
-    apps_v1 = client.AppsV1Api()
-    version_api = client.VersionApi()
-    return v1, apps_v1, version_api
\ No newline at end of file
+    return LazyApi('CoreV1Api'), LazyApi('AppsV1Api'), LazyApi('VersionApi')
+
+
+# Bookkeeping fields that are large and never useful to the LLM
+PRUNED_KEYS = frozenset(('managedFields', 'kubectl.kubernetes.io/last-applied-configuration'))
+
+
+def _prune(value):
+    if isinstance(value, dict):
+        return {k: _prune(v) for k, v in value.items() if v is not None and k not in PRUNED_KEYS}
+    if isinstance(value, list):
+        return [_prune(v) for v in value]
+    return value
+
+
+def error_reason(e: Exception) -> str:
+    """Short reason of a failed call for tool output: the HTTP reason of API errors, the message otherwise."""
+    return getattr(e, 'reason', None) or str(e) or type(e).__name__
+
+
+def deep_json(data) -> str:
+    """Formats raw API JSON (see `client.call_raw`) as a markdown JSON block for deep output, without nulls and managedFields."""
+    return f"```json\n{json.dumps(_prune(data), indent=2)}\n```"
@@ -0,0 +1,90 @@
+"""
+Runs the tests against two fake API servers (bench/fake_apiserver.py) behind one kubeconfig with
+the contexts ctx-a (current) and ctx-b. The settings are in place before any src module reads them.
+"""
+
+import json
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import time
+import urllib.request
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.fake_apiserver import SyntheticCluster, serve  # noqa: E402
+
+# Pods of each context's synthetic cluster (10 per Deployment): ctx-a has app-0 and app-1, ctx-b app-0 to app-5
+CLUSTER_PODS = {'ctx-a': 20, 'ctx-b': 60}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+PORTS = {context: _free_port() for context in CLUSTER_PODS}
+KUBECONFIG = os.path.join(tempfile.mkdtemp(prefix='ak15-tests-'), 'kubeconfig')
+with open(KUBECONFIG, 'w') as f:
+    json.dump({
+        "apiVersion": "v1",
+        "kind": "Config",
+        "clusters": [{"name": c, "cluster": {"server": f"http://127.0.0.1:{p}"}} for c, p in PORTS.items()],
+        "users": [{"name": "fake", "user": {"token": "fake"}}],
+        "contexts": [{"name": c, "context": {"cluster": c, "user": "fake"}} for c in PORTS],
+        "current-context": "ctx-a"
+    }, f)
+
+os.environ['KUBECONFIG'] = KUBECONFIG
+os.environ['AK15_CONTEXTS'] = '*'
+os.environ['AK15_USAGE_INTERVAL'] = '0'
+os.environ['AK15_LOG_FILE'] = os.path.join(os.path.dirname(KUBECONFIG), 'agent.log')
+for name in ('AK15_STORE', 'AK15_SNAPSHOT', 'AK15_ALLOW_SECRET_VALUES'):
+    os.environ.pop(name, None)
+
+
+def server_requests(context: str = 'ctx-a') -> dict:
+    """Requests the fake API server of `context` has served so far, e.g. {'list pods': 3}."""
+    with urllib.request.urlopen(f"http://127.0.0.1:{PORTS[context]}/debug/requests") as response:
+        return json.load(response)
+
+
+def served_since(before: dict, context: str = 'ctx-a') -> dict:
+    """Requests served by `context` since the `before` counts, without the unchanged ones."""
+    after = server_requests(context)
+    return {k: v - before.get(k, 0) for k, v in after.items() if v != before.get(k, 0)}
+
+
+@pytest.fixture(scope='session', autouse=True)
+def fake_apiservers():
+    mp = multiprocessing.get_context('fork')
+    processes = [mp.Process(target=serve, args=(SyntheticCluster(pods), '127.0.0.1', PORTS[context]), daemon=True)
+                 for context, pods in CLUSTER_PODS.items()]
+    for process in processes:
+        process.start()
+    deadline = time.monotonic() + 10
+    for context in CLUSTER_PODS:
+        while True:
+            try:
+                server_requests(context)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+    yield PORTS
+    for process in processes:
+        process.terminate()
+
+
+@pytest.fixture(scope='session')
+def tools(fake_apiservers):
+    from src import registry
+    registry.load_tools()
+    return registry.TOOLS
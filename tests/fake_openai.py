@@ -0,0 +1,47 @@
+"""
+Scripted stand-in for the OpenAI client: `chat.completions.create` returns the next scripted
+response and records the messages it was called with.
+"""
+
+import copy
+import threading
+from types import SimpleNamespace
+
+
+def usage(prompt_tokens: int, completion_tokens: int):
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+def tool_call(id: str, name: str, arguments: str, index: int = 0):
+    return SimpleNamespace(index=index, id=id, type='function',
+                           function=SimpleNamespace(name=name, arguments=arguments))
+
+
+def completion(content: str = None, tool_calls: list = None, tokens: tuple = (10, 5)):
+    message = SimpleNamespace(role='assistant', content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage(*tokens))
+
+
+def chunks(content: list = (), tool_calls: list = (), tokens: tuple = (10, 5)) -> list:
+    """A streamed completion: one chunk per content piece or tool call fragment, then the usage chunk."""
+    out = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=c, tool_calls=None))], usage=None)
+           for c in content]
+    out += [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None, tool_calls=[tc]))], usage=None)
+            for tc in tool_calls]
+    return out + [SimpleNamespace(choices=[], usage=usage(*tokens))]
+
+
+class FakeOpenAI:
+    def __init__(self, responses: list):
+        self.responses = list(responses)
+        self.requests = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.requests.append(copy.deepcopy([m if isinstance(m, dict) else vars(m) for m in kwargs['messages']]))
+            response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return iter(response) if kwargs.get('stream') else response
@@ -0,0 +1,91 @@
+import threading
+import time
+
+from conftest import served_since, server_requests
+from src.client import BatchCache, SingleFlight, batch_scope, call
+from src.utils import LazyApi
+
+v1 = LazyApi('CoreV1Api')
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight, started, release = SingleFlight(), threading.Event(), threading.Event()
+    runs = []
+
+    def fetch():
+        runs.append(1)
+        started.set()
+        release.wait(5)
+        return 'result'
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(flight.do('key', fetch)))
+    owner.start()
+    started.wait(5)
+    waiters = [threading.Thread(target=lambda: results.append(flight.do('key', fetch))) for _ in range(4)]
+    for t in waiters:
+        t.start()
+    deadline = time.monotonic() + 5
+    try:
+        while flight.coalesced < 4:
+            assert time.monotonic() < deadline, 'callers were not coalesced'
+            time.sleep(0.001)
+    finally:
+        release.set()
+    for t in [owner, *waiters]:
+        t.join(5)
+
+    assert results == ['result'] * 5
+    assert len(runs) == 1
+    assert flight.stats() == {'calls': 1, 'coalesced': 4}
+    # Nothing is kept once the call finished
+    assert flight.do('key', lambda: 'again') == 'again'
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError('boom')
+
+    for _ in range(2):
+        try:
+            flight.do('key', fail)
+        except ValueError as e:
+            assert str(e) == 'boom'
+        else:
+            raise AssertionError('error not raised')
+
+
+def test_batch_cache_calls_once():
+    cache, runs = BatchCache(), []
+
+    def fetch():
+        runs.append(1)
+        return len(runs)
+
+    assert [cache.get_or_call('key', fetch) for _ in range(3)] == [1, 1, 1]
+    assert cache.get_or_call('other', fetch) == 2
+    assert cache.stats() == {'hits': 2, 'misses': 2}
+
+
+def test_batch_scope_makes_one_request_per_call(fake_apiservers):
+    before = server_requests()
+    with batch_scope() as cache:
+        first = call(v1.list_namespaced_pod, namespace='default')
+        second = call(v1.list_namespaced_pod, namespace='default')
+        call(v1.list_namespaced_pod, namespace='ns-1')
+    assert first is second
+    assert cache.stats() == {'hits': 1, 'misses': 2}
+    assert served_since(before) == {'list pods': 2}
+
+
+def test_batch_cache_is_per_context(fake_apiservers):
+    before_a, before_b = server_requests('ctx-a'), server_requests('ctx-b')
+    from src.utils import use_context
+    with batch_scope():
+        call(v1.list_namespaced_pod, namespace='default')
+        with use_context('ctx-b'):
+            call(v1.list_namespaced_pod, namespace='default')
+    assert served_since(before_a, 'ctx-a') == {'list pods': 1}
+    assert served_since(before_b, 'ctx-b') == {'list pods': 1}
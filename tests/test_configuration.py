@@ -0,0 +1,60 @@
+import json
+
+from conftest import served_since, server_requests
+
+CONFIGMAP = {'configmap_name': 'app-1-config', 'namespace': 'ns-1'}
+
+
+def test_configmap_lists_key_sizes_and_hashes(tools):
+    out = tools['get_configmap_details'](CONFIGMAP)
+    row = next(line for line in out.splitlines() if line.startswith('| app.properties |'))
+    size, lines, sha = [cell.strip() for cell in row.strip('|').split('|')[1:]]
+    assert size.endswith(' B') and lines == '20' and len(sha) == 12
+    assert 'key1=value1' not in out
+
+
+def test_configmap_key_and_range(tools):
+    whole = tools['get_configmap_details']({**CONFIGMAP, 'key': 'app.properties'})
+    value = whole.split('```\n')[1].rsplit('\n```', 1)[0]
+    assert 'key1=value1' in value
+
+    part = tools['get_configmap_details']({**CONFIGMAP, 'key': 'app.properties', 'offset': 10, 'length': 20})
+    assert f"Bytes 10-30 of {len(value)}, pass offset=30 to read on." in part
+    assert part.split('```\n')[1].rsplit('\n```', 1)[0] == value[10:30]
+
+
+def test_configmap_range_errors(tools):
+    for args, reason in (({'offset': 100000}, 'is outside the value'), ({'offset': -1}, 'is outside the value'),
+                         ({'length': 0}, 'length must be positive'), ({'length': -5}, 'length must be positive')):
+        out = tools['get_configmap_details']({**CONFIGMAP, 'key': 'app.properties', **args})
+        assert out.startswith('[ERROR] Attempting to read key app.properties') and reason in out, out
+    out = tools['get_configmap_details']({**CONFIGMAP, 'key': 'missing'})
+    assert out.startswith('[ERROR]') and 'keys are: app.properties' in out
+
+
+def test_configmap_pattern(tools):
+    out = tools['get_configmap_details']({**CONFIGMAP, 'pattern': r'^key1='})
+    assert 'app.properties:2: key1=value1' in out.splitlines()
+    assert 'key2=' not in out
+    assert 'No matches found.' in tools['get_configmap_details']({**CONFIGMAP, 'pattern': 'nothing-like-this'})
+    assert tools['get_configmap_details']({**CONFIGMAP, 'pattern': '('}).startswith('[ERROR]')
+
+
+def test_secret_values_never_fetched(tools):
+    before = server_requests()
+    out = tools['get_secret_details']({'secret_name': 'app-1-secret', 'namespace': 'ns-1'})
+    deep = tools['get_secret_details']({'secret_name': 'app-1-secret', 'namespace': 'ns-1', 'deep': True})
+    assert out.startswith('# Secret: app-1-secret')
+    assert 'AK15_ALLOW_SECRET_VALUES=1' in out
+    secret = json.loads(deep.split('```json\n')[1].rsplit('\n```', 1)[0])
+    assert secret['metadata']['name'] == 'app-1-secret'
+    assert 'data' not in secret and 'password' not in deep
+    # Both reads asked the API server for metadata only
+    assert served_since(before).get('metadata secrets') == 2
+
+
+def test_secret_names_listed_as_metadata(tools):
+    before = server_requests()
+    out = tools['list_secret_names']({'namespace': 'ns-1'})
+    assert '- app-1-secret' in out
+    assert served_since(before).get('metadata secrets') == 1
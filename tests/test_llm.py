@@ -0,0 +1,75 @@
+import pytest
+
+from fake_openai import FakeOpenAI, chunks, completion, tool_call
+from src import metrics
+
+MODEL = 'test-model'
+
+
+@pytest.fixture
+def llm(tools):
+    from agent.LLM import LLM
+
+    def make(responses):
+        return LLM(MODEL, client=FakeOpenAI(responses))
+    return make
+
+
+def test_stream_event_sequence(llm):
+    agent = llm([
+        chunks(tool_calls=[tool_call('call-1', 'list_deployments', '{"namespace": "ns-1"}')], tokens=(100, 10)),
+        chunks(content=['app-1 ', 'is running.'], tokens=(200, 4)),
+    ])
+    events = list(agent.stream('Which deployments run in ns-1?'))
+
+    assert [e['event'] for e in events] == ['tool_call_start', 'tool_call_end', 'token', 'token', 'done']
+    start, end = events[0], events[1]
+    assert (start['id'], start['name'], start['arguments']) == ('call-1', 'list_deployments', '{"namespace": "ns-1"}')
+    assert end['id'] == 'call-1' and end['size'] > 0 and end['duration'] >= 0
+    assert events[-1]['answer'] == 'app-1 is running.'
+    stats = events[-1]['stats']
+    assert (stats['rounds'], stats['prompt_tokens'], stats['completion_tokens']) == (2, 300, 14)
+
+    # The second round saw the assistant tool call and its result
+    sent = agent.model.requests[1]
+    assert sent[-2]['tool_calls'][0]['id'] == 'call-1'
+    assert sent[-1]['role'] == 'tool' and sent[-1]['tool_call_id'] == 'call-1' and 'app-1' in sent[-1]['content']
+
+
+def test_stream_joins_tool_call_fragments(llm):
+    fragments = [tool_call('call-1', 'list_', ''), tool_call(None, 'deployments', '{"namespace"'),
+                 tool_call(None, None, ': "ns-1"}')]
+    agent = llm([chunks(tool_calls=fragments), chunks(content=['done'])])
+    start = next(e for e in agent.stream('q') if e['event'] == 'tool_call_start')
+    assert (start['name'], start['arguments']) == ('list_deployments', '{"namespace": "ns-1"}')
+
+
+def test_stream_answers_tool_calls_without_a_name(llm):
+    agent = llm([
+        chunks(tool_calls=[tool_call('call-1', '', '{}'),
+                           tool_call('call-2', 'list_deployments', '{"namespace": "ns-1"}', index=1)]),
+        chunks(content=['ok']),
+    ])
+    events = list(agent.stream('q'))
+    assert [e.get('id') for e in events if e['event'] == 'tool_call_start'] == ['call-2']
+    replies = [m for m in agent.model.requests[1] if m.get('role') == 'tool']
+    assert [m['tool_call_id'] for m in replies] == ['call-1', 'call-2']
+    assert replies[0]['content'] == "Tool '' not implemented"
+
+
+def test_stream_counts_llm_errors(llm):
+    before = metrics.LLM_ERRORS._values.get((MODEL,), 0)
+    agent = llm([ValueError('bad request')])
+    with pytest.raises(ValueError):
+        list(agent.stream('q'))
+    assert metrics.LLM_ERRORS._values.get((MODEL,), 0) == before + 1
+
+
+def test_call_answers_tool_calls_without_a_name(llm):
+    agent = llm([
+        completion(tool_calls=[tool_call('call-1', '', '{}')]),
+        completion(content='nothing to do'),
+    ])
+    assert agent.call('q') == 'nothing to do'
+    replies = [m for m in agent.model.requests[1] if m.get('role') == 'tool']
+    assert [m['tool_call_id'] for m in replies] == ['call-1']
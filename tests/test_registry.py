@@ -0,0 +1,64 @@
+import pytest
+
+from conftest import served_since, server_requests
+from src.registry import ToolArgumentError
+
+
+@pytest.mark.parametrize('args, message', [
+    ({'configmap_name': 'app-0-config', 'nope': 1}, "unknown argument 'nope'"),
+    ({'configmap_name': 1}, "argument 'configmap_name' must be of type string"),
+    ({'configmap_name': 'app-0-config', 'deep': 1}, "argument 'deep' must be of type boolean"),
+    ({'configmap_name': 'app-0-config', 'offset': True}, "argument 'offset' must be of type integer"),
+    ({'configmap_name': 'app-0-config', 'deep': None}, "argument 'deep' must be of type boolean, not null"),
+    ({}, "missing required argument(s): configmap_name"),
+    ({'configmap_name': None}, "missing required argument(s): configmap_name"),
+])
+def test_validate_rejects(tools, args, message):
+    with pytest.raises(ToolArgumentError, match=message.replace('(', r'\(').replace(')', r'\)')):
+        tools['get_configmap_details'].validate(args)
+
+
+def test_validate_fills_defaults_and_allows_null_defaults(tools):
+    args = tools['get_configmap_details'].validate({'configmap_name': 'app-0-config', 'key': None})
+    assert args['key'] is None
+    assert args['namespace'] == 'default'
+    assert args['deep'] is False
+
+
+def test_null_for_a_non_null_default_raises(tools):
+    with pytest.raises(ToolArgumentError):
+        tools['list_changes']({'since': None})
+
+
+def test_unknown_context(tools):
+    with pytest.raises(ToolArgumentError, match="unknown context 'nope'"):
+        tools['list_deployments']({'context': 'nope'})
+
+
+def test_all_contexts_fans_out(tools):
+    out = tools['list_deployments']({'context': 'all', 'namespace': 'ns-5'})
+    assert [line for line in out.splitlines() if line.startswith('# Cluster')] == \
+        ['# Cluster: ctx-a', '# Cluster: ctx-b']
+    # app-5 only exists in ctx-b
+    a, b = out.split('# Cluster: ctx-b')
+    assert 'app-5' not in a
+    assert 'app-5' in b
+
+
+def test_context_calls_go_to_that_cluster(tools):
+    before_a, before_b = server_requests('ctx-a'), server_requests('ctx-b')
+    out = tools['get_ownership']({'context': 'ctx-b', 'kind': 'Deployment', 'name': 'app-5', 'namespace': 'ns-5'})
+    assert not out.startswith('[ERROR]'), out
+    assert 'app-5-' in out
+    assert served_since(before_a, 'ctx-a') == {}
+    assert served_since(before_b, 'ctx-b')
+
+
+def test_deployment_details_list_pods_by_selector(tools):
+    before = server_requests('ctx-b')
+    out = tools['get_deployment_details']({'context': 'ctx-b', 'deployment_name': 'app-5', 'namespace': 'ns-5'})
+    pods = [line for line in out.splitlines() if line.startswith('| app-5-')]
+    assert len(pods) == 10
+    served = served_since(before, 'ctx-b')
+    assert served.get('list pods') == 1
+    assert 'list replicasets' not in served
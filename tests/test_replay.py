@@ -0,0 +1,32 @@
+import json
+import os
+import subprocess
+import sys
+
+from bench.replay import QUERIES_PATH, request_key
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_request_key_includes_accept():
+    url = 'http://a.invalid/api/v1/namespaces/default/pods'
+    full = request_key('GET', url, [('limit', 500)], {'Accept': 'application/json'})
+    partial = request_key('GET', url, [('limit', 500)],
+                          {'Accept': 'application/json;as=PartialObjectMetadataList;v=v1;g=meta.k8s.io'})
+    assert full != partial
+    assert full == request_key('GET', 'https://b.invalid/api/v1/namespaces/default/pods', [('limit', '500')],
+                               {'Accept': 'application/json'})
+
+
+def test_committed_cassettes_replay_offline(tmp_path):
+    env = {k: v for k, v in os.environ.items() if not k.startswith('AK15_') and k != 'KUBECONFIG'}
+    env['AK15_LOG_FILE'] = str(tmp_path / 'agent.log')
+    subprocess.run([sys.executable, '-m', 'bench.replay', 'replay', '--save', str(tmp_path / 'results.json')],
+                   cwd=ROOT, env=env, check=True, capture_output=True, timeout=120)
+
+    with open(QUERIES_PATH) as f:
+        queries = json.load(f)
+    with open(tmp_path / 'results.json') as f:
+        results = json.load(f)
+    assert [r['query'] for r in results] == [q['query'] for q in queries]
+    assert all(r['correct'] and r['tool_calls'] >= 1 and r['k8s_calls'] >= 1 for r in results)
@@ -0,0 +1,137 @@
+import pytest
+
+from src import resilience
+from src.resilience import Backend, CircuitBreaker, CircuitOpenError, TokenBucket
+
+
+class Clock:
+    """Stands in for the time module: sleeping advances monotonic time instantly."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience, 'time', clock)
+    return clock
+
+
+class ApiError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"status {status}")
+        self.status = status
+        self.headers = headers
+
+
+def failing(*errors, result='ok'):
+    """A backend call that raises `errors` in turn, then returns `result`; `.calls` counts the attempts."""
+    errors = list(errors)
+
+    def fn():
+        fn.calls += 1
+        if errors:
+            raise errors.pop(0)
+        return result
+    fn.calls = 0
+    return fn
+
+
+def test_token_bucket_waits_once_the_burst_is_spent(clock):
+    bucket = TokenBucket(rate=10, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(0.1)
+    # Callers queue behind each other's reserved tokens
+    assert bucket.acquire() == pytest.approx(0.1)
+    clock.now += 1
+    assert bucket.acquire() == 0.0
+
+
+def test_token_bucket_without_a_rate_never_waits(clock):
+    bucket = TokenBucket(rate=0, burst=1)
+    assert [bucket.acquire() for _ in range(100)] == [0.0] * 100
+    assert clock.sleeps == []
+
+
+def test_circuit_breaker_opens_then_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failures=3, reset=30)
+    assert [breaker.failure() for _ in range(3)] == [False, False, True]
+    assert breaker.open
+    assert breaker.allow() == pytest.approx(30)
+
+    clock.now += 30
+    assert breaker.allow() is None
+    # Only one trial call while it is decided
+    assert breaker.allow() == 0.0
+    breaker.success()
+    assert not breaker.open and breaker.allow() is None
+
+
+def test_circuit_breaker_reopens_when_the_trial_fails(clock):
+    breaker = CircuitBreaker(failures=1, reset=30)
+    breaker.failure()
+    clock.now += 30
+    assert breaker.allow() is None
+    assert breaker.failure()
+    assert breaker.allow() == pytest.approx(30)
+
+
+def test_backend_retries_transient_failures(clock):
+    backend = Backend('test', qps=0, burst=1, retries=3)
+    fn = failing(ApiError(503), ApiError(429), TimeoutError())
+    assert backend.call(fn) == 'ok'
+    assert fn.calls == 4
+    assert len(clock.sleeps) == 3 and all(0 <= s <= resilience.RETRY_MAX for s in clock.sleeps)
+
+
+def test_backend_gives_up_after_its_retries(clock):
+    backend = Backend('test', qps=0, burst=1, retries=2)
+    fn = failing(*[ApiError(500)] * 5)
+    with pytest.raises(ApiError):
+        backend.call(fn)
+    assert fn.calls == 3
+
+
+def test_backend_does_not_retry_other_errors(clock):
+    backend = Backend('test', qps=0, burst=1, retries=3)
+    backend.breaker.failure()
+    fn = failing(ApiError(404))
+    with pytest.raises(ApiError):
+        backend.call(fn)
+    assert fn.calls == 1 and clock.sleeps == []
+    # The backend answered, so the failure streak is over
+    assert backend.breaker._count == 0
+
+
+def test_backend_honours_retry_after(clock):
+    backend = Backend('test', qps=0, burst=1, retries=3)
+    fn = failing(ApiError(429, headers={'Retry-After': '2'}))
+    assert backend.call(fn) == 'ok'
+    assert clock.sleeps == [2.0]
+
+
+def test_backend_fails_fast_while_the_circuit_is_open(clock):
+    backend = Backend('test', qps=0, burst=1, retries=10)
+    backend.breaker = CircuitBreaker(failures=2, reset=30)
+    fn = failing(*[ApiError(502)] * 5)
+    with pytest.raises(ApiError):
+        backend.call(fn)
+    # Retrying stops as soon as the circuit opens
+    assert fn.calls == 2
+
+    with pytest.raises(CircuitOpenError) as e:
+        backend.call(fn)
+    assert fn.calls == 2 and e.value.status == 503
+
+    clock.now += 30
+    assert backend.call(failing()) == 'ok'
+    assert not backend.breaker.open
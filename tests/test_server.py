@@ -0,0 +1,57 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+
+@pytest.fixture(scope='module')
+def client(tools):
+    from main import app
+    return app.test_client()
+
+
+@pytest.mark.parametrize('body', [
+    {},
+    {'queries': []},
+    {'queries': 'what pods are running?'},
+    {'queries': ['ok', 3]},
+    {'queries': ['ok', '  ']},
+    {'queries': ['ok'], 'max_workers': 0},
+    {'queries': ['ok'], 'max_workers': -2},
+    {'queries': ['ok'], 'max_workers': 'four'},
+    {'queries': ['ok'], 'max_workers': True},
+])
+def test_batch_rejects_bad_requests(client, body):
+    response = client.post('/query/batch', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_concurrent_queries_get_their_own_stats(client, monkeypatch):
+    import main
+    from fake_openai import completion
+
+    queries = [f"question {'?' * i}" for i in range(4)]
+    barrier = threading.Barrier(len(queries), timeout=5)
+
+    class PerQuery:
+        """Answers each query after all of them reached the model, with prompt tokens = query length."""
+        def create(self, messages, **kwargs):
+            query = messages[1]['content']
+            barrier.wait()
+            return completion(content=f"answer to {query}", tokens=(len(query), 1))
+
+    monkeypatch.setattr(main.agent, '_model', SimpleNamespace(chat=SimpleNamespace(completions=PerQuery())))
+    results = {}
+
+    def ask(query):
+        results[query] = main.app.test_client().post('/query', json={'query': query, 'stats': True}).get_json()
+
+    threads = [threading.Thread(target=ask, args=(q,)) for q in queries]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    for query in queries:
+        assert results[query]['answer'] == f"answer to {query}"
+        assert results[query]['stats']['prompt_tokens'] == len(query)
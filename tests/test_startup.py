@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+# Imports the server and every tool module, then prints the threads running
+SCRIPT = """
+import threading
+import main
+from src import registry
+registry.load_tools()
+print(sorted(t.name for t in threading.enumerate()))
+"""
+
+
+def test_import_without_kubeconfig(tmp_path):
+    env = dict(os.environ, KUBECONFIG=str(tmp_path / 'missing'), AK15_USAGE_INTERVAL='30',
+               AK15_LOG_FILE=str(tmp_path / 'agent.log'), OPENAI_API_KEY='test')
+    env.pop('AK15_CONTEXTS', None)
+    result = subprocess.run([sys.executable, '-c', SCRIPT], cwd=ROOT, env=env, capture_output=True, text=True,
+                            timeout=60)
+    assert result.returncode == 0, result.stderr
+    # Importing main starts neither the usage sampler nor a store watch
+    assert 'usage-sampler' not in result.stdout
@@ -0,0 +1,156 @@
+import time
+
+import pytest
+
+from conftest import served_since, server_requests
+from src import store
+
+
+def deployment(name: str, replicas: int, resource_version: str, namespace: str = 'default') -> dict:
+    return {'apiVersion': 'apps/v1', 'kind': 'Deployment',
+            'metadata': {'name': name, 'namespace': namespace, 'resourceVersion': resource_version,
+                         'labels': {'app': name}},
+            'spec': {'replicas': replicas, 'selector': {'matchLabels': {'app': name}}},
+            'status': {'replicas': replicas}}
+
+
+@pytest.fixture
+def object_store(tmp_path):
+    yield store.load(str(tmp_path / 'store.db'))
+    store.load(None)
+
+
+def test_journal_records_watch_events(object_store):
+    object_store.replace('deployment', [deployment('web', 1, '1'), deployment('api', 1, '2')], '2')
+    seq = object_store.last_seq()
+    object_store.apply('deployment', 'MODIFIED', deployment('web', 3, '3'))
+    object_store.apply('deployment', 'ADDED', deployment('db', 1, '4', 'data'))
+    object_store.apply('deployment', 'DELETED', deployment('api', 1, '5'))
+
+    rows, oldest = object_store.changes_since(seq)
+    assert [(r[2], r[3], r[4], r[5]) for r in rows] == [
+        ('deployment', 'default', 'web', 'MODIFIED'),
+        ('deployment', 'data', 'db', 'ADDED'),
+        ('deployment', 'default', 'api', 'DELETED'),
+    ]
+    assert oldest <= seq
+    changes, _ = object_store.history(0)
+    assert changes[0][5] == [['spec.replicas', '1', '3']]
+    assert object_store.resource_version('deployment') == '5'
+
+
+def test_relist_journals_the_difference(object_store):
+    object_store.replace('deployment', [deployment('web', 1, '1'), deployment('api', 1, '2')], '2')
+    seq = object_store.last_seq()
+    object_store.replace('deployment', [deployment('web', 2, '3'), deployment('db', 1, '4')], '4')
+    rows, _ = object_store.changes_since(seq)
+    assert sorted((r[4], r[5]) for r in rows) == [('', 'RELISTED'), ('api', 'DELETED'), ('db', 'ADDED'),
+                                                  ('web', 'MODIFIED')]
+
+
+def test_list_changes(tools, object_store):
+    object_store.replace('deployment', [deployment('web', 1, '1')], '1')
+    object_store.apply('deployment', 'MODIFIED', deployment('web', 3, '2'))
+    status_only = deployment('web', 3, '3')
+    status_only['status']['replicas'] = 2
+    object_store.apply('deployment', 'MODIFIED', status_only)
+    object_store.apply('deployment', 'ADDED', deployment('db', 1, '4', 'data'))
+
+    out = tools['list_changes']({'since': '1h'})
+    assert 'Deployment default/web: modified' in out
+    assert '  - spec.replicas: 1 -> 3' in out
+    assert 'Deployment data/db: added' in out
+    assert '(status)' not in out
+    assert '(status)' in tools['list_changes']({'since': '1h', 'include_status': True})
+
+    filtered = tools['list_changes']({'since': '1h', 'namespace': 'data', 'kind': 'Deployment'})
+    assert 'data/db' in filtered and 'default/web' not in filtered
+    assert tools['list_changes']({'since': 'yesterday'}).startswith('[ERROR]')
+    assert tools['list_changes']({'kind': 'Gadget'}).startswith("[ERROR] Attempting to list changes: unknown kind")
+
+
+def test_list_changes_needs_the_store(tools):
+    assert tools['list_changes']({}).startswith('[ERROR] Attempting to list changes: change history needs')
+
+
+def test_store_serves_metadata_reads_of_secrets(object_store):
+    from src.client import call_raw
+    from src.utils import LazyApi
+    secret = {'apiVersion': 'v1', 'kind': 'Secret', 'type': 'Opaque', 'data': {'password': 'c2VjcmV0'},
+              'metadata': {'name': 'db', 'namespace': 'default', 'resourceVersion': '1'}}
+    object_store.replace('secret', [secret], '1')
+    read = call_raw(LazyApi('CoreV1Api', metadata=True).read_namespaced_secret, name='db', namespace='default')
+    assert read == {'apiVersion': 'meta.k8s.io/v1', 'kind': 'PartialObjectMetadata',
+                    'metadata': {'name': 'db', 'namespace': 'default', 'resourceVersion': '1'}}
+
+
+def _wait_for(condition, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_watch_resumes_from_the_stored_resource_version(tmp_path):
+    path = str(tmp_path / 'store.db')
+    before = server_requests()
+    first = store.load(path)
+    try:
+        first.watch(['deployment'])
+        _wait_for(lambda: served_since(before).get('watch deployments'))
+        assert served_since(before) == {'list deployments': 1, 'watch deployments': 1}
+        synced = first.stats()['deployment']
+
+        # A restart reopens the same file and goes straight back to watching
+        before = server_requests()
+        second = store.load(path)
+        assert second.stats()['deployment'] == synced
+        second.watch(['deployment'])
+        _wait_for(lambda: served_since(before).get('watch deployments'))
+        assert served_since(before) == {'watch deployments': 1}
+    finally:
+        store.load(None)
+
+
+def test_watch_relists_when_the_stored_resource_version_expired(tmp_path):
+    object_store = store.load(str(tmp_path / 'store.db'))
+    try:
+        object_store.replace('deployment', [deployment('gone', 1, '7')], '7')
+        before = server_requests()
+        object_store.watch(['deployment'])
+        _wait_for(lambda: served_since(before).get('watch deployments') == 2)
+        assert served_since(before) == {'list deployments': 1, 'watch deployments': 2}
+        assert object_store.rows('deployment', 'default', 'gone').fetchall() == []
+        assert object_store.resource_version('deployment') == '1'
+    finally:
+        store.load(None)
+
+
+def test_journal_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'store.db')
+    first = store.ObjectStore(path)
+    first.replace('deployment', [deployment('web', 1, '1')], '1')
+    first.apply('deployment', 'MODIFIED', deployment('web', 3, '2'))
+    seq = first.last_seq()
+
+    second = store.ObjectStore(path)
+    assert second.last_seq() == seq
+    assert second.changes_since(0) == first.changes_since(0)
+    assert second.resource_version('deployment') == '2'
+    second.apply('deployment', 'ADDED', deployment('db', 1, '3'))
+    rows, _ = second.changes_since(seq)
+    assert [(r[0] > seq, r[4], r[5]) for r in rows] == [(True, 'db', 'ADDED')]
+    changes, _ = second.history(0)
+    assert [['spec.replicas', '1', '3']] in [c[5] for c in changes]
+
+
+def test_schema_change_resets_the_store(tmp_path):
+    path = str(tmp_path / 'store.db')
+    old = store.ObjectStore(path)
+    old.replace('deployment', [deployment('web', 1, '1')], '1')
+    old._writer.execute(f"PRAGMA user_version = {store.SCHEMA_VERSION - 1}")
+
+    reopened = store.ObjectStore(path)
+    assert reopened.stats()['deployment'] == {'objects': 0, 'resource_version': None}
+    assert reopened.last_seq() == 0
+    assert reopened._reader.execute("PRAGMA user_version").fetchone()[0] == store.SCHEMA_VERSION
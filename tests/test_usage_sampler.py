@@ -0,0 +1,55 @@
+import math
+
+import pytest
+
+from src import usage_sampler
+from src.usage_sampler import UsageSampler
+
+
+def sampler_with(samples: int, rounds: int, path: str = None) -> UsageSampler:
+    sampler = UsageSampler(samples=samples, interval=0, file=path)
+    for i in range(rounds):
+        pods = {('default', f'web-{p}'): (0.1 * (i + p), 2 ** 20 * (i + p)) for p in range(3)}
+        sampler._fetch = lambda plural, pods=pods: {'node-0': (1.0 + i, 2 ** 30)} if plural == 'nodes' else pods
+        sampler.sample()
+    return sampler
+
+
+def test_stats_over_the_ring():
+    sampler = sampler_with(samples=4, rounds=6)
+    stats = sampler.stats('pod', ('default', 'web-2'), 'cpu')
+    # Only the last 4 of 6 samples are kept: 0.1 * (2..5 + 2)
+    assert stats.samples == 4
+    assert math.isclose(stats.low, 0.4, rel_tol=1e-6) and math.isclose(stats.peak, 0.7, rel_tol=1e-6)
+    assert math.isclose(stats.latest, 0.7, rel_tol=1e-6)
+    assert [key for key, _ in sampler.top('pod', 'memory', 2)] == [('default', 'web-2'), ('default', 'web-1')]
+
+
+def test_history_is_shared_through_the_file(tmp_path):
+    path = str(tmp_path / 'usage')
+    sampler = sampler_with(samples=4, rounds=3, path=path)
+
+    reader = UsageSampler()
+    assert reader.load(path)
+    assert not reader.load(path)
+    assert reader.count == 3 and reader.samples == 4
+    for metric in usage_sampler.METRICS:
+        a, b = sampler.stats('node', 'node-0', metric), reader.stats('node', 'node-0', metric)
+        assert [getattr(a, f) for f in a.__slots__] == [getattr(b, f) for f in b.__slots__]
+
+
+def test_non_sampling_process_reads_the_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'usage')
+    monkeypatch.setattr(usage_sampler, 'SAMPLING', False)
+    monkeypatch.setattr(usage_sampler, 'USAGE_FILE', path)
+    monkeypatch.setattr(usage_sampler, '_sampler', None)
+
+    assert usage_sampler.sampled() is None
+    with pytest.raises(RuntimeError):
+        usage_sampler.current()
+
+    sampler_with(samples=4, rounds=2, path=path)
+    shared = usage_sampler.current()
+    assert shared.count == 2
+    assert shared._thread is None
+    assert usage_sampler.sampled() is shared